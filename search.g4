@@ -1,22 +1,41 @@
 grammar search;
 
-CHAR: ~[\b\r\n\t\f];
+search_statement: song_title EOF |
+                  song_title ' ' query EOF |
+                  query EOF;
 
-search_statement: song_title |
-                  song_title (' ' tag_statement)+ |
-                  tag_statement (' ' tag_statement)*;
-                  
 song_title: value;
-tag_statement: '-' tag ':' value;
-tag : 'title' | 'subtitle' | 'artist' | 'stepartist' | 'rating' | 'bpm';
-value: CHAR+ (' '* CHAR+)*;
 
-// TODO: support range search
+// Tags separated by a space must all match. OR has a lower precedence, e.g.
+// -artist:foo -rating:12 OR -rating:13 means (-artist:foo -rating:12) OR -rating:13
+// Parentheses group tags, e.g. -artist:foo (-rating:12 OR -rating:13)
+query: and_query (' OR ' and_query)*;
+and_query: term (' ' term)*;
+term: 'NOT ' term |
+      '(' query ')' |
+      tag_statement;
+
+tag_statement: '-' tag ':' value |
+               '-' range_tag ':' range;
+tag : 'title' | 'subtitle' | 'artist' | 'stepartist';
+range_tag : 'rating' | 'bpm' | 'nps' | 'totalstream' | 'totalbreak' | 'length' |
+            'candles' | 'candledensity' | 'mono' | 'anchors';
+
+// TAG:VALUE    exactly VALUE
+// TAG:VALUE+   VALUE or more
+// TAG:VALUE-   VALUE or less
+// TAG:VALUE-VALUE  between both values
+range: number |
+       number '+' |
+       number '-' |
+       number '-' number;
+number: DIGIT+ ('.' DIGIT+)?;
 
-// proposed grammar:
-// TAG:VALUE+
-// TAG:VALUE-
-// TAG:VALUE-VALUE
+value: text+ (' '* text+)*;
+// Tag names, numbers and operators are also allowed in a value, e.g. "-title:length 2 (NOT OR)"
+text: CHAR | DIGIT | '.' | '+' | '-' | '(' | ')' | ' OR ' | 'NOT ' | tag | range_tag;
+
+DIGIT: [0-9];
+CHAR: ~[\b\r\n\t\f];
 
-// TODO: support 'totalstream' and 'totalbreak', 'density'
-// (total stream, total break, density are virtually useless without range search)
+// TODO: support 'density'
@@ -32,10 +32,14 @@ import datetime
 # Internal Imports
 from db import DBManager as dbm
 from db import UserDBManager as udbm
+from db.SongCatalog import SongCatalog
+from db.SongStorage import SearchPage, get_packs, open_song_storage
 from scan.scan import parse_file, scan_folder
+from scan.dbhelpers import WriteBatcher, load_md5s_into_cache
 from zipfile import BadZipFile, ZipFile
 
-from globals import DLPACK_ON_SELECTED_SERVERS_ONLY, DLPACK_DESTINATION_URL, TMP_DIR, USER_AGENT, DEFAULT_PREFIX, PREFIXES, DEFAULT_AUTODELETE_BEHAVIOR, SERVER_SETTINGS, USER_SETTINGS, DATABASE_NAME, APPROVED_SERVERS, HELP_MESSAGE, STR_TO_EMOJI, VALID_PARAMS
+from globals import DLPACK_ON_SELECTED_SERVERS_ONLY, DLPACK_DESTINATION_URL, TMP_DIR, USER_AGENT, DEFAULT_PREFIX, PREFIXES, DEFAULT_AUTODELETE_BEHAVIOR, SERVER_SETTINGS, USER_SETTINGS, DATABASE_NAME, APPROVED_SERVERS, HELP_MESSAGE, STR_TO_EMOJI, VALID_PARAMS, RENDER_WORKERS, MAX_SEARCH_RESULTS
+from helpers import ImageHelper as ih
 from helpers.bothelpers import get_prefixes, is_prefix_for_server
 from helpers.messagehelpers import get_footer_image, create_embed
 
@@ -45,6 +49,12 @@ server_db = TinyDB(SERVER_SETTINGS)
 # The database that contains user configurations
 user_db = TinyDB(USER_SETTINGS)
 
+# In-memory snapshot of the song database, shared by every command. Reloads itself when the database file changes.
+# Loaded when the bot starts, see the end of this file.
+song_db: SongCatalog = None
+# User ID -> ID of the chart they last picked from a search, used by -similar
+selected_charts = {}
+
 # Loads the discord token from the .env file.
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -84,7 +94,15 @@ async def search_song(ctx, *, song_name: str):
     # Strip the whitespaces since query is unstripped due to rest_is_raw=True
     query = song_name.strip()
 
-    results = dbm.search(query, DATABASE_NAME)
+    results = dbm.search_page(query, song_db, MAX_SEARCH_RESULTS)
+
+    # Nothing found, the title may be misspelled
+    suggested = False
+    if results == 0:
+        suggestions = dbm.suggest_titles(query, song_db, MAX_SEARCH_RESULTS)
+        if suggestions:
+            results = SearchPage(suggestions, len(suggestions), True)
+            suggested = True
 
     if isinstance(results, int):
         if results == 0:
@@ -96,88 +114,153 @@ async def search_song(ctx, *, song_name: str):
             embed = discord.Embed(
                 description="There was an error processing this request.")
             await ctx.send(embed=embed)
-    elif isinstance(results, list):
-        if len(results) == 1:
-            data = results[0]
-
-            embed, _, file = create_embed(data, ctx)
-            await ctx.send(file=file, embed=embed)
-
-        elif len(results) > 1:
-            data = results
+    else:
+        # Only summaries of the results are loaded, the chart picked is read in full
+        data = results.summaries
+        if results.total == 1 and not suggested:
+            await send_chart(ctx, data[0].doc_id)
 
+        else:
             user = "{}".format(ctx.author.mention)
             max_results = len(data)
-            if max_results >= 26:
-                max_results = 25
-                search_description = "There were too many results, but I can show you the first 25." + "\n"
+            if suggested:
+                search_description = "Sorry, I could not find any songs. Did you mean one of these?" + "\n"
+                search_description += user + \
+                    ", enter a number from `1` to `" + str(max_results) + "` "
+                search_description += "to select the search result."
+            elif results.total > max_results:
+                search_description = "There were " + ("" if results.exact else "about ") + str(results.total) + \
+                    " results, but I can show you the first " + str(max_results) + "." + "\n"
                 search_description += "If your song isn't listed, please refine your search." + "\n"
                 search_description += user + \
                     ", enter a number from `1` to `" + str(max_results) + "` "
                 search_description += "to select the search result."
-                embed = discord.Embed(title="Search Results",
-                                      description=search_description)
-            else:
-                embed = discord.Embed(
-                    title="Search Results",
-                    description=user + ", enter a number from `1` to `" +
-                    str(len(data)) + "` to select the search result.")
-
-            for i, d in enumerate(data):
-                if i >= 25:
-                    break
-                title = "` " + str(i + 1) + " ` " + d["title"] + " "
-                if d["subtitle"] and d["subtitle"] != "N/A":
-                    title += "*" + d["subtitle"] + "* "
-                title += "by " + d["artist"]
-
-                value = "Pack(s): " + d["pack"] + "\n"
-                value += get_footer_image(int(d["rating"])) + " " + \
-                    d["difficulty"] + " - " + \
-                    d["stepartist"].replace("*", "\*")
-
-                embed.add_field(name=title, value=value, inline=False)
-
-            if len(embed) > 6000:
-                embed = discord.Embed(
-                    description=
-                    "Sorry {}, but there are too many results for me to display."
-                    .format(ctx.author.mention))
-                await ctx.send(embed=embed)
-                return
             else:
-                await ctx.send(embed=embed)
-
-            try:
-                msg = await simfileSidekick.wait_for(
-                    "message",
-                    check=lambda message: message.author == ctx.author,
-                    timeout=30)
-            except asyncio.TimeoutError:
-                # User didn't respond in 30s, just exit
-                return
-
-            if msg:
-                embed, file = None, None
-                try:
-                    index = int(msg.content) - 1
-
-                    if index < 0 or index >= len(data):
-                        raise IndexError
-
-                    embed, _, file = create_embed(data[index], ctx)
-                except ValueError:
-                    # Users may be continuing a conversation, or using another command. This would prevent the bot from
-                    # saying "invalid input" if the user searches for another song/uses another command.
-                    pass
-                except IndexError:
-                    embed = discord.Embed(
-                        description=
-                        f"Sorry {ctx.author.mention}, that's out of range. Try searching again."
-                    )
-                finally:
-                    if embed:
-                        await ctx.send(file=file, embed=embed)
+                search_description = user + ", enter a number from `1` to `" + \
+                    str(len(data)) + "` to select the search result."
+
+            await choose_result(ctx, data, search_description)
+
+
+@simfileSidekick.command(name="similar")
+async def similar_songs(ctx):
+    doc_id = selected_charts.get(ctx.author.id)
+    if doc_id is None:
+        embed = discord.Embed(
+            description=
+            f"Sorry {ctx.author.mention}, but please pick a song with `-search` first."
+        )
+        await ctx.send(embed=embed)
+        return
+
+    data = dbm.similar_charts(doc_id, song_db, MAX_SEARCH_RESULTS)
+    if not data:
+        embed = discord.Embed(
+            description="Sorry {}, but I could not find any similar songs.".
+            format(ctx.author.mention))
+        await ctx.send(embed=embed)
+        return
+
+    chart = song_db.get(doc_id)
+    search_description = "These are the songs most like **" + chart["title"] + "** (" + \
+        chart["difficulty"] + ").\n"
+    search_description += ctx.author.mention + ", enter a number from `1` to `" + \
+        str(len(data)) + "` to select the search result."
+    await choose_result(ctx, data, search_description)
+
+
+@simfileSidekick.command(name="random", rest_is_raw=True)
+async def random_song(ctx, *, query: str = ""):
+    # Strip the whitespaces since query is unstripped due to rest_is_raw=True
+    chart = dbm.random_chart(query.strip(), song_db)
+
+    if isinstance(chart, int):
+        if chart == 0:
+            embed = discord.Embed(
+                description="Sorry {}, but I could not find any songs.".format(
+                    ctx.author.mention))
+            await ctx.send(embed=embed)
+        elif chart == -1:
+            embed = discord.Embed(
+                description="There was an error processing this request.")
+            await ctx.send(embed=embed)
+    else:
+        await send_chart(ctx, chart.doc_id)
+
+
+async def send_chart(ctx, doc_id: int) -> bool:
+    """ Sends the embed of a chart, and remembers it as the user's selection for -similar.
+
+    @return: False if the chart isn't in the database anymore, e.g. deleted by -delpack.
+    """
+    chart = song_db.get(doc_id)
+    if chart is None:
+        return False
+    embed, _, file = create_embed(chart, ctx)
+    await ctx.send(file=file, embed=embed)
+    selected_charts[ctx.author.id] = doc_id
+    return True
+
+
+async def choose_result(ctx, data: list, description: str):
+    """ Lists search results, then sends the one the user picks by number.
+
+    @param data: The summaries of the charts to list, see SongStorage.get_summary.
+    @param description: The text above the list.
+    """
+    embed = discord.Embed(title="Search Results", description=description)
+    for i, d in enumerate(data):
+        title = "` " + str(i + 1) + " ` " + d["title"] + " "
+        if d["subtitle"] and d["subtitle"] != "N/A":
+            title += "*" + d["subtitle"] + "* "
+        title += "by " + d["artist"]
+
+        value = "Pack(s): " + ", ".join(get_packs(d)) + "\n"
+        value += get_footer_image(int(d["rating"])) + " " + \
+            d["difficulty"] + " - " + \
+            d["stepartist"].replace("*", "\*")
+
+        embed.add_field(name=title, value=value, inline=False)
+
+    if len(embed) > 6000:
+        embed = discord.Embed(
+            description=
+            "Sorry {}, but there are too many results for me to display."
+            .format(ctx.author.mention))
+        await ctx.send(embed=embed)
+        return
+    else:
+        await ctx.send(embed=embed)
+
+    try:
+        msg = await simfileSidekick.wait_for(
+            "message",
+            check=lambda message: message.author == ctx.author,
+            timeout=30)
+    except asyncio.TimeoutError:
+        # User didn't respond in 30s, just exit
+        return
+
+    if msg:
+        try:
+            index = int(msg.content) - 1
+
+            if index < 0 or index >= len(data):
+                raise IndexError
+
+            if not await send_chart(ctx, data[index].doc_id):
+                # Deleted since the search, e.g. by -delpack
+                raise IndexError
+        except ValueError:
+            # Users may be continuing a conversation, or using another command. This would prevent the bot from
+            # saying "invalid input" if the user searches for another song/uses another command.
+            pass
+        except IndexError:
+            embed = discord.Embed(
+                description=
+                f"Sorry {ctx.author.mention}, that's out of range. Try searching again."
+            )
+            await ctx.send(embed=embed)
 
 
 @simfileSidekick.command(name="sv")
@@ -444,6 +527,7 @@ async def parse(ctx, *params: str):
         # parse_file(usr_tmp_file, usr_tmp_dir, "*<Uploaded>*", db, None, hide_artist_info, None)
         parse_file(db, usr_tmp_file, usr_tmp_dir, "*<Uploaded>*",
                    hide_artist_info, None)
+        ih.wait_for_density_graphs()
 
         # Get results from temporary database
         results = [result for result in db]
@@ -493,7 +577,7 @@ async def delpack(ctx, input: str):
         return
 
     try:
-        updates, deletes = dbm.delete_pack_search_results(input, DATABASE_NAME)
+        updates, deletes = dbm.delete_pack_search_results(input, song_db)
     except TypeError:
         # Returned 0 or -1
         # TODO: clean this up
@@ -543,10 +627,14 @@ async def delpack(ctx, input: str):
         return
 
     if msg and msg.content.upper() == "Y":
-        dbm.delete_by_ids(list(d for d in deletes), DATABASE_NAME)
-        dbm.remove_pack_from_songs_by_id(input, list(u for u in updates),
-                                         DATABASE_NAME)
-        await ctx.send("Songs deleted.")
+        result = dbm.delete_pack(input, song_db)
+        logging.info(
+            "Deleted pack \"{}\": {} chart(s) updated, {} chart(s) deleted in {:.2f}s."
+            .format(input, result["updated"], result["deleted"],
+                    result["seconds"]))
+        await ctx.send(
+            "Songs deleted. {} chart(s) updated, {} chart(s) deleted in {:.2f}s."
+            .format(result["updated"], result["deleted"], result["seconds"]))
 
 
 @simfileSidekick.command(name="dlpack")
@@ -617,9 +705,7 @@ async def dlpack(ctx, input: str):
 
     zipfile.close()
 
-    db = TinyDB(DATABASE_NAME)
-
-    if dbm.pack_exists(pack, db):
+    if dbm.pack_exists(pack, song_db):
         message = "{}, ".format(ctx.author.mention)
         message += "it looks like this pack is already added. :x:"
         await process_msg.edit(content=message)
@@ -627,16 +713,22 @@ async def dlpack(ctx, input: str):
         shutil.rmtree(temp_pack_dir)
         return
 
+    db = open_song_storage(DATABASE_NAME)
+
     message = "{}, ".format(ctx.author.mention)
     message += "I'm done extracting. Now scanning with the parse tool and adding to database. :hourglass:"
     await process_msg.edit(content=message)
 
-    # Args Ordered: Rebuild, Verbose, Directory, Media_remove, Log, Unit_test, CSV
+    # Args Ordered: Rebuild, Verbose, Directory, Media_remove, Log, Unit_test, CSV, Workers
     scan_args = [
-        False, False, DLPACK_DESTINATION_URL, True, False, False, False
+        False, False, DLPACK_DESTINATION_URL, True, False, False, False, False
     ]
-    scan_folder(scan_args, db)
+    batcher = WriteBatcher(db, load_md5s_into_cache(db, {}))
+    scan_folder(scan_args, batcher)
+    batcher.flush()
+    ih.wait_for_density_graphs()
     db.close()
+    song_db.reload_in_background()
 
     message = "{}, ".format(ctx.author.mention)
     message += "\"" + pack + "\""
@@ -724,4 +816,11 @@ async def on_message(message):
         await simfileSidekick.process_commands(message)
 
 
-simfileSidekick.run(TOKEN)
+if __name__ == "__main__":
+    # Loaded here rather than at import, as the renderer processes may import this file again, and must not load the
+    # whole song database too
+    song_db = SongCatalog(DATABASE_NAME)
+    # Keeps density graph renderers warm for the lifetime of the bot. Started here, as the renderer processes must not
+    # log in another bot either.
+    ih.start_render_pool(RENDER_WORKERS)
+    simfileSidekick.run(TOKEN)
@@ -1,155 +1,272 @@
-from tinydb import Query, TinyDB, where
-from typing import List, Union
-import json
+from functools import lru_cache
+from tinydb import TinyDB
+from tinydb.table import Document
+from typing import List, Optional, Union
 import re
+import time
+
+from .DuplicateIndex import DUPLICATE_THRESHOLD, DuplicateIndex
 from .parser.generateQueryObject import generateQueryObject
+from .parser.queryParser import SKIPPED
+from .SongStorage import CompiledQuery, SearchPage, SongStorage, as_song_storage, get_packs, has_pack
 
-# TODO: handle db.close on bad results (i.e. db.close() isn't called if we return 0/-1)
+# Number of compiled searches kept, see compileQuery
+QUERY_CACHE_SIZE = 256
 
 
-def buildDBQuery(queryObject: dict):
-    DBQuery = None
-    # supported tags: 'title', 'subtitle', 'artist', 'stepartist', 'rating', 'bpm'
-    # bpm logic: 'min_bpm' == 'max_bpm'
+def normalizeQuery(query: str) -> str:
+    """ Returns the search without the characters the parser ignores, so searches that only differ by those share a
+    cache entry.
+    """
+    return "".join(c for c in query if c not in SKIPPED)
 
-    for key, value in queryObject.items():
-        if value:
-            currentQuery = None
 
-            # Generate query
-            if key == 'bpm':
-                currentQuery = (where('min_bpm') == float(value)) & (
-                    where('max_bpm') == float(value))
-            elif key == 'rating':
-                # this one is a string in our db and it needs to be exact
-                currentQuery = where('rating') == value
-            else:
-                currentQuery = where(key).search(value, flags=re.IGNORECASE)
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _compileNormalizedQuery(query: str) -> Optional[CompiledQuery]:
+    queryObject = generateQueryObject(query)
+    if queryObject["error"]:
+        return None
+    try:
+        return CompiledQuery(queryObject["queryObject"], query)
+    except re.error:
+        return None
 
-            # AND the queries
-            if DBQuery:
-                DBQuery &= currentQuery
-            else:
-                DBQuery = currentQuery
-    return DBQuery
 
+def compileQuery(query: str) -> Optional[CompiledQuery]:
+    """ Parses and compiles a search. The most recently used searches are kept, so repeating one skips both steps.
+    :param query: The search, e.g. "sigatrev -rating:20".
+    :return: The CompiledQuery, shared by every caller, or None if the search isn't valid.
+    """
+    return _compileNormalizedQuery(normalizeQuery(query))
 
-def search(query: str, db: Union[str, TinyDB]) -> Union[int, List]:
-    """ Search the database for a song.
 
+def search(query: str, db: Union[str, TinyDB, SongStorage]) -> Union[int, List]:
+    """ Search the database for a song.
     :param song_title: The title of the song to search for.
-    :param db: The name of the database, or the TinyDB object for that database.
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
     :return: Array of results that match criteria.
     """
-    db_param_is_string = False
-
-    if isinstance(db, str):
-        db = TinyDB(db)
-        db_param_is_string = True
-
-    queryObject = generateQueryObject(query)
-
-    if queryObject["error"]:
-        return -1
+    storage = as_song_storage(db)
+    try:
+        compiledQuery = compileQuery(query)
+        if compiledQuery is None:
+            return -1
 
-    dbQuery = buildDBQuery(queryObject["queryObject"])
-    results = db.search(dbQuery)
+        results = storage.search(compiledQuery)
 
-    if len(results) == 0:
-        return 0
-    elif len(results) >= 1:
-        results_array = []
-        for r in results:
-            results_array.append(json.loads(json.dumps(r)))
-        if db_param_is_string:
-            db.close()
+        if len(results) == 0:
+            return 0
         return results
-    else:
-        return -1
-
-
-def delete_pack_search_results(pack_name: str, db: Union[str, TinyDB]):
-    """ When deleting a pack, this will return a list of all songs that will be updated/deleted
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def search_page(query: str, db: Union[str, TinyDB, SongStorage],
+                limit: int) -> Union[int, SearchPage]:
+    """ Search the database for a song, only returning summaries of the first results. Use the storage's get with the
+    doc_id of a summary to load the whole chart.
+    :param query: The search, e.g. "sigatrev -rating:20".
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :param limit: The most summaries returned.
+    :return: The SearchPage, 0 if nothing was found or -1 if the search isn't valid.
+    """
+    storage = as_song_storage(db)
+    try:
+        compiledQuery = compileQuery(query)
+        if compiledQuery is None:
+            return -1
+
+        page = storage.search_page(compiledQuery, limit)
+
+        if page.total == 0:
+            return 0
+        return page
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def random_chart(query: str, db: Union[str, TinyDB, SongStorage]) -> Union[int, Document]:
+    """ Picks a chart at random among the charts matching a search, without listing every match first when the storage
+    can avoid it, see SongStorage.random_chart.
+    :param query: The search, e.g. "-rating:13 -totalstream:100+". An empty search picks among every chart.
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :return: The chart picked, 0 if nothing was found or -1 if the search isn't valid.
     """
+    storage = as_song_storage(db)
+    try:
+        compiledQuery = None
+        if query.strip():
+            compiledQuery = compileQuery(query)
+            if compiledQuery is None:
+                return -1
+
+        chart = storage.random_chart(compiledQuery)
+
+        if chart is None:
+            return 0
+        return chart
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def suggest_titles(query: str, db: Union[str, TinyDB, SongStorage],
+                   limit: int) -> List[Document]:
+    """ Suggests songs for a search that found nothing, whose title is close to the one searched for, e.g. misspelled.
+    Only searches for a title alone get suggestions.
+    :param query: The search, e.g. "sigatrv".
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :param limit: The most suggestions returned.
+    :return: The summaries of the charts suggested, see SongStorage.fuzzy_search.
+    """
+    compiledQuery = compileQuery(query)
+    if compiledQuery is None or compiledQuery.node is None or compiledQuery.node.get(
+            "tag") != "title":
+        return []
+
+    storage = as_song_storage(db)
+    try:
+        return storage.fuzzy_search(compiledQuery.node["value"], limit)
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def similar_charts(doc_id: int, db: Union[str, TinyDB, SongStorage],
+                   limit: int) -> List[Document]:
+    """ Finds the charts most like a chart, by their breakdown and density. Only the SongCatalog has the index needed,
+    other storages return nothing.
+    :param doc_id: The ID of the chart.
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :param limit: The most charts returned.
+    :return: The summaries of the charts found, most similar first, see SongStorage.similar.
+    """
+    storage = as_song_storage(db)
+    try:
+        return storage.similar(doc_id, limit)
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def autocomplete(text: str, db: Union[str, TinyDB, SongStorage], field: str,
+                 limit: int) -> List[str]:
+    """ Completes a title or artist being typed, e.g. for the autocompletion of a Discord slash command. Only the
+    SongCatalog has the index needed, other storages return nothing.
+    :param text: What has been typed so far.
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :param field: "title" or "artist".
+    :param limit: The most values returned. Discord shows up to 25.
+    :return: The titles or artists with a word starting with the text.
+    """
+    storage = as_song_storage(db)
+    try:
+        return storage.autocomplete(text, field, limit)
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def find_duplicates(db: Union[str, TinyDB, SongStorage],
+                    threshold: float = DUPLICATE_THRESHOLD) -> List[List[Document]]:
+    """ Groups the charts that are near-duplicates of each other, e.g. edited re-releases or copies with another offset,
+    see DuplicateIndex. Charts scanned before MinHash signatures were stored are left out until they are scanned again.
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :param threshold: The smallest estimated similarity, between 0 and 1, for two charts to be near-duplicates.
+    :return: Each group of at least two charts.
+    """
+    storage = as_song_storage(db)
+    try:
+        charts = {chart.doc_id: chart for chart in storage.all()}
+    finally:
+        if isinstance(db, str):
+            storage.close()
 
-    db_param_is_string = False
+    clusters = DuplicateIndex(charts.values()).clusters(threshold)
+    return [[charts[doc_id] for doc_id in cluster] for cluster in clusters]
 
-    if isinstance(db, str):
-        db = TinyDB(db)
-        db_param_is_string = True
 
-    results = db.search(Query().pack.search(pack_name, flags=re.IGNORECASE))
+def delete_pack_search_results(pack_name: str, db: Union[str, TinyDB,
+                                                         SongStorage]):
+    """ When deleting a pack, this will return a list of all songs that will be updated/deleted
+    """
+    storage = as_song_storage(db)
+    try:
+        results = storage.get_pack(pack_name)
+    finally:
+        if isinstance(db, str):
+            storage.close()
 
     songs_to_update = {}
     songs_to_delete = {}
 
     if len(results) == 0:
         return 0
-    elif len(results) >= 1:
-        for r in results:
-            packs = r["pack"].split(",")
-            if len(packs) > 1:
-                songs_to_update[r.doc_id] = r["title"]
-            else:
-                songs_to_delete[r.doc_id] = r["title"]
-        if db_param_is_string:
-            db.close()
-        return songs_to_update, songs_to_delete
-    else:
-        return -1
-
-
-def delete_by_ids(ids, db):
-    db_param_is_string = False
-
-    if isinstance(db, str):
-        db = TinyDB(db)
-        db_param_is_string = True
 
-    db.remove(doc_ids=ids)
+    for r in results:
+        if len(get_packs(r)) > 1:
+            songs_to_update[r.doc_id] = r["title"]
+        else:
+            songs_to_delete[r.doc_id] = r["title"]
 
-    if isinstance(db, str):
-        db.close()
+    return songs_to_update, songs_to_delete
 
-    return True
 
-
-def remove_pack_from_songs_by_id(pack, ids, db):
-    db_param_is_string = False
-
-    if isinstance(db, str):
-        db = TinyDB(db)
-        db_param_is_string = True
-
-    for id in ids:
-        result = db.get(doc_id=id)
-        packs = result["pack"]
-        packs = packs.split(",")
-        for i, p in enumerate(packs):
-            if re.search(pack, p, re.IGNORECASE):
-                if i < len(packs):
-                    # remove prepending space in next element if it exists
-                    packs[i + 1] = packs[i + 1].strip()
-                # delete from packs array
-                del packs[i]
-        db.update({"pack": ", ".join(packs)}, doc_ids=[id])
-
-    if isinstance(db, str):
-        db.close()
-
-    return True
+def delete_pack(pack_name: str, db: Union[str, TinyDB, SongStorage]) -> dict:
+    """ Deletes a pack from the database. Songs only in that pack are deleted, and the pack is removed from the list of
+    packs of every other song in it. Every change is computed in memory and written to the database at once.
+    :param pack_name: The name of the pack, matched exactly but ignoring case.
+    :param db: The name of the database, or the TinyDB/SongStorage object for that database.
+    :return: Dict with the number of songs "updated" and "deleted", and the "seconds" it took.
+    """
+    start = time.perf_counter()
+
+    def remove_pack(song):
+        song["pack"] = [
+            p for p in get_packs(song) if not has_pack([p], pack_name)
+        ]
+
+    storage = as_song_storage(db)
+    try:
+        with storage.transaction():
+            updates = []
+            deletes = []
+            for song in storage.get_pack(pack_name):
+                if len(get_packs(song)) > 1:
+                    updates.append(song.doc_id)
+                else:
+                    deletes.append(song.doc_id)
+            if updates:
+                storage.update(remove_pack, updates)
+            if deletes:
+                storage.remove(deletes)
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+    return {
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "seconds": time.perf_counter() - start
+    }
 
 
 def pack_exists(pack_name, db):
-    db_param_is_string = False
-
-    if isinstance(db, str):
-        db = TinyDB(db)
-        db_param_is_string = True
-
-    results = db.search(Query().pack.search(pack_name, flags=re.IGNORECASE))
-
-    if results:
-        return True
-    else:
-        return False
+    storage = as_song_storage(db)
+    try:
+        return storage.pack_exists(pack_name)
+    finally:
+        if isinstance(db, str):
+            storage.close()
+
+
+def list_packs(db) -> List[str]:
+    """ Returns the name of every pack in the database, sorted alphabetically. """
+    storage = as_song_storage(db)
+    try:
+        return storage.pack_names()
+    finally:
+        if isinstance(db, str):
+            storage.close()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Finds near-duplicate charts, e.g. edited re-releases or copies with another offset, from their MinHash signatures.
+
+See helpers.FingerprintHelper for how signatures are made. Comparing every pair of charts would take O(n²) comparisons,
+so the DuplicateIndex uses locality sensitive hashing instead: each signature is cut into LSH_BANDS bands, and charts
+whose signatures are identical in at least one band land in the same bucket. Only charts sharing a bucket are compared.
+With 16 bands of 4 values, charts with a similarity of 0.8 share a bucket more than 99.9% of the time, while charts
+below 0.3 rarely do.
+
+To list the clusters of near-duplicate charts in a database, see db.duplicates.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from tinydb.table import Document
+from typing import Dict, Iterable, List, Set, Tuple
+
+from helpers.FingerprintHelper import SIGNATURE_LENGTH, estimate_similarity, get_minhash
+
+LSH_BANDS = 16
+BAND_SIZE = SIGNATURE_LENGTH // LSH_BANDS
+# Smallest estimated similarity for two charts to be near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+
+class DuplicateIndex(object):
+    """ Band of a MinHash signature -> IDs of the charts with that band. Charts without a signature aren't indexed. """
+
+    def __init__(self, charts: Iterable[Document] = ()):
+        self.signatures: Dict[int, List[int]] = {}
+        self.buckets: Dict[Tuple[int, tuple], List[int]] = {}
+        for chart in charts:
+            signature = get_minhash(chart)
+            if signature:
+                self.add(chart.doc_id, signature)
+
+    @staticmethod
+    def _bands(signature: List[int]):
+        for band in range(LSH_BANDS):
+            yield band, tuple(signature[band * BAND_SIZE:(band + 1) *
+                                        BAND_SIZE])
+
+    def add(self, doc_id: int, signature: List[int]):
+        self.signatures[doc_id] = signature
+        for key in self._bands(signature):
+            self.buckets.setdefault(key, []).append(doc_id)
+
+    def near_duplicates(
+            self,
+            signature: List[int],
+            threshold: float = DUPLICATE_THRESHOLD) -> List[Tuple[int, float]]:
+        """ Returns the charts whose signature is similar to the signature.
+
+        @param threshold: The smallest estimated similarity of the charts returned.
+        @return: (chart ID, estimated similarity) of each chart found, most similar first.
+        """
+        candidates = set()
+        for key in self._bands(signature):
+            candidates.update(self.buckets.get(key, ()))
+        found = [(doc_id,
+                  estimate_similarity(signature, self.signatures[doc_id]))
+                 for doc_id in candidates]
+        return sorted([(doc_id, similarity) for doc_id, similarity in found
+                       if similarity >= threshold],
+                      key=lambda match: (-match[1], match[0]))
+
+    def clusters(self, threshold: float = DUPLICATE_THRESHOLD) -> List[List[int]]:
+        """ Groups the charts that are near-duplicates of each other, directly or through another chart.
+
+        @param threshold: The smallest estimated similarity for two charts to be near-duplicates.
+        @return: The IDs of the charts in each group of at least two charts, sorted.
+        """
+        parents: Dict[int, int] = {}
+
+        def find(doc_id: int) -> int:
+            root = doc_id
+            while parents.get(root, root) != root:
+                root = parents[root]
+            while doc_id != root:
+                doc_id, parents[doc_id] = parents.get(doc_id, doc_id), root
+            return root
+
+        compared: Set[Tuple[int, int]] = set()
+        for bucket in self.buckets.values():
+            for i, first in enumerate(bucket):
+                for second in bucket[i + 1:]:
+                    if (first, second) in compared or find(first) == find(
+                            second):
+                        continue
+                    compared.add((first, second))
+                    if estimate_similarity(
+                            self.signatures[first],
+                            self.signatures[second]) >= threshold:
+                        parents[find(second)] = find(first)
+
+        groups: Dict[int, List[int]] = {}
+        for doc_id in list(parents):
+            groups.setdefault(find(doc_id), []).append(doc_id)
+        clusters = []
+        for root, members in groups.items():
+            members = set(members)
+            members.add(root)
+            if len(members) > 1:
+                clusters.append(sorted(members))
+        return sorted(clusters)
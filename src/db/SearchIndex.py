@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""In-memory indexes used by the SongCatalog to narrow down a search before the query is evaluated.
+
+Text tags (title, subtitle, artist and stepartist) are searched as plain text in their folded search key, or as case
+insensitive regular expressions (see SongStorage.compileNode), which would mean testing every chart. The TrigramIndex
+maps every three character sequence of the casefolded fields and their search keys to the charts containing it. A
+search value such as "brilliant" must appear in any chart it matches, so only the charts containing all of its trigrams
+("bri", "ril", "ill", ...) are candidates. The query is then evaluated against those candidates only, so the results
+are the same as a full scan.
+
+Values that can't be narrowed down this way (shorter than three characters, or using regex features such as
+alternation or groups) fall back to checking every chart.
+
+Range tags (see SongStorage.RANGE_TAGS) use a NumericIndex per field: the charts sorted by that field, so the charts
+within a range are found with two binary searches. This includes the pattern metrics, such as mono and the candle
+density, which is computed from other fields when the index is built (see SongStorage.DERIVED_FIELDS). A search on
+several of them, e.g. "-candledensity:0.2- -mono:10- -totalstream:150+", intersects the ranges cheapest first.
+
+A random chart matching a search (see SongCatalog.random_chart) is picked from the smallest of those ranges, without
+finding every match first.
+
+Queries with OR, NOT and parentheses are planned by SearchIndex.candidates. The number of charts each tag can match is
+estimated from the indexes (the smallest trigram posting, or the size of the range), then the candidates of an 'and'
+are intersected cheapest first, and those of an 'or' are combined. Once few enough candidates remain, the remaining tags
+are left to the query itself rather than building large sets just to intersect them. NOT can't narrow a search down.
+
+When a title search finds nothing, the FuzzyIndex suggests the titles closest to it instead, e.g. "sigatrv" suggests
+"Sigatrev". Every word is split into trigrams padded with spaces, and the titles sharing the most of them with the
+search win. Each distinct title is indexed once, and only the titles containing one of the rarest trigrams of the search
+are compared to it.
+
+Autocompletion uses a PrefixIndex per field: the search key of every title (or artist) starting at each of its words,
+sorted, so what's typed is completed with a binary search and a scan of the matching entries only.
+
+The FuzzyIndex and PrefixIndex work on search keys, so they ignore accents and also match transliterated titles.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from tinydb.table import Document
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+import random
+import re
+
+from .SongStorage import RANGE_TAGS, fold_text, get_number, get_query_tree, get_search_key, is_literal
+
+# Chart fields indexed by the TrigramIndex
+TRIGRAM_FIELDS = ("title", "subtitle", "artist", "stepartist")
+
+# If a value contains any of these, we can't tell which characters a match must contain
+REGEX_UNSUPPORTED = set("|()[]{}\\")
+# Characters that make the preceding character optional
+REGEX_OPTIONAL = set("?*")
+# Other regex characters, which match something other than themselves
+REGEX_SPECIAL = set(".^$+")
+
+# When planning an 'and', stop intersecting once the next tag could match this many times more charts than the
+# candidates left. Evaluating the query against those candidates is cheaper than building the set.
+VERIFY_RATIO = 8
+
+# Chart fields that can be autocompleted, see PrefixIndex
+PREFIX_FIELDS = ("title", "artist")
+
+# Share of the trigrams of a search a title must contain to be suggested by the FuzzyIndex
+FUZZY_MIN_SIMILARITY = 0.5
+
+
+def get_trigrams(text: str) -> Set[str]:
+    """ Returns every three character sequence in the text, after casefolding it. """
+    text = text.casefold()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def get_word_trigrams(text: str) -> Set[str]:
+    """ Returns the trigrams of every word in the casefolded text. Words are padded with spaces, so their first and last
+    characters, and words shorter than three characters, have trigrams too.
+    """
+    trigrams = set()
+    for word in re.findall(r"\w+", text.casefold()):
+        word = "  " + word + " "
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def get_required_literals(pattern: str) -> List[str]:
+    """ Returns the parts of a search value that every match must contain.
+
+    @param pattern: The value searched for, a regular expression.
+    @return: The literal runs of the value at least three characters long. Empty if the value can't be narrowed down.
+    """
+    if any(c in REGEX_UNSUPPORTED for c in pattern):
+        return []
+    literals = []
+    current = ""
+    for c in pattern:
+        if c in REGEX_OPTIONAL:
+            literals.append(current[:-1])
+            current = ""
+        elif c in REGEX_SPECIAL:
+            literals.append(current)
+            current = ""
+        else:
+            current += c
+    literals.append(current)
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class TrigramIndex(object):
+    """ Field -> trigram -> IDs of the charts with that trigram in the field. """
+
+    def __init__(self, charts: Iterable[Document], fields=TRIGRAM_FIELDS):
+        self.postings: Dict[str, Dict[str, Set[int]]] = {
+            field: {}
+            for field in fields
+        }
+        for chart in charts:
+            for field, postings in self.postings.items():
+                value = chart.get(field)
+                if not value:
+                    continue
+                # Regular expressions are matched against the value, plain text against the search key
+                trigrams = get_trigrams(str(value)) | get_trigrams(
+                    get_search_key(chart, field))
+                for trigram in trigrams:
+                    postings.setdefault(trigram, set()).add(chart.doc_id)
+
+    def candidates(self, field: str, pattern: str) -> Optional[Set[int]]:
+        """ Returns the IDs of the charts which may match the value in the field.
+
+        @param field: The chart field searched.
+        @param pattern: The value searched for.
+        @return: A superset of the IDs of the matching charts, or None if the value can't be narrowed down.
+        """
+        postings = self._get_postings(field, pattern)
+        if postings is None:
+            return None
+        # Intersect the smallest sets first, so the result shrinks as fast as possible
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+
+    def estimate(self, field: str, pattern: str) -> Optional[int]:
+        """ Returns the most charts which may match the value in the field, or None if it can't be narrowed down. """
+        postings = self._get_postings(field, pattern)
+        if postings is None:
+            return None
+        return min(len(posting) for posting in postings)
+
+    def _get_postings(self, field: str, pattern: str) -> Optional[List[Set[int]]]:
+        postings = self.postings.get(field)
+        if postings is None:
+            return None
+        trigrams = set()
+        literals = [fold_text(pattern)] if is_literal(
+            pattern) else get_required_literals(pattern)
+        for literal in literals:
+            trigrams |= get_trigrams(literal)
+        if not trigrams:
+            return None
+        return [postings.get(trigram, set()) for trigram in trigrams]
+
+
+class NumericIndex(object):
+    """ The charts sorted by a numeric field. Charts without a value for the field aren't indexed. """
+
+    def __init__(self, charts: Iterable[Document], field: str):
+        entries = []
+        for chart in charts:
+            value = get_number(chart, field)
+            if value is not None:
+                entries.append((value, chart.doc_id))
+        entries.sort()
+        # Stored as arrays of machine numbers, so the many numeric fields stay compact
+        self.values = array("d", [value for value, _ in entries])
+        self.doc_ids = array("q", [doc_id for _, doc_id in entries])
+
+    def _bounds(self, minimum: Optional[float], maximum: Optional[float]):
+        start = 0 if minimum is None else bisect_left(self.values, minimum)
+        end = len(self.values) if maximum is None else bisect_right(
+            self.values, maximum)
+        return start, max(start, end)
+
+    def range(self, minimum: Optional[float],
+              maximum: Optional[float]) -> Set[int]:
+        """ Returns the IDs of the charts with a value within the range. A bound of None means unbounded. """
+        start, end = self._bounds(minimum, maximum)
+        return set(self.doc_ids[start:end])
+
+    def count(self, minimum: Optional[float], maximum: Optional[float]) -> int:
+        """ Returns the number of charts with a value within the range. """
+        start, end = self._bounds(minimum, maximum)
+        return end - start
+
+    def sampler(self, minimum: Optional[float],
+                maximum: Optional[float]) -> Tuple[int, Callable[[], int]]:
+        """ Returns the number of charts with a value within the range, and a function picking the ID of one of them at
+        random. The function must not be called if there are none.
+        """
+        start, end = self._bounds(minimum, maximum)
+        return end - start, lambda: self.doc_ids[random.randrange(start, end)]
+
+
+class FuzzyIndex(object):
+    """ Finds the charts whose title is closest to a search, even if it's misspelled. """
+
+    def __init__(self, charts: Iterable[Document], field: str = "title"):
+        # Per distinct title search key: the IDs of its charts and its trigrams
+        self.doc_ids: List[List[int]] = []
+        self.trigrams: List[FrozenSet[str]] = []
+        # Trigram -> numbers of the titles containing it
+        self.postings: Dict[str, List[int]] = {}
+        numbers: Dict[str, int] = {}
+        for chart in charts:
+            value = chart.get(field)
+            if not value:
+                continue
+            key = get_search_key(chart, field)
+            number = numbers.get(key)
+            if number is None:
+                number = numbers[key] = len(self.doc_ids)
+                trigrams = frozenset(get_word_trigrams(key))
+                self.doc_ids.append([])
+                self.trigrams.append(trigrams)
+                for trigram in trigrams:
+                    self.postings.setdefault(trigram, []).append(number)
+            self.doc_ids[number].append(chart.doc_id)
+
+    def search(self, text: str, limit: int) -> List[int]:
+        """ Returns the IDs of the charts whose title is the most similar to the text, most similar first.
+
+        Titles are ranked by the number of the text's trigrams they contain, then shortest first. Titles containing
+        fewer than FUZZY_MIN_SIMILARITY of them aren't returned.
+        @param limit: The most IDs returned.
+        """
+        trigrams = get_word_trigrams(fold_text(text))
+        if not trigrams:
+            return []
+        minimum = max(1, math.ceil(len(trigrams) * FUZZY_MIN_SIMILARITY))
+        # A title with enough of the trigrams has at least one of the rarest len - minimum + 1, so only the titles
+        # containing one of those are compared
+        rarest = sorted(trigrams,
+                        key=lambda trigram: len(self.postings.get(trigram, ())))
+        candidates = set()
+        for trigram in rarest[:len(trigrams) - minimum + 1]:
+            candidates.update(self.postings.get(trigram, ()))
+
+        ranked = []
+        for number in candidates:
+            shared = len(trigrams & self.trigrams[number])
+            if shared >= minimum:
+                ranked.append((-shared, len(self.trigrams[number]), number))
+        # Every title has at least one chart, so no more than limit titles are needed
+        doc_ids = []
+        for _, _, number in heapq.nsmallest(limit, ranked):
+            doc_ids += self.doc_ids[number]
+        return doc_ids[:limit]
+
+
+class PrefixIndex(object):
+    """ The distinct values of a field, sorted by every suffix of their search key starting at a word. """
+
+    def __init__(self, charts: Iterable[Document], field: str):
+        entries = set()
+        for chart in charts:
+            value = chart.get(field)
+            if not value:
+                continue
+            value = str(value)
+            key = get_search_key(chart, field)
+            for word in re.finditer(r"\w+", key):
+                entries.add((key[word.start():], value))
+        entries = sorted(entries)
+        self.keys: List[str] = [key for key, _ in entries]
+        self.values: List[str] = [value for _, value in entries]
+
+    def complete(self, text: str, limit: int) -> List[str]:
+        """ Returns the values with a word starting with the text, ignoring case and accents, sorted by the text
+        matched.
+
+        @param text: What has been typed so far, e.g. "brillian".
+        @param limit: The most values returned.
+        """
+        prefix = fold_text(text).lstrip()
+        if not prefix or limit <= 0:
+            return []
+        values = []
+        for i in range(bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            if self.values[i] not in values:
+                values.append(self.values[i])
+                if len(values) == limit:
+                    break
+        return values
+
+
+class SearchIndex(object):
+    """ Every index of a snapshot of the song database. """
+
+    def __init__(self, charts: List[Document]):
+        self.size = len(charts)
+        self.trigrams = TrigramIndex(charts)
+        self.fuzzy = FuzzyIndex(charts)
+        self.prefixes: Dict[str, PrefixIndex] = {
+            field: PrefixIndex(charts, field)
+            for field in PREFIX_FIELDS
+        }
+        self.numbers: Dict[str, NumericIndex] = {
+            field: NumericIndex(charts, field)
+            for fields in RANGE_TAGS.values() for field in fields
+        }
+
+    def _range_bounds(self, key: str, value):
+        """ Returns the (NumericIndex, minimum, maximum) to look up for a range tag. """
+        low_field, high_field = RANGE_TAGS[key]
+        minimum, maximum = value
+        if low_field == high_field:
+            return [(self.numbers[low_field], minimum, maximum)]
+        bounds = []
+        if minimum is not None:
+            bounds.append((self.numbers[low_field], minimum, None))
+        if maximum is not None:
+            bounds.append((self.numbers[high_field], None, maximum))
+        return bounds
+
+    def estimate(self, node: dict) -> int:
+        """ Returns the most charts which may match a node of the query tree, according to the indexes. """
+        if "tag" in node:
+            key, value = node["tag"], node["value"]
+            if key in RANGE_TAGS:
+                return min((index.count(minimum, maximum)
+                            for index, minimum, maximum in self._range_bounds(
+                                key, value)),
+                           default=self.size)
+            estimate = self.trigrams.estimate(key, value)
+            return self.size if estimate is None else estimate
+        if "not" in node:
+            return self.size
+        if "and" in node:
+            return min(self.estimate(child) for child in node["and"])
+        return min(self.size, sum(self.estimate(child) for child in node["or"]))
+
+    def candidates(self, queryObject: dict) -> Optional[Set[int]]:
+        """ Returns the IDs of the charts which may match the query, or None if the indexes can't narrow the search
+        down. The query still has to be evaluated against the charts returned.
+        """
+        node = get_query_tree(queryObject)
+        if node is None:
+            return None
+        return self._node_candidates(node)
+
+    def sampler(self, queryObject: dict) -> Optional[Tuple[int, Callable[[], int]]]:
+        """ Returns a function picking the ID of a chart at random, from the smallest range of a NumericIndex every
+        chart matching the query is within, and the number of charts in that range. None if the query has no such
+        range, i.e. it isn't a range tag or an 'and' of tags including one. The query still has to be evaluated against
+        the charts picked.
+        """
+        node = get_query_tree(queryObject)
+        if node is None:
+            return None
+        best = None
+        for child in node.get("and", [node]):
+            if child.get("tag") not in RANGE_TAGS:
+                continue
+            for index, minimum, maximum in self._range_bounds(
+                    child["tag"], child["value"]):
+                sampler = index.sampler(minimum, maximum)
+                if best is None or sampler[0] < best[0]:
+                    best = sampler
+        return best
+
+    def _node_candidates(self, node: dict) -> Optional[Set[int]]:
+        if "tag" in node:
+            return self._tag_candidates(node["tag"], node["value"])
+        if "not" in node:
+            return None
+
+        if "or" in node:
+            result = set()
+            for child in node["or"]:
+                candidates = self._node_candidates(child)
+                if candidates is None:
+                    return None
+                result |= candidates
+            return result
+
+        result = None
+        for estimate, child in sorted(
+            ((self.estimate(child), child) for child in node["and"]),
+                key=lambda plan: plan[0]):
+            if estimate >= self.size:
+                break
+            if result is not None and estimate > len(result) * VERIFY_RATIO:
+                break
+            candidates = self._node_candidates(child)
+            if candidates is None:
+                continue
+            result = candidates if result is None else result & candidates
+            if not result:
+                break
+        return result
+
+    def _tag_candidates(self, key: str, value) -> Optional[Set[int]]:
+        if key not in RANGE_TAGS:
+            return self.trigrams.candidates(key, value)
+        bounds = sorted(self._range_bounds(key, value),
+                        key=lambda bound: bound[0].count(bound[1], bound[2]))
+        if not bounds:
+            return None
+        result = None
+        for index, minimum, maximum in bounds:
+            candidates = index.range(minimum, maximum)
+            result = candidates if result is None else result & candidates
+        return result
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""An in-memory, read-optimized snapshot of the song database, shared by every bot command.
+
+Opening the database for every search means parsing the whole db.json (or reading every SQLite row) before the query can
+even be evaluated. The SongCatalog loads the database once and answers reads from memory. Before each read it checks the
+generation of the database file (its modification time and size). If another process, such as scan.py or -dlpack, has
+written to it since, a new snapshot is built in a background thread and then swapped in with a single assignment, so a
+command never sees a half loaded snapshot. Building a snapshot takes seconds for a large database, and the file changes
+with every batch scan.py commits, so reads keep being answered from the previous snapshot until the new one is ready,
+rather than waiting for it.
+
+Searches are narrowed down with the indexes in SearchIndex before the query is evaluated. The IDs of the charts found
+by the most recent searches are kept with the snapshot, keyed by the text of the search (see DBManager.compileQuery), so
+repeating a search doesn't evaluate it again. A title search that finds nothing can be retried with fuzzy_search, which
+suggests similar titles from the FuzzyIndex. Titles and artists being typed are completed by autocomplete from the
+PrefixIndex, without running a search. Charts like another one are found by similar, from a VectorIndex built the first
+time it's needed. A random chart matching a search is picked by random_chart, usually without finding every match.
+Each snapshot starts with an empty cache, so a search never returns results from before the database changed.
+
+Writes go to the underlying SongStorage and the snapshot is reloaded in the background afterwards, so reads may not see
+them right away. Writes made inside "with catalog.transaction():" are committed together and the snapshot is only
+reloaded once, at the end; reads inside the block still see the snapshot from before it. Documents returned by the
+catalog are shared between commands and must not be modified.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from tinydb.table import Document
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+import logging
+import os
+import random
+import threading
+
+from helpers.SimilarityHelper import get_chart_vector
+from .SearchIndex import SearchIndex
+from .SongStorage import SEARCH_KEY_FIELDS, CompiledQuery, PackIndex, SearchPage, SongStorage, add_search_keys, \
+    get_summary, open_song_storage
+from .VectorIndex import ExactVectorIndex, VectorIndex
+
+# Number of searches whose results are kept, per snapshot
+RESULT_CACHE_SIZE = 128
+
+# Charts picked at random by random_chart before it finds every match instead
+RANDOM_ATTEMPTS = 32
+
+# Index used to find similar charts. ExactVectorIndex compares every chart, which is fast enough for tens of thousands
+# of charts. Replace it with another VectorIndex, e.g. an approximate one, for larger databases.
+VECTOR_INDEX = ExactVectorIndex
+
+
+class CatalogSnapshot(object):
+    """ Every chart in the database at a given generation.
+
+    The charts and their indexes are never modified once the snapshot is built. Only the result cache changes
+    afterwards, besides the vector index being built the first time similar charts are looked up.
+    """
+
+    def __init__(self,
+                 records: List[Document],
+                 generation: Tuple[int, int],
+                 result_cache_size: int = RESULT_CACHE_SIZE):
+        # Charts scanned before search keys were stored get them once here, instead of on every search
+        for record in records:
+            if any(field + "_key" not in record
+                   for field in SEARCH_KEY_FIELDS):
+                add_search_keys(record)
+        self.records = records
+        self.by_id: Dict[int, Document] = {
+            record.doc_id: record
+            for record in records
+        }
+        self.by_md5: Dict[str, Document] = {
+            record["md5"]: record
+            for record in records
+        }
+        self.packs = PackIndex(records)
+        self.index = SearchIndex(records)
+        self.generation = generation
+        self._vectors = None  # built the first time similar charts are looked up
+        # Search key -> IDs of the charts found, least recently used first
+        self.results: Dict[str, List[int]] = OrderedDict()
+        self.result_cache_size = result_cache_size
+
+    def vectors(self) -> VectorIndex:
+        if self._vectors is None:
+            self._vectors = VECTOR_INDEX(self.records)
+        return self._vectors
+
+    def get_results(self, key: str) -> List[int]:
+        doc_ids = self.results.get(key)
+        if doc_ids is not None:
+            self.results.move_to_end(key)
+        return doc_ids
+
+    def cache_results(self, key: str, doc_ids: List[int]):
+        if self.result_cache_size <= 0:
+            return
+        self.results[key] = doc_ids
+        if len(self.results) > self.result_cache_size:
+            self.results.popitem(last=False)
+
+
+class SongCatalog(SongStorage):
+    """ Read model of the song database, reloaded when the database file changes. """
+
+    def __init__(self, path: str, result_cache_size: int = RESULT_CACHE_SIZE):
+        """
+        @param path: The name of the database, see SongStorage.open_song_storage.
+        @param result_cache_size: Number of searches whose results are kept. 0 disables the cache.
+        """
+        self.path = path
+        self.result_cache_size = result_cache_size
+        self._storage = None  # the storage being written to, while a transaction is open
+        self._snapshot = CatalogSnapshot([], None)
+        # Builds new snapshots off the caller's thread, see reload_in_background
+        self._loader = ThreadPoolExecutor(max_workers=1)
+        self._loading: Optional[Future] = None
+        self._loading_lock = threading.Lock()
+        self.reload()
+
+    def _current_generation(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """ Loads a new snapshot of the database, waiting until it's built.
+
+        @return: True if the snapshot was replaced. If the database can't be read (e.g. it's being written to), the
+        current snapshot is kept and we try again on the next read.
+        """
+        generation = self._current_generation()
+        if generation is None:
+            self._snapshot = CatalogSnapshot([], None, self.result_cache_size)
+            return True
+        # noinspection PyBroadException
+        try:
+            with open_song_storage(self.path) as storage:
+                records = storage.all()
+        except Exception as e:
+            logging.warning(
+                "Unable to load the song database \"{}\", keeping the previous snapshot."
+                .format(self.path),
+                exc_info=True)
+            return False
+        self._snapshot = CatalogSnapshot(records, generation,
+                                         self.result_cache_size)
+        logging.info("Loaded {} chart(s) from \"{}\".".format(
+            len(records), self.path))
+        return True
+
+    def reload_in_background(self) -> Future:
+        """ Starts loading a new snapshot in a background thread, unless one is already being loaded. The current
+        snapshot keeps being used until the new one is swapped in.
+
+        @return: The Future of the load, see reload.
+        """
+        with self._loading_lock:
+            if self._loading is None or self._loading.done():
+                self._loading = self._loader.submit(self.reload)
+            return self._loading
+
+    def snapshot(self) -> CatalogSnapshot:
+        """ Returns the current snapshot. If the database file has changed, a new one is loaded in the background. """
+        if self._current_generation() != self._snapshot.generation:
+            self.reload_in_background()
+        return self._snapshot
+
+    def all(self) -> List[Document]:
+        return list(self.snapshot().records)
+
+    def get(self, doc_id: int) -> Document:
+        return self.snapshot().by_id.get(doc_id)
+
+    def get_by_md5(self, md5: str) -> Document:
+        return self.snapshot().by_md5.get(md5)
+
+    @staticmethod
+    def _candidates(snapshot: CatalogSnapshot,
+                    query: CompiledQuery) -> List[Document]:
+        """ Returns the charts the query has to be tested against, in doc ID order. """
+        candidates = snapshot.index.candidates(query.node)
+        if candidates is None:
+            return snapshot.records
+        return [snapshot.by_id[doc_id] for doc_id in sorted(candidates)]
+
+    def search(self, queryObject: Union[dict, CompiledQuery]) -> List[Document]:
+        query = queryObject if isinstance(
+            queryObject, CompiledQuery) else CompiledQuery(queryObject)
+        if query.node is None:
+            return []
+        snapshot = self.snapshot()
+
+        doc_ids = snapshot.get_results(query.key) if query.key else None
+        if doc_ids is None:
+            doc_ids = [
+                record.doc_id for record in self._candidates(snapshot, query)
+                if query(record)
+            ]
+            if query.key:
+                snapshot.cache_results(query.key, doc_ids)
+        return [snapshot.by_id[doc_id] for doc_id in doc_ids]
+
+    def iter_search(self, queryObject: Union[dict, CompiledQuery]) -> Iterator[Document]:
+        query = queryObject if isinstance(
+            queryObject, CompiledQuery) else CompiledQuery(queryObject)
+        if query.node is None:
+            return
+        snapshot = self.snapshot()
+
+        doc_ids = snapshot.get_results(query.key) if query.key else None
+        if doc_ids is not None:
+            for doc_id in doc_ids:
+                yield snapshot.by_id[doc_id]
+            return
+        for record in self._candidates(snapshot, query):
+            if query(record):
+                yield record
+
+    def search_page(self, queryObject: Union[dict, CompiledQuery],
+                    limit: int) -> SearchPage:
+        """ Like SongStorage.search_page, but stops testing charts once more than limit match. The total is then
+        estimated from the share of the charts tested so far that matched.
+        """
+        query = queryObject if isinstance(
+            queryObject, CompiledQuery) else CompiledQuery(queryObject)
+        if query.node is None:
+            return SearchPage([], 0, True)
+        snapshot = self.snapshot()
+
+        doc_ids = snapshot.get_results(query.key) if query.key else None
+        if doc_ids is not None:
+            return SearchPage([
+                get_summary(snapshot.by_id[doc_id])
+                for doc_id in doc_ids[:limit]
+            ], len(doc_ids), True)
+
+        records = self._candidates(snapshot, query)
+        doc_ids = []
+        tested = 0
+        for record in records:
+            tested += 1
+            if query(record):
+                doc_ids.append(record.doc_id)
+                if len(doc_ids) > limit:
+                    break
+        summaries = [
+            get_summary(snapshot.by_id[doc_id]) for doc_id in doc_ids[:limit]
+        ]
+        if tested == len(records):
+            if query.key:
+                snapshot.cache_results(query.key, doc_ids)
+            return SearchPage(summaries, len(doc_ids), True)
+        return SearchPage(summaries,
+                          round(len(doc_ids) * len(records) / tested), False)
+
+    def random_chart(self, queryObject: Union[dict, CompiledQuery] = None) -> Optional[Document]:
+        """ Like SongStorage.random_chart, but picks charts at random until one matches, from the smallest range of a
+        NumericIndex the matches are within (see SearchIndex.sampler), or from every chart. Each pick takes constant
+        time, and each match is as likely to be picked first as the others.
+
+        If RANDOM_ATTEMPTS picks in a row don't match, the matches are rare among the charts picked from. Every match is
+        then found with search instead, and its results are cached, so picking again for the same search is immediate.
+        """
+        snapshot = self.snapshot()
+        if queryObject is None:
+            return random.choice(snapshot.records) if snapshot.records else None
+        query = queryObject if isinstance(
+            queryObject, CompiledQuery) else CompiledQuery(queryObject)
+        if query.node is None:
+            return None
+
+        doc_ids = snapshot.get_results(query.key) if query.key else None
+        if doc_ids is None:
+            sampler = snapshot.index.sampler(query.node)
+            if sampler is None:
+                sampler = len(snapshot.records), lambda: random.choice(
+                    snapshot.records).doc_id
+            count, pick = sampler
+            if count == 0:
+                return None
+            for _ in range(RANDOM_ATTEMPTS):
+                chart = snapshot.by_id[pick()]
+                if query(chart):
+                    return chart
+            doc_ids = [
+                record.doc_id for record in self._candidates(snapshot, query)
+                if query(record)
+            ]
+            if query.key:
+                snapshot.cache_results(query.key, doc_ids)
+        return snapshot.by_id[random.choice(doc_ids)] if doc_ids else None
+
+    def fuzzy_search(self, text: str, limit: int) -> List[Document]:
+        snapshot = self.snapshot()
+        return [
+            get_summary(snapshot.by_id[doc_id])
+            for doc_id in snapshot.index.fuzzy.search(text, limit)
+        ]
+
+    def similar(self, doc_id: int, limit: int) -> List[Document]:
+        snapshot = self.snapshot()
+        chart = snapshot.by_id.get(doc_id)
+        vector = get_chart_vector(chart) if chart is not None else None
+        if vector is None:
+            return []
+        return [
+            get_summary(snapshot.by_id[similar_id])
+            for similar_id in snapshot.vectors().nearest(
+                vector, limit, [doc_id])
+        ]
+
+    def autocomplete(self, text: str, field: str, limit: int) -> List[str]:
+        prefixes = self.snapshot().index.prefixes.get(field)
+        if prefixes is None:
+            return []
+        return prefixes.complete(text, limit)
+
+    def get_pack(self, pack_name: str) -> List[Document]:
+        return list(self.snapshot().packs.get(pack_name))
+
+    def pack_names(self) -> List[str]:
+        return self.snapshot().packs.pack_names()
+
+    def _write(self, operation: Callable[[SongStorage], object]):
+        if self._storage is not None:
+            return operation(self._storage)
+        with open_song_storage(self.path) as storage:
+            result = operation(storage)
+        self.reload_in_background()
+        return result
+
+    @contextmanager
+    def transaction(self):
+        if self._storage is not None:
+            # Nested, the outermost transaction commits
+            yield
+            return
+        with open_song_storage(self.path) as storage:
+            with storage.transaction():
+                self._storage = storage
+                try:
+                    yield
+                finally:
+                    self._storage = None
+        self.reload_in_background()
+
+    def insert_multiple(self, records: Iterable[Mapping]) -> List[int]:
+        return self._write(lambda storage: storage.insert_multiple(records))
+
+    def update(self, fields: Union[Mapping, Callable[[dict], None]],
+               doc_ids: Iterable[int]):
+        self._write(lambda storage: storage.update(fields, doc_ids))
+
+    def remove(self, doc_ids: Iterable[int]):
+        self._write(lambda storage: storage.remove(doc_ids))
+
+    def __len__(self):
+        return len(self.snapshot().records)
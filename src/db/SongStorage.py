@@ -0,0 +1,910 @@
+# -*- coding: utf-8 -*-
+"""Storage backends for the song database created by scan.py.
+
+The scanner and the bot don't talk to TinyDB directly, they go through a SongStorage. Two backends are provided:
+
+- TinyDBSongStorage keeps the database as a single JSON document (db.json). Every write rewrites the file, and every
+  search is a scan over every chart. Fine for small libraries.
+- SQLiteSongStorage keeps the database in a SQLite file (e.g. db.sqlite), with indexes on the columns we look charts up
+  by: md5, title, artist, stepartist, rating and BPM. Each chart is stored as its JSON record, alongside copies of those
+  columns.
+
+A chart's "pack" is the list of packs it was found in. Pack membership is indexed: SQLite keeps it in a chart_packs join
+table, and TinyDB builds a PackIndex the first time a pack is looked up. Pack names are matched exactly, ignoring case.
+Databases created when "pack" was a comma separated string are still read correctly, see get_packs.
+
+open_song_storage picks the backend from the file extension. Existing db.json files can be copied to SQLite with
+"python -m db.migrate db.json db.sqlite".
+
+Writes made inside "with storage.transaction():" are committed together when the block ends. For SQLite this is a
+regular transaction. For TinyDB, the JSON file is written once at the end of the block instead of on every write. In
+both cases a crash leaves the database as it was before the transaction: SQLite rolls back, and TinyDB always writes
+to a temporary file that replaces db.json in one step, so db.json is never left half written.
+
+Text tags are also matched against a folded search key stored with each chart (e.g. "title_key"): the value and its
+transliteration (e.g. #TITLETRANSLIT) decomposed, without accents and casefolded, see fold_text. A search value without
+regex characters is folded the same way and found in the key as plain text, so "pokemon" finds "Pokémon" and a
+romanized title finds the native one. Other values are regular expressions, matched against both the field and its key.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from tinydb import TinyDB, where
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage
+from tinydb.table import Document
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+import json
+import os
+import random
+import re
+import sqlite3
+import unicodedata
+
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+# Text tags with a folded search key, see get_search_key
+SEARCH_KEY_FIELDS = ("title", "subtitle", "artist", "stepartist")
+# Characters with a special meaning in a regular expression. Values without any are searched as plain text.
+REGEX_CHARACTERS = set(".^$*+?{}[]\\|()")
+
+# Columns copied out of the JSON record so SQLite can index and filter on them
+SQLITE_COLUMNS = ("md5", "title", "subtitle", "artist", "stepartist", "rating",
+                  "min_bpm", "max_bpm") + tuple(
+                      field + "_key" for field in SEARCH_KEY_FIELDS)
+SQLITE_INDEXES = {
+    "charts_md5": "md5",
+    "charts_title": "title COLLATE NOCASE",
+    "charts_artist": "artist COLLATE NOCASE",
+    "charts_stepartist": "stepartist COLLATE NOCASE",
+    "charts_rating": "rating",
+    "charts_bpm": "min_bpm, max_bpm",
+}
+
+# Tags searched by range, e.g. "-rating:13-15", and the chart fields holding their (lowest, highest) value. A chart
+# matches if both are within the range. For BPM this means every BPM of the song, so "-bpm:160" finds songs with a
+# constant 160.
+RANGE_TAGS = {
+    "rating": ("rating", "rating"),
+    "bpm": ("min_bpm", "max_bpm"),
+    "nps": ("max_nps", "max_nps"),
+    "totalstream": ("total_stream", "total_stream"),
+    "totalbreak": ("total_break", "total_break"),
+    "length": ("length", "length"),
+    "candles": ("total_candles", "total_candles"),
+    "candledensity": ("candle_density", "candle_density"),
+    "mono": ("mono_percent", "mono_percent"),
+    "anchors": ("total_anchors", "total_anchors"),
+}
+
+# Anchor counts of a chart, one per arrow
+ANCHOR_FIELDS = ("anchor_left", "anchor_down", "anchor_up", "anchor_right")
+
+# Keys of the nodes of a query tree, see parser.queryParser
+QUERY_NODE_KEYS = ("tag", "and", "or", "not")
+
+# Format of the "length" field, e.g. "2m 5s"
+LENGTH_FORMAT = re.compile(r"(\d+)m (\d+)s")
+
+# Fields of a chart needed to list it in the search results, see get_summary
+SUMMARY_FIELDS = ("title", "subtitle", "artist", "stepartist", "difficulty",
+                  "rating", "pack")
+
+
+def fold_text(text: str) -> str:
+    """ Returns the text as it's searched: decomposed (NFKD), without accents and casefolded, e.g. "Pokémon" ->
+    "pokemon".
+    """
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def build_search_key(chart: Mapping, field: str) -> str:
+    """ Returns the folded value of a text field and its transliteration (e.g. "title_translit"), one per line. """
+    values = [chart.get(field), chart.get(field + "_translit")]
+    return "\n".join(
+        fold_text(str(value)) for value in values if value and value != "N/A")
+
+
+def get_search_key(chart: Mapping, field: str) -> str:
+    """ Returns the search key of a text field, built on the fly for charts scanned before keys were stored. """
+    key = chart.get(field + "_key")
+    if key is None:
+        key = build_search_key(chart, field)
+    return key
+
+
+def add_search_keys(chart: dict) -> dict:
+    """ Stores the search key of every text field in the chart, see build_search_key. Returns the chart. """
+    for field in SEARCH_KEY_FIELDS:
+        chart[field + "_key"] = build_search_key(chart, field)
+    return chart
+
+
+def is_literal(value: str) -> bool:
+    """ Whether a search value is plain text, without regex characters. """
+    return not any(c in REGEX_CHARACTERS for c in value)
+
+
+def to_number(field: str, value) -> Optional[float]:
+    """ Converts the value of a chart field to a number, so it can be compared with a range.
+
+    @param field: The name of the field. Length is converted to seconds. Rating is stored as a string.
+    @param value: The value of the field.
+    @return: The value as a number, or None if it isn't one.
+    """
+    if field == "length" and isinstance(value, str):
+        match = LENGTH_FORMAT.fullmatch(value)
+        if not match:
+            return None
+        return int(match.group(1)) * 60 + int(match.group(2))
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_candle_density(chart: Mapping) -> Optional[float]:
+    """ Returns the candles per measure of stream of a chart, 0 without stream. None if a field is missing. """
+    candles = to_number("total_candles", chart.get("total_candles"))
+    stream = to_number("total_stream", chart.get("total_stream"))
+    if candles is None or stream is None:
+        return None
+    return candles / stream if stream else 0.0
+
+
+def get_total_anchors(chart: Mapping) -> Optional[float]:
+    """ Returns the number of anchors of a chart on every arrow. None if a field is missing. """
+    counts = [to_number(field, chart.get(field)) for field in ANCHOR_FIELDS]
+    if None in counts:
+        return None
+    return sum(counts)
+
+
+# Fields computed from other fields of a chart rather than stored, and how SQLite computes them from the JSON record
+DERIVED_FIELDS = {
+    "candle_density": get_candle_density,
+    "total_anchors": get_total_anchors,
+}
+SQLITE_DERIVED_FIELDS = {
+    "candle_density":
+    "(CASE WHEN json_extract(data, '$.total_candles') IS NULL OR json_extract(data, '$.total_stream') IS NULL "
+    "THEN NULL WHEN json_extract(data, '$.total_stream') = 0 THEN 0.0 "
+    "ELSE json_extract(data, '$.total_candles') * 1.0 / json_extract(data, '$.total_stream') END)",
+    "total_anchors":
+    "(" + " + ".join("json_extract(data, '$." + field + "')"
+                     for field in ANCHOR_FIELDS) + ")",
+}
+
+
+def get_number(chart: Mapping, field: str) -> Optional[float]:
+    """ Returns the value of a numeric field of a chart, including the DERIVED_FIELDS, see to_number. """
+    if field in DERIVED_FIELDS:
+        return DERIVED_FIELDS[field](chart)
+    return to_number(field, chart.get(field))
+
+
+def in_range(value: Optional[float], minimum: Optional[float],
+             maximum: Optional[float]) -> bool:
+    """ Whether the value is within the range. A bound of None means unbounded. """
+    if value is None:
+        return False
+    return (minimum is None or value >= minimum) and (maximum is None
+                                                      or value <= maximum)
+
+
+def split_packs(packs) -> List[str]:
+    """ Returns the "pack" field of a chart as a list. Older databases stored it as a comma separated string. """
+    if not packs:
+        return []
+    if isinstance(packs, str):
+        return [pack.strip() for pack in packs.split(",")]
+    return list(packs)
+
+
+def get_packs(chart: Mapping) -> List[str]:
+    """ Returns the list of packs a chart is in. """
+    return split_packs(chart.get("pack"))
+
+
+def has_pack(packs: List[str], pack_name: str) -> bool:
+    """ Whether a list of packs contains the pack, ignoring case. """
+    key = pack_name.lower()
+    return any(pack.lower() == key for pack in packs)
+
+
+class PackIndex(object):
+    """ Pack name -> charts in that pack, with pack names matched ignoring case. """
+
+    def __init__(self, charts: Iterable[Document] = ()):
+        self.names: Dict[str, str] = {}  # lower case name -> name as first seen
+        self.charts: Dict[str, List[Document]] = {}
+        for chart in charts:
+            self.add(chart)
+
+    def add(self, chart: Document):
+        for pack in get_packs(chart):
+            key = pack.lower()
+            charts = self.charts.setdefault(key, [])
+            if not charts or charts[-1] is not chart:
+                self.names.setdefault(key, pack)
+                charts.append(chart)
+
+    def get(self, pack_name: str) -> List[Document]:
+        return self.charts.get(pack_name.lower(), [])
+
+    def pack_names(self) -> List[str]:
+        return sorted(self.names.values(), key=str.lower)
+
+
+def get_query_tree(queryObject: dict) -> Optional[dict]:
+    """ Returns the query object as a tree of nodes, see parser.queryParser.
+
+    A CompiledQuery returns the query object it was compiled from.
+    A flat dict of tag -> value, where every tag must match (e.g. {"title": "sigatrev", "rating": (20, 20)}), is
+    converted to an 'and' node. Tags without a value are ignored.
+    @return: The root node, or None if the query is empty.
+    """
+    if isinstance(queryObject, CompiledQuery):
+        return queryObject.node
+    if not queryObject:
+        return None
+    if any(key in queryObject for key in QUERY_NODE_KEYS):
+        return queryObject
+    nodes = [{
+        "tag": key,
+        "value": value
+    } for key, value in queryObject.items() if value]
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else {"and": nodes}
+
+
+def compileNode(node: dict) -> Callable[[Mapping], bool]:
+    """ Converts a node of a query tree to a function testing whether a chart matches it.
+
+    Range tags match if the chart's values are within the range. Plain text values must be in the folded search key,
+    other values are regular expressions matched ignoring case against the field or its search key.
+
+    @raise re.error: If a value isn't a valid regular expression.
+    """
+    if "not" in node:
+        test = compileNode(node["not"])
+        return lambda chart: not test(chart)
+    if "and" in node:
+        tests = [compileNode(child) for child in node["and"]]
+        return lambda chart: all(test(chart) for test in tests)
+    if "or" in node:
+        tests = [compileNode(child) for child in node["or"]]
+        return lambda chart: any(test(chart) for test in tests)
+
+    key, value = node["tag"], node["value"]
+    if key in RANGE_TAGS:
+        minimum, maximum = value
+        low_field, high_field = RANGE_TAGS[key]
+        return lambda chart: in_range(get_number(
+            chart, low_field), minimum, None) and in_range(
+                get_number(chart, high_field), None, maximum)
+    if key in SEARCH_KEY_FIELDS and is_literal(value):
+        text = fold_text(value)
+        return lambda chart: text in get_search_key(chart, key)
+    regex = re.compile(value, re.IGNORECASE)
+    if key == "pack":
+        return lambda chart: any(
+            regex.search(pack) for pack in get_packs(chart))
+    if key in SEARCH_KEY_FIELDS:
+        return lambda chart: (isinstance(chart.get(key), str) and regex.search(
+            chart[key]) is not None) or regex.search(
+                get_search_key(chart, key)) is not None
+    return lambda chart: isinstance(chart.get(key), str) and regex.search(
+        chart[key]) is not None
+
+
+class CompiledQuery(object):
+    """ A query object with its regular expressions compiled, ready to be tested against charts.
+
+    Every storage can be searched with one. Compiling a search once (see DBManager.compileQuery) saves parsing it and
+    compiling its regular expressions again when it's repeated.
+    """
+
+    def __init__(self, queryObject: dict, key: str = None):
+        """
+        @param queryObject: The query object, see get_query_tree.
+        @param key: The normalized text of the search, used to cache its results. None if it shouldn't be cached.
+        @raise re.error: If a value isn't a valid regular expression.
+        """
+        self.node = get_query_tree(queryObject)
+        self.key = key
+        self.test = compileNode(
+            self.node) if self.node is not None else lambda chart: False
+
+    def __call__(self, chart: Mapping) -> bool:
+        return self.test(chart)
+
+
+def get_summary(chart: Document) -> Document:
+    """ Returns a copy of the chart with only the fields in SUMMARY_FIELDS. It keeps the chart's doc_id, so the full
+    chart can be loaded with SongStorage.get once one is picked.
+    """
+    return Document({field: chart.get(field)
+                     for field in SUMMARY_FIELDS},
+                    doc_id=chart.doc_id)
+
+
+class SearchPage(object):
+    """ The first charts matching a search, see SongStorage.search_page. """
+
+    def __init__(self, summaries: List[Document], total: int, exact: bool):
+        """
+        @param summaries: The summaries of the first charts found, see get_summary.
+        @param total: The number of charts matching the search.
+        @param exact: False if total is an estimate.
+        """
+        self.summaries = summaries
+        self.total = total
+        self.exact = exact
+
+
+class SongStorage(ABC):
+    """ The operations the scanner and bot need from the song database.
+
+    Charts are returned as TinyDB Documents, i.e. a dict of the chart entry with a doc_id attribute, regardless of the
+    backend used.
+    """
+
+    @abstractmethod
+    def all(self) -> List[Document]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, doc_id: int) -> Document:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_by_md5(self, md5: str) -> Document:
+        raise NotImplementedError
+
+    def insert(self, record: Mapping) -> int:
+        return self.insert_multiple([record])[0]
+
+    @abstractmethod
+    def insert_multiple(self, records: Iterable[Mapping]) -> List[int]:
+        """ Inserts charts. Records that are Documents keep their doc_id. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, fields: Union[Mapping, Callable[[dict], None]],
+               doc_ids: Iterable[int]):
+        """ Updates charts, either with a dict of fields or a function that modifies the chart in place. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, doc_ids: Iterable[int]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, queryObject: Union[dict, CompiledQuery]) -> List[Document]:
+        """ Searches with a query object created by generateQueryObject, or a CompiledQuery. """
+        raise NotImplementedError
+
+    def iter_search(self, queryObject: Union[dict, CompiledQuery]) -> Iterator[Document]:
+        """ Yields the charts matching a query one at a time, in the same order as search, so the caller can stop
+        early.
+        """
+        yield from self.search(queryObject)
+
+    def search_page(self, queryObject: Union[dict, CompiledQuery],
+                    limit: int) -> SearchPage:
+        """ Returns the summaries of the first charts matching a query, and how many charts match.
+
+        @param limit: The most summaries returned.
+        """
+        summaries = []
+        total = 0
+        for chart in self.iter_search(queryObject):
+            if total < limit:
+                summaries.append(get_summary(chart))
+            total += 1
+        return SearchPage(summaries, total, True)
+
+    def random_chart(self, queryObject: Union[dict, CompiledQuery] = None) -> Optional[Document]:
+        """ Picks a chart at random among the charts matching a query, each as likely as the others. The matches are
+        read one at a time and only the chart picked so far is kept (reservoir sampling).
+
+        @param queryObject: The query, or None to pick among every chart.
+        @return: The chart picked, or None if no chart matches.
+        """
+        picked = None
+        charts = self if queryObject is None else self.iter_search(queryObject)
+        for count, chart in enumerate(charts, 1):
+            if random.randrange(count) == 0:
+                picked = chart
+        return picked
+
+    def fuzzy_search(self, text: str, limit: int) -> List[Document]:
+        """ Returns the summaries of the charts whose title is the most similar to the text, most similar first, to
+        suggest when a search finds nothing. Backends without a similarity index don't suggest anything.
+
+        @param limit: The most summaries returned.
+        """
+        return []
+
+    def similar(self, doc_id: int, limit: int) -> List[Document]:
+        """ Returns the summaries of the charts most like a chart, most similar first, see helpers.SimilarityHelper.
+        Backends without a vector index don't find anything.
+
+        @param limit: The most summaries returned.
+        """
+        return []
+
+    def autocomplete(self, text: str, field: str, limit: int) -> List[str]:
+        """ Returns the values of the field with a word starting with the text, to complete what's being typed.
+        Backends without a prefix index don't complete anything.
+
+        @param field: "title" or "artist".
+        @param limit: The most values returned.
+        """
+        return []
+
+    @abstractmethod
+    def get_pack(self, pack_name: str) -> List[Document]:
+        """ Returns every chart in the pack. The name must match exactly, ignoring case. """
+        raise NotImplementedError
+
+    def pack_exists(self, pack_name: str) -> bool:
+        return len(self.get_pack(pack_name)) > 0
+
+    @abstractmethod
+    def pack_names(self) -> List[str]:
+        """ Returns the name of every pack in the database, sorted alphabetically. """
+        raise NotImplementedError
+
+    @contextmanager
+    def transaction(self):
+        """ Commits every write made inside the with block together. Backends without transactions write as usual. """
+        yield
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self):
+        return len(self.all())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AtomicJSONStorage(Storage):
+    """ TinyDB storage that writes to a temporary file, then replaces the JSON file with it.
+
+    Readers (such as the bot's SongCatalog) never see a half written file, and a crash during a write leaves the
+    previous version of the file in place.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        self.kwargs = kwargs
+        if not os.path.exists(path):
+            open(path, "a").close()
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            contents = f.read()
+        if not contents:
+            return None
+        return json.loads(contents)
+
+    def write(self, data):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, **self.kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+class TransactionMiddleware(Middleware):
+    """ TinyDB middleware that holds writes in memory while a transaction is open, and writes once when it ends. """
+
+    def __init__(self, storage_cls):
+        super(TransactionMiddleware, self).__init__(storage_cls)
+        self.data = None
+        self.depth = 0
+
+    def read(self):
+        if self.depth and self.data is not None:
+            return self.data
+        return self.storage.read()
+
+    def write(self, data):
+        if self.depth:
+            self.data = data
+        else:
+            self.storage.write(data)
+
+    def begin(self):
+        self.depth += 1
+
+    def end(self, commit: bool):
+        self.depth -= 1
+        if self.depth == 0:
+            if commit and self.data is not None:
+                self.storage.write(self.data)
+            self.data = None
+
+
+class TinyDBSongStorage(SongStorage):
+    """ Song database stored as a TinyDB JSON file. """
+
+    def __init__(self, db: Union[str, TinyDB]):
+        """
+        @param db: The path of the JSON file, or an open TinyDB database. Transactions are only supported when opening a
+        path.
+        """
+        self.middleware = None
+        if isinstance(db, str):
+            self.middleware = TransactionMiddleware(AtomicJSONStorage)
+            db = TinyDB(db, storage=self.middleware)
+        self.db = db
+        self.pack_index = None  # built on the first pack lookup, dropped on every write
+
+    def _pack_index(self) -> PackIndex:
+        if self.pack_index is None:
+            self.pack_index = PackIndex(self.db.all())
+        return self.pack_index
+
+    def all(self) -> List[Document]:
+        return self.db.all()
+
+    def get(self, doc_id: int) -> Document:
+        return self.db.get(doc_id=doc_id)
+
+    def get_by_md5(self, md5: str) -> Document:
+        return self.db.get(where("md5") == md5)
+
+    def insert_multiple(self, records: Iterable[Mapping]) -> List[int]:
+        self.pack_index = None
+        return self.db.insert_multiple(records)
+
+    def update(self, fields: Union[Mapping, Callable[[dict], None]],
+               doc_ids: Iterable[int]):
+        self.pack_index = None
+        self.db.update(fields, doc_ids=list(doc_ids))
+
+    def remove(self, doc_ids: Iterable[int]):
+        self.pack_index = None
+        self.db.remove(doc_ids=list(doc_ids))
+
+    def search(self, queryObject: Union[dict, CompiledQuery]) -> List[Document]:
+        return list(self.iter_search(queryObject))
+
+    def iter_search(self, queryObject: Union[dict, CompiledQuery]) -> Iterator[Document]:
+        query = queryObject if isinstance(
+            queryObject, CompiledQuery) else CompiledQuery(queryObject)
+        if query.node is None:
+            return
+        for chart in self.db:
+            if query(chart):
+                yield chart
+
+    def get_pack(self, pack_name: str) -> List[Document]:
+        return list(self._pack_index().get(pack_name))
+
+    def pack_names(self) -> List[str]:
+        return self._pack_index().pack_names()
+
+    @contextmanager
+    def transaction(self):
+        if self.middleware is None:
+            yield
+            return
+        self.middleware.begin()
+        commit = False
+        try:
+            yield
+            commit = True
+        finally:
+            self.middleware.end(commit)
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return len(self.db)
+
+
+def _regexp(pattern: str, value) -> bool:
+    """ Implements the REGEXP operator for SQLite, matching the case insensitive search TinyDB does. """
+    if value is None:
+        return False
+    return re.search(pattern, str(value), re.IGNORECASE) is not None
+
+
+class SQLiteSongStorage(SongStorage):
+    """ Song database stored in a SQLite file, with indexes on the columns used for lookups. """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.create_function("regexp", 2, _regexp)
+        self.conn.create_function("to_number", 2, to_number)
+        self.in_transaction = False
+        with self.transaction():
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS charts (id INTEGER PRIMARY KEY, " +
+                ", ".join(SQLITE_COLUMNS) + ", data TEXT NOT NULL)")
+            existing_columns = {
+                row[1]
+                for row in self.conn.execute("PRAGMA table_info(charts)")
+            }
+            missing_columns = [
+                column for column in SQLITE_COLUMNS
+                if column not in existing_columns
+            ]
+            for column in missing_columns:
+                self.conn.execute("ALTER TABLE charts ADD COLUMN " + column)
+            for name, columns in SQLITE_INDEXES.items():
+                self.conn.execute("CREATE INDEX IF NOT EXISTS " + name +
+                                  " ON charts (" + columns + ")")
+            has_pack_table = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chart_packs'"
+            ).fetchone()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS chart_packs (pack TEXT NOT NULL COLLATE NOCASE, chart_id INTEGER NOT NULL, "
+                "PRIMARY KEY (pack, chart_id))")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS chart_packs_chart ON chart_packs (chart_id)"
+            )
+            if not has_pack_table or missing_columns:
+                # Database created before pack membership had its own table, or before search keys were stored
+                for record in self._select():
+                    record["pack"] = get_packs(record)
+                    self._write_record(record.doc_id, record)
+
+    @staticmethod
+    def _to_document(row) -> Document:
+        return Document(json.loads(row[1]), doc_id=row[0])
+
+    @staticmethod
+    def _to_row(record: Mapping) -> list:
+        keys = {
+            field + "_key": get_search_key(record, field)
+            for field in SEARCH_KEY_FIELDS
+        }
+        return [
+            keys[column] if column in keys else record.get(column)
+            for column in SQLITE_COLUMNS
+        ] + [json.dumps(record, ensure_ascii=False)]
+
+    def _select(self, where_clause: str = "", params=()) -> List[Document]:
+        return list(self._iter_select(where_clause, params))
+
+    def _iter_select(self, where_clause: str = "",
+                     params=()) -> Iterator[Document]:
+        rows = self.conn.execute(
+            "SELECT id, data FROM charts " + where_clause + " ORDER BY id",
+            params)
+        for row in rows:
+            yield self._to_document(row)
+
+    def all(self) -> List[Document]:
+        return self._select()
+
+    def get(self, doc_id: int) -> Document:
+        results = self._select("WHERE id = ?", (doc_id, ))
+        return results[0] if results else None
+
+    def get_by_md5(self, md5: str) -> Document:
+        results = self._select("WHERE md5 = ?", (md5, ))
+        return results[0] if results else None
+
+    def _set_packs(self, doc_id: int, record: Mapping):
+        self.conn.execute("DELETE FROM chart_packs WHERE chart_id = ?",
+                          (doc_id, ))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO chart_packs (pack, chart_id) VALUES (?, ?)",
+            [(pack, doc_id) for pack in get_packs(record)])
+
+    def _write_record(self, doc_id: int, record: Mapping):
+        assignments = ", ".join(column + " = ?"
+                                for column in SQLITE_COLUMNS) + ", data = ?"
+        self.conn.execute("UPDATE charts SET " + assignments + " WHERE id = ?",
+                          self._to_row(record) + [doc_id])
+        self._set_packs(doc_id, record)
+
+    def insert_multiple(self, records: Iterable[Mapping]) -> List[int]:
+        doc_ids = []
+        placeholders = ", ".join("?" * (len(SQLITE_COLUMNS) + 2))
+        with self.transaction():
+            for record in records:
+                doc_id = getattr(record, "doc_id", None)
+                cursor = self.conn.execute(
+                    "INSERT INTO charts (id, " + ", ".join(SQLITE_COLUMNS) +
+                    ", data) VALUES (" + placeholders + ")",
+                    [doc_id] + self._to_row(record))
+                self._set_packs(cursor.lastrowid, record)
+                doc_ids.append(cursor.lastrowid)
+        return doc_ids
+
+    def update(self, fields: Union[Mapping, Callable[[dict], None]],
+               doc_ids: Iterable[int]):
+        with self.transaction():
+            for doc_id in doc_ids:
+                record = self.get(doc_id)
+                if record is None:
+                    continue
+                if callable(fields):
+                    fields(record)
+                else:
+                    record.update(fields)
+                self._write_record(doc_id, record)
+
+    def remove(self, doc_ids: Iterable[int]):
+        doc_ids = [(doc_id, ) for doc_id in doc_ids]
+        with self.transaction():
+            self.conn.executemany("DELETE FROM charts WHERE id = ?", doc_ids)
+            self.conn.executemany(
+                "DELETE FROM chart_packs WHERE chart_id = ?", doc_ids)
+
+    @staticmethod
+    def _tag_clause(key: str, value, params: list) -> str:
+        if key in RANGE_TAGS:
+            clauses = []
+            for field, operator, bound in zip(RANGE_TAGS[key], (">=", "<="),
+                                              value):
+                if bound is None:
+                    continue
+                if field in ("min_bpm", "max_bpm"):
+                    # Stored as numbers, so the index can be used
+                    clauses.append(field + " " + operator + " ?")
+                else:
+                    if field in SQLITE_DERIVED_FIELDS:
+                        column = SQLITE_DERIVED_FIELDS[field]
+                    elif field in SQLITE_COLUMNS:
+                        column = field
+                    else:
+                        column = "json_extract(data, '$." + field + "')"
+                    clauses.append("to_number('" + field + "', " + column +
+                                   ") " + operator + " ?")
+                params.append(bound)
+            # Charts without a value don't match, also when negated with NOT
+            return "IFNULL(" + " AND ".join(clauses or ["1"]) + ", 0)"
+        if key == "pack":
+            params.append(value)
+            return "id IN (SELECT chart_id FROM chart_packs WHERE pack REGEXP ?)"
+        if key in SEARCH_KEY_FIELDS:
+            if is_literal(value):
+                params.append(fold_text(value))
+                return "instr(" + key + "_key, ?) > 0"
+            params += [value, value]
+            return "(" + key + " REGEXP ? OR " + key + "_key REGEXP ?)"
+        if key in SQLITE_COLUMNS:
+            params.append(value)
+            return key + " REGEXP ?"
+        raise ValueError("Unsupported search tag '{}'".format(key))
+
+    def _where_clause(self, node: dict, params: list) -> str:
+        """ Converts a node of a query tree to a SQL condition, adding its parameters to params. """
+        if "not" in node:
+            return "NOT (" + self._where_clause(node["not"], params) + ")"
+        if "tag" in node:
+            return self._tag_clause(node["tag"], node["value"], params)
+        operator = " AND " if "and" in node else " OR "
+        return "(" + operator.join(
+            self._where_clause(child, params)
+            for child in node.get("and", node.get("or"))) + ")"
+
+    def search(self, queryObject: Union[dict, CompiledQuery]) -> List[Document]:
+        node = get_query_tree(queryObject)
+        if node is None:
+            return []
+        params = []
+        return self._select("WHERE " + self._where_clause(node, params),
+                            params)
+
+    def iter_search(self, queryObject: Union[dict, CompiledQuery]) -> Iterator[Document]:
+        node = get_query_tree(queryObject)
+        if node is None:
+            return
+        params = []
+        yield from self._iter_select(
+            "WHERE " + self._where_clause(node, params), params)
+
+    def search_page(self, queryObject: Union[dict, CompiledQuery],
+                    limit: int) -> SearchPage:
+        # Only the first charts are read, counting the rest doesn't need their JSON
+        node = get_query_tree(queryObject)
+        if node is None:
+            return SearchPage([], 0, True)
+        params = []
+        where_clause = "WHERE " + self._where_clause(node, params)
+        rows = self.conn.execute(
+            "SELECT id, data FROM charts " + where_clause +
+            " ORDER BY id LIMIT ?", params + [limit])
+        summaries = [get_summary(self._to_document(row)) for row in rows]
+        total = self.conn.execute(
+            "SELECT COUNT(*) FROM charts " + where_clause,
+            params).fetchone()[0]
+        return SearchPage(summaries, total, True)
+
+    def random_chart(self, queryObject: Union[dict, CompiledQuery] = None) -> Optional[Document]:
+        # Only the chart picked is read
+        where_clause = ""
+        params = []
+        if queryObject is not None:
+            node = get_query_tree(queryObject)
+            if node is None:
+                return None
+            where_clause = "WHERE " + self._where_clause(node, params)
+        row = self.conn.execute(
+            "SELECT id, data FROM charts " + where_clause +
+            " ORDER BY random() LIMIT 1", params).fetchone()
+        return self._to_document(row) if row is not None else None
+
+    def get_pack(self, pack_name: str) -> List[Document]:
+        return self._select(
+            "WHERE id IN (SELECT chart_id FROM chart_packs WHERE pack = ?)",
+            (pack_name, ))
+
+    def pack_exists(self, pack_name: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM chart_packs WHERE pack = ? LIMIT 1",
+            (pack_name, )).fetchone() is not None
+
+    def pack_names(self) -> List[str]:
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT pack FROM chart_packs GROUP BY pack ORDER BY pack")
+        ]
+
+    @contextmanager
+    def transaction(self):
+        if self.in_transaction:
+            # Nested, the outermost transaction commits
+            yield
+            return
+        self.in_transaction = True
+        try:
+            with self.conn:
+                yield
+        finally:
+            self.in_transaction = False
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM charts").fetchone()[0]
+
+
+def open_song_storage(path: str) -> SongStorage:
+    """ Opens the song database, using the backend that matches the file extension.
+
+    @param path: The path of the database. .sqlite, .sqlite3 and .db files use SQLite, everything else uses TinyDB.
+    @return: The opened SongStorage.
+    """
+    if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+        return SQLiteSongStorage(path)
+    return TinyDBSongStorage(path)
+
+
+def as_song_storage(db: Union[str, TinyDB, SongStorage]) -> SongStorage:
+    """ Returns the SongStorage for a database name, TinyDB database or SongStorage.
+
+    A storage is only opened when a database name is passed in, in which case the caller is responsible for closing it.
+    """
+    if isinstance(db, SongStorage):
+        return db
+    if isinstance(db, TinyDB):
+        return TinyDBSongStorage(db)
+    return open_song_storage(db)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Nearest neighbor indexes over the feature vectors of the charts, used by -similar to find charts like another one.
+
+See helpers.SimilarityHelper for what the vectors describe. A VectorIndex returns the charts whose vector is the nearest
+to a given one. ExactVectorIndex compares the vector with every chart's. With NumPy installed, this is a single matrix
+operation; without it, a loop over math.dist. Either way a search takes milliseconds for tens of thousands of charts.
+Larger databases can plug in an approximate index by subclassing VectorIndex, see SongCatalog.VECTOR_INDEX.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from abc import ABC, abstractmethod
+from tinydb.table import Document
+from typing import Iterable, List, Sequence
+import heapq
+import math
+
+from helpers.SimilarityHelper import get_chart_vector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class VectorIndex(ABC):
+    """ Finds the charts with the nearest feature vectors. """
+
+    @abstractmethod
+    def __init__(self, charts: Iterable[Document]):
+        """
+        @param charts: The charts to index. Charts without a feature vector are left out.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def nearest(self, vector: Sequence[float], limit: int,
+                exclude: Iterable[int] = ()) -> List[int]:
+        """ Returns the IDs of the charts with the nearest vectors, nearest first.
+
+        @param vector: The feature vector to compare with.
+        @param limit: The most IDs returned.
+        @param exclude: IDs of charts that must not be returned, e.g. the chart the vector is from.
+        """
+        raise NotImplementedError
+
+
+class ExactVectorIndex(VectorIndex):
+    """ Compares a vector with the vector of every chart. """
+
+    def __init__(self, charts: Iterable[Document]):
+        self.doc_ids: List[int] = []
+        vectors = []
+        for chart in charts:
+            vector = get_chart_vector(chart)
+            if vector is not None:
+                self.doc_ids.append(chart.doc_id)
+                vectors.append(tuple(vector))
+        if numpy is not None and vectors:
+            self.vectors = numpy.array(vectors, dtype=numpy.float64)
+        else:
+            self.vectors = vectors
+
+    def nearest(self, vector: Sequence[float], limit: int,
+                exclude: Iterable[int] = ()) -> List[int]:
+        exclude = set(exclude)
+        # Enough charts that limit remain once the excluded ones are dropped
+        count = min(limit + len(exclude), len(self.doc_ids))
+        if count <= 0:
+            return []
+        if numpy is not None:
+            distances = ((self.vectors - numpy.asarray(vector))**2).sum(axis=1)
+            nearest = numpy.argpartition(distances, count - 1)[:count]
+            positions = sorted(nearest.tolist(),
+                               key=lambda i: (distances[i], i))
+        else:
+            vector = tuple(vector)
+            positions = heapq.nsmallest(
+                count,
+                range(len(self.vectors)),
+                key=lambda i: (math.dist(vector, self.vectors[i]), i))
+        return [
+            self.doc_ids[i] for i in positions
+            if self.doc_ids[i] not in exclude
+        ][:limit]
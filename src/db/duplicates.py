@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Lists the charts in a song database that are near-duplicates of each other.
+
+Near-duplicates are charts whose notes are mostly the same, like edited re-releases or copies with another offset. They
+are found from the MinHash signature of each chart, see DuplicateIndex. Charts scanned before signatures were stored
+have none, and are only compared once they are scanned again.
+
+To use, from the src folder:
+
+python -m db.duplicates [DATABASE] [THRESHOLD]
+
+DATABASE defaults to DATABASE_NAME in globals.py. THRESHOLD is the smallest estimated similarity, between 0 and 1, for
+two charts to be near-duplicates. It defaults to DUPLICATE_THRESHOLD in DuplicateIndex.py.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+import os
+import sys
+import time
+
+from globals import DATABASE_NAME
+from .DBManager import find_duplicates
+from .DuplicateIndex import DUPLICATE_THRESHOLD
+from .SongStorage import get_packs
+
+
+def main(argv: list):
+    if len(argv) > 3:
+        print("Usage: python -m db.duplicates [DATABASE] [THRESHOLD]")
+        print("e.g. python -m db.duplicates db.json 0.9")
+        sys.exit(2)
+
+    database = argv[1] if len(argv) > 1 else DATABASE_NAME
+    if not os.path.isfile(database):
+        print("\"{}\" does not exist. Exiting.".format(database))
+        sys.exit(2)
+    try:
+        threshold = float(argv[2]) if len(argv) > 2 else DUPLICATE_THRESHOLD
+    except ValueError:
+        threshold = -1
+    if not 0 < threshold <= 1:
+        print("The threshold must be a number between 0 and 1. Exiting.")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    clusters = find_duplicates(database, threshold)
+    for cluster in clusters:
+        print()
+        for chart in cluster:
+            print("[{}] {} - {} {} {} by {} ({})".format(
+                chart.doc_id, chart["title"], chart["artist"],
+                chart["difficulty"], chart["rating"], chart["stepartist"],
+                ", ".join(get_packs(chart))))
+    print()
+    print("Found {} group(s) of near-duplicate charts in {:.2f}s.".format(
+        len(clusters),
+        time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Copies every chart from one song database to another.
+
+Used to move an existing TinyDB database (db.json) to the SQLite backend, without having to scan every song again. The
+backend of each database is picked from its file extension, see SongStorage.open_song_storage. Chart IDs are kept, so
+anything referring to a chart by its ID still points to the same chart.
+
+To use, from the src folder:
+
+python -m db.migrate db.json db.sqlite
+
+Afterwards, point DATABASE_NAME in globals.py and scan/scanconstants.py at the new database.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+import os
+import sys
+import time
+
+from .SongStorage import get_packs, open_song_storage
+
+
+def migrate(source: str, destination: str) -> int:
+    """ Copies every chart from the source database into the destination database.
+
+    @param source: The name of the database to copy from.
+    @param destination: The name of the database to copy to. It must not contain any charts yet.
+    @return: The number of charts copied.
+    """
+    with open_song_storage(source) as source_db, \
+            open_song_storage(destination) as destination_db:
+        if len(destination_db):
+            raise ValueError(
+                "\"{}\" already contains charts.".format(destination))
+        charts = source_db.all()
+        for chart in charts:
+            # Older databases store the packs as a comma separated string
+            chart["pack"] = get_packs(chart)
+        destination_db.insert_multiple(charts)
+    return len(charts)
+
+
+def main(argv: list):
+    if len(argv) != 3:
+        print("Usage: python -m db.migrate SOURCE DESTINATION")
+        print("e.g. python -m db.migrate db.json db.sqlite")
+        sys.exit(2)
+
+    source, destination = argv[1], argv[2]
+    if not os.path.isfile(source):
+        print("\"{}\" does not exist. Exiting.".format(source))
+        sys.exit(2)
+
+    start = time.perf_counter()
+    try:
+        count = migrate(source, destination)
+    except ValueError as e:
+        print(str(e) + " Exiting.")
+        sys.exit(2)
+    print("Copied {} chart(s) from \"{}\" to \"{}\" in {:.2f}s.".format(
+        count, source, destination,
+        time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Checks the hand-written queryParser against the ANTLR parser generated from search.g4, and times both.
+
+Every search below, plus randomly generated ones, is parsed by both parsers. They must build the same query object, or
+both report a syntax error. Afterwards the time each parser takes per search is printed.
+
+Requires the antlr4-python3-runtime package. To use, from the src folder:
+
+python -m db.parser.compareParsers [number of random searches]
+
+After changing search.g4, regenerate the ANTLR parser ("antlr4 -Dlanguage=Python3 search.g4", then copy searchLexer.py,
+searchListener.py and searchParser.py here), update queryParser to match, and run this again.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from contextlib import redirect_stderr
+import io
+import random
+import sys
+import time
+
+from .antlrQueryObject import generateAntlrQueryObject
+from .generateQueryObject import generateQueryObject
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+SEARCHES = [
+    "sigatrev", "sigatrev -rating:20", "-bpm:160", "-rating:13+", "-rating:13-",
+    "-totalstream:200+ -rating:13-15", "-nps:7.5", "-length:120-180",
+    "-rating:15-13", "-rating:abc", "-rating:1.", "-rating:13--",
+    "-title:length 2 -nps:7.5", "Mr. Wonderful+ 2", "strength -artist:bpm nps",
+    "title of song", "re-volt", "x-y", "Love OR Hate", "NOT FOUND",
+    "NOT FOUND -rating:1", "song (remix) -rating:13", "(-title:song (remix))",
+    "-title:a -b", "-title:a -b -rating:13", "-title:a  -rating:1",
+    "-artist:foo -rating:12 OR -rating:13",
+    "-artist:foo (-rating:12 OR -rating:13)", "NOT -artist:foo",
+    "NOT NOT -artist:foo", "-artist:x NOT -rating:20",
+    "song NOT -rating:20 OR (-bpm:150 -nps:8+)", "(-title:a) OR (b)",
+    "(-title:a) OR (-title:b)", "((-title:a))", "(-title:x) y)", "(-rating:1",
+    "-rating:1)", "()", "(", ")", "-", ":", "-title:", "-title: ", " song",
+    "song ", "a\tb", "song\n-rating:1", "subtitle", "-subtitle:title",
+    "-stepartist:a OR b", "-totalbreak:10- -totalstream:700+", "", " OR ",
+    "-candledensity:0.2- -mono:10- -totalstream:150+", "-candles:5",
+    "-anchors:0 OR -mono:50+", "monotone", "-title:candles",
+    "NOT ", "- title:a", "-Title:a", "-title:a:b", "-rating:1 OR"
+]
+
+# Pieces the random searches are made of
+FRAGMENTS = [
+    " ", " ", " ", "-", "-", ":", ":", "(", ")", " OR ", "NOT ", "+", ".", "1",
+    "13", "5", "a", "b", "song", "title", "artist", "rating", "bpm",
+    "totalstream", "length", "-title:", "-artist:", "-rating:", "-bpm:",
+    "-length:", "-mono:", "-candledensity:", "mono", "candles", "x"
+]
+TAGS = ["title", "subtitle", "artist", "stepartist"]
+RANGE_TAGS = [
+    "rating", "bpm", "nps", "totalstream", "totalbreak", "length", "candles",
+    "candledensity", "mono", "anchors"
+]
+
+
+def random_value(rng: random.Random) -> str:
+    return "".join(
+        rng.choice(["a", "b", "song", " ", "-", "(", ")", " OR ", "NOT ", "1"])
+        for _ in range(rng.randint(1, 4))).strip() or "a"
+
+
+def random_range(rng: random.Random) -> str:
+    number = str(rng.randint(1, 20)) + rng.choice(["", "", ".5"])
+    return number + rng.choice(["", "+", "-", "-" + str(rng.randint(1, 20))])
+
+
+def random_query(rng: random.Random, depth: int = 0) -> str:
+    terms = []
+    for _ in range(rng.randint(1, 3)):
+        kind = rng.random()
+        if kind < 0.15 and depth < 3:
+            terms.append("(" + random_query(rng, depth + 1) + ")")
+        elif kind < 0.3:
+            terms.append("NOT " + random_query(rng, 3))
+        elif kind < 0.65:
+            terms.append("-" + rng.choice(TAGS) + ":" + random_value(rng))
+        else:
+            terms.append("-" + rng.choice(RANGE_TAGS) + ":" +
+                         random_range(rng))
+    return rng.choice([" ", " OR "]).join(terms)
+
+
+def random_search(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.3:
+        return "".join(
+            rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 12)))
+    if kind < 0.5:
+        return random_value(rng) + " " + random_query(rng)
+    return random_query(rng)
+
+
+def parse_with_antlr(search: str):
+    # The ANTLR lexer and parser also print their errors to stderr
+    with redirect_stderr(io.StringIO()):
+        return generateAntlrQueryObject(search)
+
+
+def compare(searches) -> int:
+    """ Parses each search with both parsers, printing the searches they disagree on.
+
+    @return: The number of searches the parsers disagree on.
+    """
+    failed = 0
+    for search in searches:
+        expected = parse_with_antlr(search)
+        actual = generateQueryObject(search)
+        if expected != actual:
+            failed += 1
+            print(RED + "FAILED" + RESET + ": " + repr(search))
+            print("  ANTLR:         " + str(expected))
+            print("  queryParser:   " + str(actual))
+    return failed
+
+
+def benchmark(parse, searches, repeat: int) -> float:
+    """ Returns the average time in microseconds parse takes per search. """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for search in searches:
+            parse(search)
+    return (time.perf_counter() - start) / (repeat * len(searches)) * 1000000
+
+
+def main(argv: list):
+    count = int(argv[1]) if len(argv) > 1 else 5000
+    rng = random.Random(0)
+    searches = SEARCHES + [random_search(rng) for _ in range(count)]
+
+    failed = compare(searches)
+    if failed:
+        print(RED + "FAILED" + RESET + ": {} of {} searches differ.".format(
+            failed, len(searches)))
+    else:
+        print(GREEN + "PASSED" + RESET +
+              ": both parsers agree on {} searches.".format(len(searches)))
+
+    timed = [search for search in SEARCHES if search]
+    antlr = benchmark(parse_with_antlr, timed, 20)
+    handwritten = benchmark(generateQueryObject, timed, 20)
+    print("ANTLR:       {:8.1f} us per search".format(antlr))
+    print("queryParser: {:8.1f} us per search ({:.1f}x faster)".format(
+        handwritten, antlr / handwritten))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,44 +1,62 @@
+from .queryParser import getNode, getRange
 from .searchListener import searchListener
 from .searchParser import searchParser
 
 
 class parserListener(searchListener):
+    """ Builds the query object from the parse tree of the ANTLR parser, see queryParser for its format. """
 
     def __init__(self):
-        self._queryObject = {
-            'title': None,
-            'subtitle': None,
-            'artist': None,
-            'stepartist': None,
-            'rating': None,
-            'bpm': None
-        }
-
-        self._currentQuery = {}
-        self._resetCurrentQuery()
-
-    def _resetCurrentQuery(self):
-        self._currentQuery = {'tag': None, 'value': None}
+        self._queryObject = None
+        # Nodes built for the parse trees exited so far, that aren't part of a parent node yet
+        self._nodes = []
 
     def getQueryObject(self):
         return self._queryObject
 
-    # Enter a parse tree produced by searchParser#song_title.
-    def exitSong_title(self, ctx: searchParser.Song_titleContext):
-        self._queryObject['title'] = ctx.getText()
-
-    # Enter a parse tree produced by searchParser#tag_statement.
+    def _popNodes(self, count):
+        nodes = self._nodes[len(self._nodes) - count:]
+        del self._nodes[len(self._nodes) - count:]
+        return nodes
+
+    # Exit a parse tree produced by searchParser#search_statement.
+    def exitSearch_statement(self, ctx: searchParser.Search_statementContext):
+        nodes = []
+        if ctx.song_title():
+            nodes.append({'tag': 'title', 'value': ctx.song_title().getText()})
+        if ctx.query():
+            nodes += self._popNodes(1)
+        self._queryObject = getNode('and', nodes)
+
+    # Exit a parse tree produced by searchParser#query.
+    def exitQuery(self, ctx: searchParser.QueryContext):
+        self._nodes.append(getNode('or',
+                                   self._popNodes(len(ctx.and_query()))))
+
+    # Exit a parse tree produced by searchParser#and_query.
+    def exitAnd_query(self, ctx: searchParser.And_queryContext):
+        self._nodes.append(getNode('and', self._popNodes(len(ctx.term()))))
+
+    # Exit a parse tree produced by searchParser#term.
+    def exitTerm(self, ctx: searchParser.TermContext):
+        if ctx.term():
+            self._nodes.append({'not': self._popNodes(1)[0]})
+
+    # Exit a parse tree produced by searchParser#tag_statement.
+    # Tag names can also appear inside a value, so the tag and value are taken from this statement's children.
     def exitTag_statement(self, ctx: searchParser.Tag_statementContext):
-        tag = self._currentQuery["tag"]
-        value = self._currentQuery["value"]
-
-        self._queryObject[tag] = value
-        self._resetCurrentQuery()
-
-    # Enter a parse tree produced by searchParser#tag.
-    def enterTag(self, ctx: searchParser.TagContext):
-        self._currentQuery['tag'] = ctx.getText()
-
-    # Enter a parse tree produced by searchParser#value.
-    def enterValue(self, ctx: searchParser.ValueContext):
-        self._currentQuery['value'] = ctx.getText()
+        if ctx.tag():
+            self._nodes.append({
+                'tag': ctx.tag().getText(),
+                'value': ctx.value().getText()
+            })
+        else:
+            self._nodes.append({
+                'tag': ctx.range_tag().getText(),
+                'value': getRangeFromContext(ctx.range_())
+            })
+
+
+def getRangeFromContext(ctx: searchParser.RangeContext):
+    return getRange([float(number.getText()) for number in ctx.number()],
+                    ctx.getText())
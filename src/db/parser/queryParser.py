@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Hand-written parser for the search grammar in search.g4.
+
+Parses a search into the query object used by SongStorage.CompiledQuery and SearchIndex, a tree of nodes:
+
+{'tag': 'artist', 'value': 'foo'} matches a single tag. Range tags have a (minimum, maximum) value, see getRange.
+{'and': [nodes]} matches if every node matches.
+{'or': [nodes]} matches if any node matches.
+{'not': node} matches if the node doesn't.
+
+It accepts the same language and builds the same query object as the ANTLR parser generated from search.g4, without
+needing the ANTLR runtime. "python -m db.parser.compareParsers" checks both parsers agree.
+
+The lexer works like the ANTLR one: at each position the longest keyword or operator wins, any other character is a
+single token, and \\b, \\r, \\n, \\t and \\f are dropped.
+
+The grammar is ambiguous in places: a value may contain spaces, parentheses, "-", "NOT " and " OR ", so where it ends
+depends on what follows. e.g. in "-title:a -b -rating:13" the title is "a -b". Each rule therefore returns every way it
+can match from a position, in the order ANTLR prefers them (longest value first, the first alternative of a rule first),
+and the first one that parses the whole search is used. Only the preferred match for each end position is kept, and
+the matches of each rule, and of the repetitions following a term or an and_query, are memoized per position, so no
+way of matching is enumerated twice and the time stays polynomial in the length of the search.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+TEXT_TAGS = ("title", "subtitle", "artist", "stepartist")
+RANGE_TAGS = ("rating", "bpm", "nps", "totalstream", "totalbreak", "length",
+              "candles", "candledensity", "mono", "anchors")
+
+# Keywords and operators, longest first so the longest match wins
+LITERALS = sorted(TEXT_TAGS + RANGE_TAGS +
+                  (" OR ", "NOT ", " ", "-", ":", "(", ")", "+", "."),
+                  key=len,
+                  reverse=True)
+# Dropped by the lexer
+SKIPPED = set("\b\r\n\t\f")
+
+DIGIT = "DIGIT"
+CHAR = "CHAR"
+EOF = "EOF"
+
+# Token types allowed in a value
+TEXT_TOKENS = set(TEXT_TAGS + RANGE_TAGS +
+                  (CHAR, DIGIT, ".", "+", "-", "(", ")", " OR ", "NOT "))
+
+SYNTAX_ERROR = "Check your syntax please"
+
+
+class QuerySyntaxError(Exception):
+    pass
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """ Splits a search into (type, text) tokens. Keywords and operators have their own text as type. """
+    tokens = []
+    i = 0
+    while i < len(text):
+        if text[i] in SKIPPED:
+            i += 1
+            continue
+        for literal in LITERALS:
+            if text.startswith(literal, i):
+                tokens.append((literal, literal))
+                i += len(literal)
+                break
+        else:
+            tokens.append((DIGIT if "0" <= text[i] <= "9" else CHAR, text[i]))
+            i += 1
+    tokens.append((EOF, ""))
+    return tokens
+
+
+def getNode(operator: str, nodes: list):
+    """ Returns an 'and' or 'or' node of the nodes, or the node itself if there is only one. """
+    if len(nodes) == 1:
+        return nodes[0]
+    return {operator: nodes}
+
+
+def getRange(numbers: List[float], text: str):
+    """ Returns the (minimum, maximum) of a range, where None means unbounded. A single value is both.
+
+    @param numbers: The numbers in the range.
+    @param text: The text of the range, e.g. "13-15" or "13+".
+    """
+    if len(numbers) == 2:
+        return min(numbers), max(numbers)
+    if text.endswith('+'):
+        return numbers[0], None
+    if text.endswith('-'):
+        return None, numbers[0]
+    return numbers[0], numbers[0]
+
+
+# A rule's matches from a position: (position after the match, node), in order of preference
+Matches = List[Tuple[int, object]]
+# The nodes matched by the repetitions of a rule, as a linked list: (node, rest of the list), or None if empty
+Nodes = Optional[Tuple[object, "Nodes"]]
+
+
+class queryParser(object):
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.memo: Dict[Tuple[str, int], Matches] = {}
+        self.tails: Dict[Tuple[str, int], List[Tuple[int, Nodes]]] = {}
+
+    def type(self, i: int) -> str:
+        if i >= len(self.tokens):
+            return EOF
+        return self.tokens[i][0]
+
+    def parse(self):
+        """ Returns the query object for the whole search, or raises QuerySyntaxError. """
+        end = len(self.tokens) - 1
+
+        # search_statement: song_title EOF
+        for i, title in self.value(0):
+            if i == end:
+                return {'tag': 'title', 'value': title}
+        # search_statement: song_title ' ' query EOF
+        for i, title in self.value(0):
+            if self.type(i) == " ":
+                for j, query in self.query(i + 1):
+                    if j == end:
+                        return getNode('and', [{
+                            'tag': 'title',
+                            'value': title
+                        }, query])
+        # search_statement: query EOF
+        for i, query in self.query(0):
+            if i == end:
+                return query
+        raise QuerySyntaxError(SYNTAX_ERROR)
+
+    def memoized(self, rule: str, i: int, match) -> Matches:
+        key = (rule, i)
+        if key not in self.memo:
+            # Keep the preferred match for each end position, the rest of the search parses the same way after it
+            matches = []
+            ends = set()
+            for end, node in match(i):
+                if end not in ends:
+                    ends.add(end)
+                    matches.append((end, node))
+            self.memo[key] = matches
+        return self.memo[key]
+
+    def query(self, i: int) -> Matches:
+        # query: and_query (' OR ' and_query)*
+        return self.memoized(
+            "query", i, lambda i: self.repeat(self.and_query, " OR ", 'or', i))
+
+    def and_query(self, i: int) -> Matches:
+        # and_query: term (' ' term)*
+        return self.memoized("and_query", i,
+                             lambda i: self.repeat(self.term, " ", 'and', i))
+
+    def repeat(self, rule, separator: str, operator: str, i: int) -> Matches:
+        """ Matches rule (separator rule)*, preferring more repetitions. """
+        matches = []
+        ends = set()
+        for j, node in rule(i):
+            for end, rest in self.tail(rule, separator, j):
+                if end not in ends:
+                    ends.add(end)
+                    nodes = [node]
+                    while rest is not None:
+                        nodes.append(rest[0])
+                        rest = rest[1]
+                    matches.append((end, getNode(operator, nodes)))
+        return matches
+
+    def tail(self, rule, separator: str, i: int) -> List[Tuple[int, Nodes]]:
+        """ Matches (separator rule)*, preferring more repetitions, keeping the preferred match for each end position.
+
+        What follows a repetition doesn't depend on the ones before it, so the matches from each position are only
+        found once. They are found for the positions further in the search first, using a stack rather than recursion,
+        as a rule can be repeated hundreds of times.
+        @return: (position after the match, nodes matched) for each end position.
+        """
+        stack = [i]
+        while stack:
+            position = stack[-1]
+            if (separator, position) in self.tails:
+                stack.pop()
+                continue
+            nexts = rule(position + 1) if self.type(position) == separator else []
+            missing = [j for j, _ in nexts if (separator, j) not in self.tails]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            matches = []
+            ends = set()
+            for j, node in nexts:
+                for end, rest in self.tails[(separator, j)]:
+                    if end not in ends:
+                        ends.add(end)
+                        matches.append((end, (node, rest)))
+            matches.append((position, None))
+            self.tails[(separator, position)] = matches
+        return self.tails[(separator, i)]
+
+    def term(self, i: int) -> Matches:
+        return self.memoized("term", i, self.match_term)
+
+    def match_term(self, i: int):
+        # term: 'NOT ' term
+        if self.type(i) == "NOT ":
+            for j, node in self.term(i + 1):
+                yield j, {'not': node}
+        # term: '(' query ')'
+        elif self.type(i) == "(":
+            for j, node in self.query(i + 1):
+                if self.type(j) == ")":
+                    yield j + 1, node
+        # term: tag_statement
+        elif self.type(i) == "-" and self.type(i + 2) == ":":
+            tag = self.type(i + 1)
+            if tag in TEXT_TAGS:
+                for j, value in self.value(i + 3):
+                    yield j, {'tag': tag, 'value': value}
+            elif tag in RANGE_TAGS:
+                match = self.range(i + 3)
+                if match:
+                    yield match[0], {'tag': tag, 'value': match[1]}
+
+    def value(self, i: int) -> Matches:
+        # value: text+ (' '* text+)*
+        # Every text token up to the first token that is neither text nor a space can end the value, longest first
+        ends = []
+        j = i
+        while self.type(j) in TEXT_TOKENS or (self.type(j) == " " and j > i):
+            j += 1
+            if self.type(j - 1) in TEXT_TOKENS:
+                ends.append(j)
+        return [(end, "".join(text for _, text in self.tokens[i:end]))
+                for end in reversed(ends)]
+
+    def number(self, i: int) -> Optional[Tuple[int, float]]:
+        # number: DIGIT+ ('.' DIGIT+)?
+        j = i
+        while self.type(j) == DIGIT:
+            j += 1
+        if j == i:
+            return None
+        if self.type(j) == "." and self.type(j + 1) == DIGIT:
+            j += 1
+            while self.type(j) == DIGIT:
+                j += 1
+        return j, float("".join(text for _, text in self.tokens[i:j]))
+
+    def range(self, i: int) -> Optional[Tuple[int, tuple]]:
+        # range: number | number '+' | number '-' | number '-' number
+        # A range is always followed by a space, ' OR ', ')' or the end, so only the longest match can be used
+        first = self.number(i)
+        if first is None:
+            return None
+        j, minimum = first
+        if self.type(j) == "+":
+            return j + 1, getRange([minimum], "+")
+        if self.type(j) == "-":
+            second = self.number(j + 1)
+            if second is not None:
+                return second[0], getRange([minimum, second[1]], "")
+            return j + 1, getRange([minimum], "-")
+        return j, getRange([minimum], "")
+
+
+def parseQuery(text: str):
+    """ Parses a search into a query object, see parserListener.
+
+    @param text: The search, e.g. "sigatrev -rating:13-15".
+    @return: The root node of the query object.
+    @raise QuerySyntaxError: If the search doesn't follow the grammar.
+    """
+    return queryParser(text).parse()
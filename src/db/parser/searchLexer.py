@@ -1,44 +1,86 @@
-# Generated from search.g4 by ANTLR 4.8
+# Generated from search.g4 by ANTLR 4.13.2
 from antlr4 import *
 from io import StringIO
-from typing.io import TextIO
 import sys
+if sys.version_info[1] > 5:
+    from typing import TextIO
+else:
+    from typing.io import TextIO
 
 
 def serializedATN():
-    with StringIO() as buf:
-        buf.write("\3\u608b\ua72a\u8133\ub9ed\u417c\u3be7\u7786\u5964\2\f")
-        buf.write("K\b\1\4\2\t\2\4\3\t\3\4\4\t\4\4\5\t\5\4\6\t\6\4\7\t\7")
-        buf.write("\4\b\t\b\4\t\t\t\4\n\t\n\4\13\t\13\3\2\3\2\3\3\3\3\3\4")
-        buf.write("\3\4\3\5\3\5\3\5\3\5\3\5\3\5\3\6\3\6\3\6\3\6\3\6\3\6\3")
-        buf.write("\6\3\6\3\6\3\7\3\7\3\7\3\7\3\7\3\7\3\7\3\b\3\b\3\b\3\b")
-        buf.write("\3\b\3\b\3\b\3\b\3\b\3\b\3\b\3\t\3\t\3\t\3\t\3\t\3\t\3")
-        buf.write("\t\3\n\3\n\3\n\3\n\3\13\3\13\2\2\f\3\3\5\4\7\5\t\6\13")
-        buf.write("\7\r\b\17\t\21\n\23\13\25\f\3\2\3\4\2\n\f\16\17\2J\2\3")
-        buf.write("\3\2\2\2\2\5\3\2\2\2\2\7\3\2\2\2\2\t\3\2\2\2\2\13\3\2")
-        buf.write("\2\2\2\r\3\2\2\2\2\17\3\2\2\2\2\21\3\2\2\2\2\23\3\2\2")
-        buf.write("\2\2\25\3\2\2\2\3\27\3\2\2\2\5\31\3\2\2\2\7\33\3\2\2\2")
-        buf.write("\t\35\3\2\2\2\13#\3\2\2\2\r,\3\2\2\2\17\63\3\2\2\2\21")
-        buf.write(">\3\2\2\2\23E\3\2\2\2\25I\3\2\2\2\27\30\7\"\2\2\30\4\3")
-        buf.write("\2\2\2\31\32\7/\2\2\32\6\3\2\2\2\33\34\7<\2\2\34\b\3\2")
-        buf.write("\2\2\35\36\7v\2\2\36\37\7k\2\2\37 \7v\2\2 !\7n\2\2!\"")
-        buf.write("\7g\2\2\"\n\3\2\2\2#$\7u\2\2$%\7w\2\2%&\7d\2\2&\'\7v\2")
-        buf.write("\2\'(\7k\2\2()\7v\2\2)*\7n\2\2*+\7g\2\2+\f\3\2\2\2,-\7")
-        buf.write("c\2\2-.\7t\2\2./\7v\2\2/\60\7k\2\2\60\61\7u\2\2\61\62")
-        buf.write("\7v\2\2\62\16\3\2\2\2\63\64\7u\2\2\64\65\7v\2\2\65\66")
-        buf.write("\7g\2\2\66\67\7r\2\2\678\7c\2\289\7t\2\29:\7v\2\2:;\7")
-        buf.write("k\2\2;<\7u\2\2<=\7v\2\2=\20\3\2\2\2>?\7t\2\2?@\7c\2\2")
-        buf.write("@A\7v\2\2AB\7k\2\2BC\7p\2\2CD\7i\2\2D\22\3\2\2\2EF\7d")
-        buf.write("\2\2FG\7r\2\2GH\7o\2\2H\24\3\2\2\2IJ\n\2\2\2J\26\3\2\2")
-        buf.write("\2\3\2\2")
-        return buf.getvalue()
-
+    return [
+        4,0,25,192,6,-1,2,0,7,0,2,1,7,1,2,2,7,2,2,3,7,3,2,4,7,4,2,5,7,5,
+        2,6,7,6,2,7,7,7,2,8,7,8,2,9,7,9,2,10,7,10,2,11,7,11,2,12,7,12,2,
+        13,7,13,2,14,7,14,2,15,7,15,2,16,7,16,2,17,7,17,2,18,7,18,2,19,7,
+        19,2,20,7,20,2,21,7,21,2,22,7,22,2,23,7,23,2,24,7,24,1,0,1,0,1,1,
+        1,1,1,1,1,1,1,1,1,2,1,2,1,2,1,2,1,2,1,3,1,3,1,4,1,4,1,5,1,5,1,6,
+        1,6,1,7,1,7,1,7,1,7,1,7,1,7,1,8,1,8,1,8,1,8,1,8,1,8,1,8,1,8,1,8,
+        1,9,1,9,1,9,1,9,1,9,1,9,1,9,1,10,1,10,1,10,1,10,1,10,1,10,1,10,1,
+        10,1,10,1,10,1,10,1,11,1,11,1,11,1,11,1,11,1,11,1,11,1,12,1,12,1,
+        12,1,12,1,13,1,13,1,13,1,13,1,14,1,14,1,14,1,14,1,14,1,14,1,14,1,
+        14,1,14,1,14,1,14,1,14,1,15,1,15,1,15,1,15,1,15,1,15,1,15,1,15,1,
+        15,1,15,1,15,1,16,1,16,1,16,1,16,1,16,1,16,1,16,1,17,1,17,1,17,1,
+        17,1,17,1,17,1,17,1,17,1,18,1,18,1,18,1,18,1,18,1,18,1,18,1,18,1,
+        18,1,18,1,18,1,18,1,18,1,18,1,19,1,19,1,19,1,19,1,19,1,20,1,20,1,
+        20,1,20,1,20,1,20,1,20,1,20,1,21,1,21,1,22,1,22,1,23,1,23,1,24,1,
+        24,0,0,25,1,1,3,2,5,3,7,4,9,5,11,6,13,7,15,8,17,9,19,10,21,11,23,
+        12,25,13,27,14,29,15,31,16,33,17,35,18,37,19,39,20,41,21,43,22,45,
+        23,47,24,49,25,1,0,2,1,0,48,57,2,0,8,10,12,13,191,0,1,1,0,0,0,0,
+        3,1,0,0,0,0,5,1,0,0,0,0,7,1,0,0,0,0,9,1,0,0,0,0,11,1,0,0,0,0,13,
+        1,0,0,0,0,15,1,0,0,0,0,17,1,0,0,0,0,19,1,0,0,0,0,21,1,0,0,0,0,23,
+        1,0,0,0,0,25,1,0,0,0,0,27,1,0,0,0,0,29,1,0,0,0,0,31,1,0,0,0,0,33,
+        1,0,0,0,0,35,1,0,0,0,0,37,1,0,0,0,0,39,1,0,0,0,0,41,1,0,0,0,0,43,
+        1,0,0,0,0,45,1,0,0,0,0,47,1,0,0,0,0,49,1,0,0,0,1,51,1,0,0,0,3,53,
+        1,0,0,0,5,58,1,0,0,0,7,63,1,0,0,0,9,65,1,0,0,0,11,67,1,0,0,0,13,
+        69,1,0,0,0,15,71,1,0,0,0,17,77,1,0,0,0,19,86,1,0,0,0,21,93,1,0,0,
+        0,23,104,1,0,0,0,25,111,1,0,0,0,27,115,1,0,0,0,29,119,1,0,0,0,31,
+        131,1,0,0,0,33,142,1,0,0,0,35,149,1,0,0,0,37,157,1,0,0,0,39,171,
+        1,0,0,0,41,176,1,0,0,0,43,184,1,0,0,0,45,186,1,0,0,0,47,188,1,0,
+        0,0,49,190,1,0,0,0,51,52,5,32,0,0,52,2,1,0,0,0,53,54,5,32,0,0,54,
+        55,5,79,0,0,55,56,5,82,0,0,56,57,5,32,0,0,57,4,1,0,0,0,58,59,5,78,
+        0,0,59,60,5,79,0,0,60,61,5,84,0,0,61,62,5,32,0,0,62,6,1,0,0,0,63,
+        64,5,40,0,0,64,8,1,0,0,0,65,66,5,41,0,0,66,10,1,0,0,0,67,68,5,45,
+        0,0,68,12,1,0,0,0,69,70,5,58,0,0,70,14,1,0,0,0,71,72,5,116,0,0,72,
+        73,5,105,0,0,73,74,5,116,0,0,74,75,5,108,0,0,75,76,5,101,0,0,76,
+        16,1,0,0,0,77,78,5,115,0,0,78,79,5,117,0,0,79,80,5,98,0,0,80,81,
+        5,116,0,0,81,82,5,105,0,0,82,83,5,116,0,0,83,84,5,108,0,0,84,85,
+        5,101,0,0,85,18,1,0,0,0,86,87,5,97,0,0,87,88,5,114,0,0,88,89,5,116,
+        0,0,89,90,5,105,0,0,90,91,5,115,0,0,91,92,5,116,0,0,92,20,1,0,0,
+        0,93,94,5,115,0,0,94,95,5,116,0,0,95,96,5,101,0,0,96,97,5,112,0,
+        0,97,98,5,97,0,0,98,99,5,114,0,0,99,100,5,116,0,0,100,101,5,105,
+        0,0,101,102,5,115,0,0,102,103,5,116,0,0,103,22,1,0,0,0,104,105,5,
+        114,0,0,105,106,5,97,0,0,106,107,5,116,0,0,107,108,5,105,0,0,108,
+        109,5,110,0,0,109,110,5,103,0,0,110,24,1,0,0,0,111,112,5,98,0,0,
+        112,113,5,112,0,0,113,114,5,109,0,0,114,26,1,0,0,0,115,116,5,110,
+        0,0,116,117,5,112,0,0,117,118,5,115,0,0,118,28,1,0,0,0,119,120,5,
+        116,0,0,120,121,5,111,0,0,121,122,5,116,0,0,122,123,5,97,0,0,123,
+        124,5,108,0,0,124,125,5,115,0,0,125,126,5,116,0,0,126,127,5,114,
+        0,0,127,128,5,101,0,0,128,129,5,97,0,0,129,130,5,109,0,0,130,30,
+        1,0,0,0,131,132,5,116,0,0,132,133,5,111,0,0,133,134,5,116,0,0,134,
+        135,5,97,0,0,135,136,5,108,0,0,136,137,5,98,0,0,137,138,5,114,0,
+        0,138,139,5,101,0,0,139,140,5,97,0,0,140,141,5,107,0,0,141,32,1,
+        0,0,0,142,143,5,108,0,0,143,144,5,101,0,0,144,145,5,110,0,0,145,
+        146,5,103,0,0,146,147,5,116,0,0,147,148,5,104,0,0,148,34,1,0,0,0,
+        149,150,5,99,0,0,150,151,5,97,0,0,151,152,5,110,0,0,152,153,5,100,
+        0,0,153,154,5,108,0,0,154,155,5,101,0,0,155,156,5,115,0,0,156,36,
+        1,0,0,0,157,158,5,99,0,0,158,159,5,97,0,0,159,160,5,110,0,0,160,
+        161,5,100,0,0,161,162,5,108,0,0,162,163,5,101,0,0,163,164,5,100,
+        0,0,164,165,5,101,0,0,165,166,5,110,0,0,166,167,5,115,0,0,167,168,
+        5,105,0,0,168,169,5,116,0,0,169,170,5,121,0,0,170,38,1,0,0,0,171,
+        172,5,109,0,0,172,173,5,111,0,0,173,174,5,110,0,0,174,175,5,111,
+        0,0,175,40,1,0,0,0,176,177,5,97,0,0,177,178,5,110,0,0,178,179,5,
+        99,0,0,179,180,5,104,0,0,180,181,5,111,0,0,181,182,5,114,0,0,182,
+        183,5,115,0,0,183,42,1,0,0,0,184,185,5,43,0,0,185,44,1,0,0,0,186,
+        187,5,46,0,0,187,46,1,0,0,0,188,189,7,0,0,0,189,48,1,0,0,0,190,191,
+        8,1,0,0,191,50,1,0,0,0,1,0,0
+    ]
 
 class searchLexer(Lexer):
 
     atn = ATNDeserializer().deserialize(serializedATN())
 
-    decisionsToDFA = [DFA(ds, i) for i, ds in enumerate(atn.decisionToState)]
+    decisionsToDFA = [ DFA(ds, i) for i, ds in enumerate(atn.decisionToState) ]
 
     T__0 = 1
     T__1 = 2
@@ -49,30 +91,48 @@ class searchLexer(Lexer):
     T__6 = 7
     T__7 = 8
     T__8 = 9
-    CHAR = 10
+    T__9 = 10
+    T__10 = 11
+    T__11 = 12
+    T__12 = 13
+    T__13 = 14
+    T__14 = 15
+    T__15 = 16
+    T__16 = 17
+    T__17 = 18
+    T__18 = 19
+    T__19 = 20
+    T__20 = 21
+    T__21 = 22
+    T__22 = 23
+    DIGIT = 24
+    CHAR = 25
 
-    channelNames = [u"DEFAULT_TOKEN_CHANNEL", u"HIDDEN"]
+    channelNames = [ u"DEFAULT_TOKEN_CHANNEL", u"HIDDEN" ]
 
-    modeNames = ["DEFAULT_MODE"]
+    modeNames = [ "DEFAULT_MODE" ]
 
-    literalNames = [
-        "<INVALID>", "' '", "'-'", "':'", "'title'", "'subtitle'", "'artist'",
-        "'stepartist'", "'rating'", "'bpm'"
-    ]
+    literalNames = [ "<INVALID>",
+            "' '", "' OR '", "'NOT '", "'('", "')'", "'-'", "':'", "'title'", 
+            "'subtitle'", "'artist'", "'stepartist'", "'rating'", "'bpm'", 
+            "'nps'", "'totalstream'", "'totalbreak'", "'length'", "'candles'", 
+            "'candledensity'", "'mono'", "'anchors'", "'+'", "'.'" ]
 
-    symbolicNames = ["<INVALID>", "CHAR"]
+    symbolicNames = [ "<INVALID>",
+            "DIGIT", "CHAR" ]
 
-    ruleNames = [
-        "T__0", "T__1", "T__2", "T__3", "T__4", "T__5", "T__6", "T__7", "T__8",
-        "CHAR"
-    ]
+    ruleNames = [ "T__0", "T__1", "T__2", "T__3", "T__4", "T__5", "T__6", 
+                  "T__7", "T__8", "T__9", "T__10", "T__11", "T__12", "T__13", 
+                  "T__14", "T__15", "T__16", "T__17", "T__18", "T__19", 
+                  "T__20", "T__21", "T__22", "DIGIT", "CHAR" ]
 
     grammarFileName = "search.g4"
 
-    def __init__(self, input=None, output: TextIO = sys.stdout):
+    def __init__(self, input=None, output:TextIO = sys.stdout):
         super().__init__(input, output)
-        self.checkVersion("4.8")
-        self._interp = LexerATNSimulator(self, self.atn, self.decisionsToDFA,
-                                         PredictionContextCache())
+        self.checkVersion("4.13.2")
+        self._interp = LexerATNSimulator(self, self.atn, self.decisionsToDFA, PredictionContextCache())
         self._actions = None
         self._predicates = None
+
+
@@ -1,53 +1,120 @@
-# Generated from search.g4 by ANTLR 4.8
+# Generated from search.g4 by ANTLR 4.13.2
 from antlr4 import *
-if __name__ is not None and "." in __name__:
+if "." in __name__:
     from .searchParser import searchParser
 else:
     from searchParser import searchParser
 
-
 # This class defines a complete listener for a parse tree produced by searchParser.
 class searchListener(ParseTreeListener):
 
     # Enter a parse tree produced by searchParser#search_statement.
-    def enterSearch_statement(self, ctx: searchParser.Search_statementContext):
+    def enterSearch_statement(self, ctx:searchParser.Search_statementContext):
         pass
 
     # Exit a parse tree produced by searchParser#search_statement.
-    def exitSearch_statement(self, ctx: searchParser.Search_statementContext):
+    def exitSearch_statement(self, ctx:searchParser.Search_statementContext):
         pass
 
+
     # Enter a parse tree produced by searchParser#song_title.
-    def enterSong_title(self, ctx: searchParser.Song_titleContext):
+    def enterSong_title(self, ctx:searchParser.Song_titleContext):
         pass
 
     # Exit a parse tree produced by searchParser#song_title.
-    def exitSong_title(self, ctx: searchParser.Song_titleContext):
+    def exitSong_title(self, ctx:searchParser.Song_titleContext):
+        pass
+
+
+    # Enter a parse tree produced by searchParser#query.
+    def enterQuery(self, ctx:searchParser.QueryContext):
         pass
 
+    # Exit a parse tree produced by searchParser#query.
+    def exitQuery(self, ctx:searchParser.QueryContext):
+        pass
+
+
+    # Enter a parse tree produced by searchParser#and_query.
+    def enterAnd_query(self, ctx:searchParser.And_queryContext):
+        pass
+
+    # Exit a parse tree produced by searchParser#and_query.
+    def exitAnd_query(self, ctx:searchParser.And_queryContext):
+        pass
+
+
+    # Enter a parse tree produced by searchParser#term.
+    def enterTerm(self, ctx:searchParser.TermContext):
+        pass
+
+    # Exit a parse tree produced by searchParser#term.
+    def exitTerm(self, ctx:searchParser.TermContext):
+        pass
+
+
     # Enter a parse tree produced by searchParser#tag_statement.
-    def enterTag_statement(self, ctx: searchParser.Tag_statementContext):
+    def enterTag_statement(self, ctx:searchParser.Tag_statementContext):
         pass
 
     # Exit a parse tree produced by searchParser#tag_statement.
-    def exitTag_statement(self, ctx: searchParser.Tag_statementContext):
+    def exitTag_statement(self, ctx:searchParser.Tag_statementContext):
         pass
 
+
     # Enter a parse tree produced by searchParser#tag.
-    def enterTag(self, ctx: searchParser.TagContext):
+    def enterTag(self, ctx:searchParser.TagContext):
         pass
 
     # Exit a parse tree produced by searchParser#tag.
-    def exitTag(self, ctx: searchParser.TagContext):
+    def exitTag(self, ctx:searchParser.TagContext):
         pass
 
+
+    # Enter a parse tree produced by searchParser#range_tag.
+    def enterRange_tag(self, ctx:searchParser.Range_tagContext):
+        pass
+
+    # Exit a parse tree produced by searchParser#range_tag.
+    def exitRange_tag(self, ctx:searchParser.Range_tagContext):
+        pass
+
+
+    # Enter a parse tree produced by searchParser#range.
+    def enterRange(self, ctx:searchParser.RangeContext):
+        pass
+
+    # Exit a parse tree produced by searchParser#range.
+    def exitRange(self, ctx:searchParser.RangeContext):
+        pass
+
+
+    # Enter a parse tree produced by searchParser#number.
+    def enterNumber(self, ctx:searchParser.NumberContext):
+        pass
+
+    # Exit a parse tree produced by searchParser#number.
+    def exitNumber(self, ctx:searchParser.NumberContext):
+        pass
+
+
     # Enter a parse tree produced by searchParser#value.
-    def enterValue(self, ctx: searchParser.ValueContext):
+    def enterValue(self, ctx:searchParser.ValueContext):
         pass
 
     # Exit a parse tree produced by searchParser#value.
-    def exitValue(self, ctx: searchParser.ValueContext):
+    def exitValue(self, ctx:searchParser.ValueContext):
+        pass
+
+
+    # Enter a parse tree produced by searchParser#text.
+    def enterText(self, ctx:searchParser.TextContext):
         pass
 
+    # Exit a parse tree produced by searchParser#text.
+    def exitText(self, ctx:searchParser.TextContext):
+        pass
+
+
 
-del searchParser
+del searchParser
\ No newline at end of file
@@ -1,175 +1,212 @@
-# Generated from search.g4 by ANTLR 4.8
+# Generated from search.g4 by ANTLR 4.13.2
 # encoding: utf-8
 from antlr4 import *
 from io import StringIO
 import sys
 if sys.version_info[1] > 5:
-    from typing import TextIO
+	from typing import TextIO
 else:
-    from typing.io import TextIO
-
+	from typing.io import TextIO
 
 def serializedATN():
-    with StringIO() as buf:
-        buf.write("\3\u608b\ua72a\u8133\ub9ed\u417c\u3be7\u7786\u5964\3\f")
-        buf.write("=\4\2\t\2\4\3\t\3\4\4\t\4\4\5\t\5\4\6\t\6\3\2\3\2\3\2")
-        buf.write("\3\2\6\2\21\n\2\r\2\16\2\22\3\2\3\2\3\2\7\2\30\n\2\f\2")
-        buf.write("\16\2\33\13\2\5\2\35\n\2\3\3\3\3\3\4\3\4\3\4\3\4\3\4\3")
-        buf.write("\5\3\5\3\6\6\6)\n\6\r\6\16\6*\3\6\7\6.\n\6\f\6\16\6\61")
-        buf.write("\13\6\3\6\6\6\64\n\6\r\6\16\6\65\7\68\n\6\f\6\16\6;\13")
-        buf.write("\6\3\6\2\2\7\2\4\6\b\n\2\3\3\2\6\13\2?\2\34\3\2\2\2\4")
-        buf.write("\36\3\2\2\2\6 \3\2\2\2\b%\3\2\2\2\n(\3\2\2\2\f\35\5\4")
-        buf.write("\3\2\r\20\5\4\3\2\16\17\7\3\2\2\17\21\5\6\4\2\20\16\3")
-        buf.write("\2\2\2\21\22\3\2\2\2\22\20\3\2\2\2\22\23\3\2\2\2\23\35")
-        buf.write("\3\2\2\2\24\31\5\6\4\2\25\26\7\3\2\2\26\30\5\6\4\2\27")
-        buf.write("\25\3\2\2\2\30\33\3\2\2\2\31\27\3\2\2\2\31\32\3\2\2\2")
-        buf.write("\32\35\3\2\2\2\33\31\3\2\2\2\34\f\3\2\2\2\34\r\3\2\2\2")
-        buf.write("\34\24\3\2\2\2\35\3\3\2\2\2\36\37\5\n\6\2\37\5\3\2\2\2")
-        buf.write(" !\7\4\2\2!\"\5\b\5\2\"#\7\5\2\2#$\5\n\6\2$\7\3\2\2\2")
-        buf.write("%&\t\2\2\2&\t\3\2\2\2\')\7\f\2\2(\'\3\2\2\2)*\3\2\2\2")
-        buf.write("*(\3\2\2\2*+\3\2\2\2+9\3\2\2\2,.\7\3\2\2-,\3\2\2\2.\61")
-        buf.write("\3\2\2\2/-\3\2\2\2/\60\3\2\2\2\60\63\3\2\2\2\61/\3\2\2")
-        buf.write("\2\62\64\7\f\2\2\63\62\3\2\2\2\64\65\3\2\2\2\65\63\3\2")
-        buf.write("\2\2\65\66\3\2\2\2\668\3\2\2\2\67/\3\2\2\28;\3\2\2\29")
-        buf.write("\67\3\2\2\29:\3\2\2\2:\13\3\2\2\2;9\3\2\2\2\t\22\31\34")
-        buf.write("*/\659")
-        return buf.getvalue()
-
-
-class searchParser(Parser):
+    return [
+        4,1,25,141,2,0,7,0,2,1,7,1,2,2,7,2,2,3,7,3,2,4,7,4,2,5,7,5,2,6,7,
+        6,2,7,7,7,2,8,7,8,2,9,7,9,2,10,7,10,2,11,7,11,1,0,1,0,1,0,1,0,1,
+        0,1,0,1,0,1,0,1,0,1,0,1,0,3,0,36,8,0,1,1,1,1,1,2,1,2,1,2,5,2,43,
+        8,2,10,2,12,2,46,9,2,1,3,1,3,1,3,5,3,51,8,3,10,3,12,3,54,9,3,1,4,
+        1,4,1,4,1,4,1,4,1,4,1,4,3,4,63,8,4,1,5,1,5,1,5,1,5,1,5,1,5,1,5,1,
+        5,1,5,1,5,3,5,75,8,5,1,6,1,6,1,7,1,7,1,8,1,8,1,8,1,8,1,8,1,8,1,8,
+        1,8,1,8,1,8,1,8,3,8,92,8,8,1,9,4,9,95,8,9,11,9,12,9,96,1,9,1,9,4,
+        9,101,8,9,11,9,12,9,102,3,9,105,8,9,1,10,4,10,108,8,10,11,10,12,
+        10,109,1,10,5,10,113,8,10,10,10,12,10,116,9,10,1,10,4,10,119,8,10,
+        11,10,12,10,120,5,10,123,8,10,10,10,12,10,126,9,10,1,11,1,11,1,11,
+        1,11,1,11,1,11,1,11,1,11,1,11,1,11,1,11,3,11,139,8,11,1,11,0,0,12,
+        0,2,4,6,8,10,12,14,16,18,20,22,0,2,1,0,8,11,1,0,12,21,155,0,35,1,
+        0,0,0,2,37,1,0,0,0,4,39,1,0,0,0,6,47,1,0,0,0,8,62,1,0,0,0,10,74,
+        1,0,0,0,12,76,1,0,0,0,14,78,1,0,0,0,16,91,1,0,0,0,18,94,1,0,0,0,
+        20,107,1,0,0,0,22,138,1,0,0,0,24,25,3,2,1,0,25,26,5,0,0,1,26,36,
+        1,0,0,0,27,28,3,2,1,0,28,29,5,1,0,0,29,30,3,4,2,0,30,31,5,0,0,1,
+        31,36,1,0,0,0,32,33,3,4,2,0,33,34,5,0,0,1,34,36,1,0,0,0,35,24,1,
+        0,0,0,35,27,1,0,0,0,35,32,1,0,0,0,36,1,1,0,0,0,37,38,3,20,10,0,38,
+        3,1,0,0,0,39,44,3,6,3,0,40,41,5,2,0,0,41,43,3,6,3,0,42,40,1,0,0,
+        0,43,46,1,0,0,0,44,42,1,0,0,0,44,45,1,0,0,0,45,5,1,0,0,0,46,44,1,
+        0,0,0,47,52,3,8,4,0,48,49,5,1,0,0,49,51,3,8,4,0,50,48,1,0,0,0,51,
+        54,1,0,0,0,52,50,1,0,0,0,52,53,1,0,0,0,53,7,1,0,0,0,54,52,1,0,0,
+        0,55,56,5,3,0,0,56,63,3,8,4,0,57,58,5,4,0,0,58,59,3,4,2,0,59,60,
+        5,5,0,0,60,63,1,0,0,0,61,63,3,10,5,0,62,55,1,0,0,0,62,57,1,0,0,0,
+        62,61,1,0,0,0,63,9,1,0,0,0,64,65,5,6,0,0,65,66,3,12,6,0,66,67,5,
+        7,0,0,67,68,3,20,10,0,68,75,1,0,0,0,69,70,5,6,0,0,70,71,3,14,7,0,
+        71,72,5,7,0,0,72,73,3,16,8,0,73,75,1,0,0,0,74,64,1,0,0,0,74,69,1,
+        0,0,0,75,11,1,0,0,0,76,77,7,0,0,0,77,13,1,0,0,0,78,79,7,1,0,0,79,
+        15,1,0,0,0,80,92,3,18,9,0,81,82,3,18,9,0,82,83,5,22,0,0,83,92,1,
+        0,0,0,84,85,3,18,9,0,85,86,5,6,0,0,86,92,1,0,0,0,87,88,3,18,9,0,
+        88,89,5,6,0,0,89,90,3,18,9,0,90,92,1,0,0,0,91,80,1,0,0,0,91,81,1,
+        0,0,0,91,84,1,0,0,0,91,87,1,0,0,0,92,17,1,0,0,0,93,95,5,24,0,0,94,
+        93,1,0,0,0,95,96,1,0,0,0,96,94,1,0,0,0,96,97,1,0,0,0,97,104,1,0,
+        0,0,98,100,5,23,0,0,99,101,5,24,0,0,100,99,1,0,0,0,101,102,1,0,0,
+        0,102,100,1,0,0,0,102,103,1,0,0,0,103,105,1,0,0,0,104,98,1,0,0,0,
+        104,105,1,0,0,0,105,19,1,0,0,0,106,108,3,22,11,0,107,106,1,0,0,0,
+        108,109,1,0,0,0,109,107,1,0,0,0,109,110,1,0,0,0,110,124,1,0,0,0,
+        111,113,5,1,0,0,112,111,1,0,0,0,113,116,1,0,0,0,114,112,1,0,0,0,
+        114,115,1,0,0,0,115,118,1,0,0,0,116,114,1,0,0,0,117,119,3,22,11,
+        0,118,117,1,0,0,0,119,120,1,0,0,0,120,118,1,0,0,0,120,121,1,0,0,
+        0,121,123,1,0,0,0,122,114,1,0,0,0,123,126,1,0,0,0,124,122,1,0,0,
+        0,124,125,1,0,0,0,125,21,1,0,0,0,126,124,1,0,0,0,127,139,5,25,0,
+        0,128,139,5,24,0,0,129,139,5,23,0,0,130,139,5,22,0,0,131,139,5,6,
+        0,0,132,139,5,4,0,0,133,139,5,5,0,0,134,139,5,2,0,0,135,139,5,3,
+        0,0,136,139,3,12,6,0,137,139,3,14,7,0,138,127,1,0,0,0,138,128,1,
+        0,0,0,138,129,1,0,0,0,138,130,1,0,0,0,138,131,1,0,0,0,138,132,1,
+        0,0,0,138,133,1,0,0,0,138,134,1,0,0,0,138,135,1,0,0,0,138,136,1,
+        0,0,0,138,137,1,0,0,0,139,23,1,0,0,0,14,35,44,52,62,74,91,96,102,
+        104,109,114,120,124,138
+    ]
+
+class searchParser ( Parser ):
 
     grammarFileName = "search.g4"
 
     atn = ATNDeserializer().deserialize(serializedATN())
 
-    decisionsToDFA = [DFA(ds, i) for i, ds in enumerate(atn.decisionToState)]
+    decisionsToDFA = [ DFA(ds, i) for i, ds in enumerate(atn.decisionToState) ]
 
     sharedContextCache = PredictionContextCache()
 
-    literalNames = [
-        "<INVALID>", "' '", "'-'", "':'", "'title'", "'subtitle'", "'artist'",
-        "'stepartist'", "'rating'", "'bpm'"
-    ]
+    literalNames = [ "<INVALID>", "' '", "' OR '", "'NOT '", "'('", "')'", 
+                     "'-'", "':'", "'title'", "'subtitle'", "'artist'", 
+                     "'stepartist'", "'rating'", "'bpm'", "'nps'", "'totalstream'", 
+                     "'totalbreak'", "'length'", "'candles'", "'candledensity'", 
+                     "'mono'", "'anchors'", "'+'", "'.'" ]
 
-    symbolicNames = [
-        "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>",
-        "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", "CHAR"
-    ]
+    symbolicNames = [ "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", 
+                      "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", 
+                      "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", 
+                      "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", 
+                      "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", 
+                      "<INVALID>", "<INVALID>", "<INVALID>", "<INVALID>", 
+                      "DIGIT", "CHAR" ]
 
     RULE_search_statement = 0
     RULE_song_title = 1
-    RULE_tag_statement = 2
-    RULE_tag = 3
-    RULE_value = 4
-
-    ruleNames = [
-        "search_statement", "song_title", "tag_statement", "tag", "value"
-    ]
+    RULE_query = 2
+    RULE_and_query = 3
+    RULE_term = 4
+    RULE_tag_statement = 5
+    RULE_tag = 6
+    RULE_range_tag = 7
+    RULE_range = 8
+    RULE_number = 9
+    RULE_value = 10
+    RULE_text = 11
+
+    ruleNames =  [ "search_statement", "song_title", "query", "and_query", 
+                   "term", "tag_statement", "tag", "range_tag", "range", 
+                   "number", "value", "text" ]
 
     EOF = Token.EOF
-    T__0 = 1
-    T__1 = 2
-    T__2 = 3
-    T__3 = 4
-    T__4 = 5
-    T__5 = 6
-    T__6 = 7
-    T__7 = 8
-    T__8 = 9
-    CHAR = 10
-
-    def __init__(self, input: TokenStream, output: TextIO = sys.stdout):
+    T__0=1
+    T__1=2
+    T__2=3
+    T__3=4
+    T__4=5
+    T__5=6
+    T__6=7
+    T__7=8
+    T__8=9
+    T__9=10
+    T__10=11
+    T__11=12
+    T__12=13
+    T__13=14
+    T__14=15
+    T__15=16
+    T__16=17
+    T__17=18
+    T__18=19
+    T__19=20
+    T__20=21
+    T__21=22
+    T__22=23
+    DIGIT=24
+    CHAR=25
+
+    def __init__(self, input:TokenStream, output:TextIO = sys.stdout):
         super().__init__(input, output)
-        self.checkVersion("4.8")
-        self._interp = ParserATNSimulator(self, self.atn, self.decisionsToDFA,
-                                          self.sharedContextCache)
+        self.checkVersion("4.13.2")
+        self._interp = ParserATNSimulator(self, self.atn, self.decisionsToDFA, self.sharedContextCache)
         self._predicates = None
 
+
+
+
     class Search_statementContext(ParserRuleContext):
+        __slots__ = 'parser'
 
-        def __init__(self,
-                     parser,
-                     parent: ParserRuleContext = None,
-                     invokingState: int = -1):
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
             super().__init__(parent, invokingState)
             self.parser = parser
 
         def song_title(self):
-            return self.getTypedRuleContext(searchParser.Song_titleContext, 0)
+            return self.getTypedRuleContext(searchParser.Song_titleContext,0)
+
+
+        def EOF(self):
+            return self.getToken(searchParser.EOF, 0)
+
+        def query(self):
+            return self.getTypedRuleContext(searchParser.QueryContext,0)
 
-        def tag_statement(self, i: int = None):
-            if i is None:
-                return self.getTypedRuleContexts(
-                    searchParser.Tag_statementContext)
-            else:
-                return self.getTypedRuleContext(
-                    searchParser.Tag_statementContext, i)
 
         def getRuleIndex(self):
             return searchParser.RULE_search_statement
 
-        def enterRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "enterSearch_statement"):
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterSearch_statement" ):
                 listener.enterSearch_statement(self)
 
-        def exitRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "exitSearch_statement"):
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitSearch_statement" ):
                 listener.exitSearch_statement(self)
 
+
+
+
     def search_statement(self):
 
-        localctx = searchParser.Search_statementContext(
-            self, self._ctx, self.state)
+        localctx = searchParser.Search_statementContext(self, self._ctx, self.state)
         self.enterRule(localctx, 0, self.RULE_search_statement)
-        self._la = 0  # Token type
         try:
-            self.state = 26
+            self.state = 35
             self._errHandler.sync(self)
-            la_ = self._interp.adaptivePredict(self._input, 2, self._ctx)
+            la_ = self._interp.adaptivePredict(self._input,0,self._ctx)
             if la_ == 1:
                 self.enterOuterAlt(localctx, 1)
-                self.state = 10
+                self.state = 24
                 self.song_title()
+                self.state = 25
+                self.match(searchParser.EOF)
                 pass
 
             elif la_ == 2:
                 self.enterOuterAlt(localctx, 2)
-                self.state = 11
+                self.state = 27
                 self.song_title()
-                self.state = 14
-                self._errHandler.sync(self)
-                _la = self._input.LA(1)
-                while True:
-                    self.state = 12
-                    self.match(searchParser.T__0)
-                    self.state = 13
-                    self.tag_statement()
-                    self.state = 16
-                    self._errHandler.sync(self)
-                    _la = self._input.LA(1)
-                    if not (_la == searchParser.T__0):
-                        break
-
+                self.state = 28
+                self.match(searchParser.T__0)
+                self.state = 29
+                self.query()
+                self.state = 30
+                self.match(searchParser.EOF)
                 pass
 
             elif la_ == 3:
                 self.enterOuterAlt(localctx, 3)
-                self.state = 18
-                self.tag_statement()
-                self.state = 23
-                self._errHandler.sync(self)
-                _la = self._input.LA(1)
-                while _la == searchParser.T__0:
-                    self.state = 19
-                    self.match(searchParser.T__0)
-                    self.state = 20
-                    self.tag_statement()
-                    self.state = 25
-                    self._errHandler.sync(self)
-                    _la = self._input.LA(1)
-
+                self.state = 32
+                self.query()
+                self.state = 33
+                self.match(searchParser.EOF)
                 pass
 
+
         except RecognitionException as re:
             localctx.exception = re
             self._errHandler.reportError(self, re)
@@ -178,36 +215,39 @@ class searchParser(Parser):
             self.exitRule()
         return localctx
 
+
     class Song_titleContext(ParserRuleContext):
+        __slots__ = 'parser'
 
-        def __init__(self,
-                     parser,
-                     parent: ParserRuleContext = None,
-                     invokingState: int = -1):
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
             super().__init__(parent, invokingState)
             self.parser = parser
 
         def value(self):
-            return self.getTypedRuleContext(searchParser.ValueContext, 0)
+            return self.getTypedRuleContext(searchParser.ValueContext,0)
+
 
         def getRuleIndex(self):
             return searchParser.RULE_song_title
 
-        def enterRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "enterSong_title"):
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterSong_title" ):
                 listener.enterSong_title(self)
 
-        def exitRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "exitSong_title"):
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitSong_title" ):
                 listener.exitSong_title(self)
 
+
+
+
     def song_title(self):
 
         localctx = searchParser.Song_titleContext(self, self._ctx, self.state)
         self.enterRule(localctx, 2, self.RULE_song_title)
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 28
+            self.state = 37
             self.value()
         except RecognitionException as re:
             localctx.exception = re
@@ -217,47 +257,267 @@ class searchParser(Parser):
             self.exitRule()
         return localctx
 
+
+    class QueryContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def and_query(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(searchParser.And_queryContext)
+            else:
+                return self.getTypedRuleContext(searchParser.And_queryContext,i)
+
+
+        def getRuleIndex(self):
+            return searchParser.RULE_query
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterQuery" ):
+                listener.enterQuery(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitQuery" ):
+                listener.exitQuery(self)
+
+
+
+
+    def query(self):
+
+        localctx = searchParser.QueryContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 4, self.RULE_query)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 39
+            self.and_query()
+            self.state = 44
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            while _la==2:
+                self.state = 40
+                self.match(searchParser.T__1)
+                self.state = 41
+                self.and_query()
+                self.state = 46
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class And_queryContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def term(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(searchParser.TermContext)
+            else:
+                return self.getTypedRuleContext(searchParser.TermContext,i)
+
+
+        def getRuleIndex(self):
+            return searchParser.RULE_and_query
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterAnd_query" ):
+                listener.enterAnd_query(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitAnd_query" ):
+                listener.exitAnd_query(self)
+
+
+
+
+    def and_query(self):
+
+        localctx = searchParser.And_queryContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 6, self.RULE_and_query)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 47
+            self.term()
+            self.state = 52
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            while _la==1:
+                self.state = 48
+                self.match(searchParser.T__0)
+                self.state = 49
+                self.term()
+                self.state = 54
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class TermContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def term(self):
+            return self.getTypedRuleContext(searchParser.TermContext,0)
+
+
+        def query(self):
+            return self.getTypedRuleContext(searchParser.QueryContext,0)
+
+
+        def tag_statement(self):
+            return self.getTypedRuleContext(searchParser.Tag_statementContext,0)
+
+
+        def getRuleIndex(self):
+            return searchParser.RULE_term
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterTerm" ):
+                listener.enterTerm(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitTerm" ):
+                listener.exitTerm(self)
+
+
+
+
+    def term(self):
+
+        localctx = searchParser.TermContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 8, self.RULE_term)
+        try:
+            self.state = 62
+            self._errHandler.sync(self)
+            token = self._input.LA(1)
+            if token in [3]:
+                self.enterOuterAlt(localctx, 1)
+                self.state = 55
+                self.match(searchParser.T__2)
+                self.state = 56
+                self.term()
+                pass
+            elif token in [4]:
+                self.enterOuterAlt(localctx, 2)
+                self.state = 57
+                self.match(searchParser.T__3)
+                self.state = 58
+                self.query()
+                self.state = 59
+                self.match(searchParser.T__4)
+                pass
+            elif token in [6]:
+                self.enterOuterAlt(localctx, 3)
+                self.state = 61
+                self.tag_statement()
+                pass
+            else:
+                raise NoViableAltException(self)
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
     class Tag_statementContext(ParserRuleContext):
+        __slots__ = 'parser'
 
-        def __init__(self,
-                     parser,
-                     parent: ParserRuleContext = None,
-                     invokingState: int = -1):
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
             super().__init__(parent, invokingState)
             self.parser = parser
 
         def tag(self):
-            return self.getTypedRuleContext(searchParser.TagContext, 0)
+            return self.getTypedRuleContext(searchParser.TagContext,0)
+
 
         def value(self):
-            return self.getTypedRuleContext(searchParser.ValueContext, 0)
+            return self.getTypedRuleContext(searchParser.ValueContext,0)
+
+
+        def range_tag(self):
+            return self.getTypedRuleContext(searchParser.Range_tagContext,0)
+
+
+        def range_(self):
+            return self.getTypedRuleContext(searchParser.RangeContext,0)
+
 
         def getRuleIndex(self):
             return searchParser.RULE_tag_statement
 
-        def enterRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "enterTag_statement"):
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterTag_statement" ):
                 listener.enterTag_statement(self)
 
-        def exitRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "exitTag_statement"):
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitTag_statement" ):
                 listener.exitTag_statement(self)
 
+
+
+
     def tag_statement(self):
 
-        localctx = searchParser.Tag_statementContext(self, self._ctx,
-                                                     self.state)
-        self.enterRule(localctx, 4, self.RULE_tag_statement)
+        localctx = searchParser.Tag_statementContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 10, self.RULE_tag_statement)
         try:
-            self.enterOuterAlt(localctx, 1)
-            self.state = 30
-            self.match(searchParser.T__1)
-            self.state = 31
-            self.tag()
-            self.state = 32
-            self.match(searchParser.T__2)
-            self.state = 33
-            self.value()
+            self.state = 74
+            self._errHandler.sync(self)
+            la_ = self._interp.adaptivePredict(self._input,4,self._ctx)
+            if la_ == 1:
+                self.enterOuterAlt(localctx, 1)
+                self.state = 64
+                self.match(searchParser.T__5)
+                self.state = 65
+                self.tag()
+                self.state = 66
+                self.match(searchParser.T__6)
+                self.state = 67
+                self.value()
+                pass
+
+            elif la_ == 2:
+                self.enterOuterAlt(localctx, 2)
+                self.state = 69
+                self.match(searchParser.T__5)
+                self.state = 70
+                self.range_tag()
+                self.state = 71
+                self.match(searchParser.T__6)
+                self.state = 72
+                self.range_()
+                pass
+
+
         except RecognitionException as re:
             localctx.exception = re
             self._errHandler.reportError(self, re)
@@ -266,41 +526,39 @@ class searchParser(Parser):
             self.exitRule()
         return localctx
 
+
     class TagContext(ParserRuleContext):
+        __slots__ = 'parser'
 
-        def __init__(self,
-                     parser,
-                     parent: ParserRuleContext = None,
-                     invokingState: int = -1):
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
             super().__init__(parent, invokingState)
             self.parser = parser
 
+
         def getRuleIndex(self):
             return searchParser.RULE_tag
 
-        def enterRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "enterTag"):
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterTag" ):
                 listener.enterTag(self)
 
-        def exitRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "exitTag"):
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitTag" ):
                 listener.exitTag(self)
 
+
+
+
     def tag(self):
 
         localctx = searchParser.TagContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 6, self.RULE_tag)
-        self._la = 0  # Token type
+        self.enterRule(localctx, 12, self.RULE_tag)
+        self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 35
+            self.state = 76
             _la = self._input.LA(1)
-            if not ((((_la) & ~0x3f) == 0 and
-                     ((1 << _la) &
-                      ((1 << searchParser.T__3) | (1 << searchParser.T__4) |
-                       (1 << searchParser.T__5) | (1 << searchParser.T__6) |
-                       (1 << searchParser.T__7) |
-                       (1 << searchParser.T__8))) != 0)):
+            if not((((_la) & ~0x3f) == 0 and ((1 << _la) & 3840) != 0)):
                 self._errHandler.recoverInline(self)
             else:
                 self._errHandler.reportMatch(self)
@@ -313,86 +571,286 @@ class searchParser(Parser):
             self.exitRule()
         return localctx
 
+
+    class Range_tagContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+
+        def getRuleIndex(self):
+            return searchParser.RULE_range_tag
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterRange_tag" ):
+                listener.enterRange_tag(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitRange_tag" ):
+                listener.exitRange_tag(self)
+
+
+
+
+    def range_tag(self):
+
+        localctx = searchParser.Range_tagContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 14, self.RULE_range_tag)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 78
+            _la = self._input.LA(1)
+            if not((((_la) & ~0x3f) == 0 and ((1 << _la) & 4190208) != 0)):
+                self._errHandler.recoverInline(self)
+            else:
+                self._errHandler.reportMatch(self)
+                self.consume()
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class RangeContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def number(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(searchParser.NumberContext)
+            else:
+                return self.getTypedRuleContext(searchParser.NumberContext,i)
+
+
+        def getRuleIndex(self):
+            return searchParser.RULE_range
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterRange" ):
+                listener.enterRange(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitRange" ):
+                listener.exitRange(self)
+
+
+
+
+    def range_(self):
+
+        localctx = searchParser.RangeContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 16, self.RULE_range)
+        try:
+            self.state = 91
+            self._errHandler.sync(self)
+            la_ = self._interp.adaptivePredict(self._input,5,self._ctx)
+            if la_ == 1:
+                self.enterOuterAlt(localctx, 1)
+                self.state = 80
+                self.number()
+                pass
+
+            elif la_ == 2:
+                self.enterOuterAlt(localctx, 2)
+                self.state = 81
+                self.number()
+                self.state = 82
+                self.match(searchParser.T__21)
+                pass
+
+            elif la_ == 3:
+                self.enterOuterAlt(localctx, 3)
+                self.state = 84
+                self.number()
+                self.state = 85
+                self.match(searchParser.T__5)
+                pass
+
+            elif la_ == 4:
+                self.enterOuterAlt(localctx, 4)
+                self.state = 87
+                self.number()
+                self.state = 88
+                self.match(searchParser.T__5)
+                self.state = 89
+                self.number()
+                pass
+
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class NumberContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def DIGIT(self, i:int=None):
+            if i is None:
+                return self.getTokens(searchParser.DIGIT)
+            else:
+                return self.getToken(searchParser.DIGIT, i)
+
+        def getRuleIndex(self):
+            return searchParser.RULE_number
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterNumber" ):
+                listener.enterNumber(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitNumber" ):
+                listener.exitNumber(self)
+
+
+
+
+    def number(self):
+
+        localctx = searchParser.NumberContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 18, self.RULE_number)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 94 
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            while True:
+                self.state = 93
+                self.match(searchParser.DIGIT)
+                self.state = 96 
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+                if not (_la==24):
+                    break
+
+            self.state = 104
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            if _la==23:
+                self.state = 98
+                self.match(searchParser.T__22)
+                self.state = 100 
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+                while True:
+                    self.state = 99
+                    self.match(searchParser.DIGIT)
+                    self.state = 102 
+                    self._errHandler.sync(self)
+                    _la = self._input.LA(1)
+                    if not (_la==24):
+                        break
+
+
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
     class ValueContext(ParserRuleContext):
+        __slots__ = 'parser'
 
-        def __init__(self,
-                     parser,
-                     parent: ParserRuleContext = None,
-                     invokingState: int = -1):
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
             super().__init__(parent, invokingState)
             self.parser = parser
 
-        def CHAR(self, i: int = None):
+        def text(self, i:int=None):
             if i is None:
-                return self.getTokens(searchParser.CHAR)
+                return self.getTypedRuleContexts(searchParser.TextContext)
             else:
-                return self.getToken(searchParser.CHAR, i)
+                return self.getTypedRuleContext(searchParser.TextContext,i)
+
 
         def getRuleIndex(self):
             return searchParser.RULE_value
 
-        def enterRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "enterValue"):
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterValue" ):
                 listener.enterValue(self)
 
-        def exitRule(self, listener: ParseTreeListener):
-            if hasattr(listener, "exitValue"):
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitValue" ):
                 listener.exitValue(self)
 
+
+
+
     def value(self):
 
         localctx = searchParser.ValueContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 8, self.RULE_value)
-        self._la = 0  # Token type
+        self.enterRule(localctx, 20, self.RULE_value)
+        self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 38
+            self.state = 107 
             self._errHandler.sync(self)
             _alt = 1
-            while _alt != 2 and _alt != ATN.INVALID_ALT_NUMBER:
+            while _alt!=2 and _alt!=ATN.INVALID_ALT_NUMBER:
                 if _alt == 1:
-                    self.state = 37
-                    self.match(searchParser.CHAR)
+                    self.state = 106
+                    self.text()
 
                 else:
                     raise NoViableAltException(self)
-                self.state = 40
+                self.state = 109 
                 self._errHandler.sync(self)
-                _alt = self._interp.adaptivePredict(self._input, 3, self._ctx)
+                _alt = self._interp.adaptivePredict(self._input,9,self._ctx)
 
-            self.state = 55
+            self.state = 124
             self._errHandler.sync(self)
-            _alt = self._interp.adaptivePredict(self._input, 6, self._ctx)
-            while _alt != 2 and _alt != ATN.INVALID_ALT_NUMBER:
-                if _alt == 1:
-                    self.state = 45
+            _alt = self._interp.adaptivePredict(self._input,12,self._ctx)
+            while _alt!=2 and _alt!=ATN.INVALID_ALT_NUMBER:
+                if _alt==1:
+                    self.state = 114
                     self._errHandler.sync(self)
                     _la = self._input.LA(1)
-                    while _la == searchParser.T__0:
-                        self.state = 42
+                    while _la==1:
+                        self.state = 111
                         self.match(searchParser.T__0)
-                        self.state = 47
+                        self.state = 116
                         self._errHandler.sync(self)
                         _la = self._input.LA(1)
 
-                    self.state = 49
+                    self.state = 118 
                     self._errHandler.sync(self)
                     _alt = 1
-                    while _alt != 2 and _alt != ATN.INVALID_ALT_NUMBER:
+                    while _alt!=2 and _alt!=ATN.INVALID_ALT_NUMBER:
                         if _alt == 1:
-                            self.state = 48
-                            self.match(searchParser.CHAR)
+                            self.state = 117
+                            self.text()
 
                         else:
                             raise NoViableAltException(self)
-                        self.state = 51
+                        self.state = 120 
                         self._errHandler.sync(self)
-                        _alt = self._interp.adaptivePredict(
-                            self._input, 5, self._ctx)
-
-                self.state = 57
+                        _alt = self._interp.adaptivePredict(self._input,11,self._ctx)
+             
+                self.state = 126
                 self._errHandler.sync(self)
-                _alt = self._interp.adaptivePredict(self._input, 6, self._ctx)
+                _alt = self._interp.adaptivePredict(self._input,12,self._ctx)
 
         except RecognitionException as re:
             localctx.exception = re
@@ -401,3 +859,118 @@ class searchParser(Parser):
         finally:
             self.exitRule()
         return localctx
+
+
+    class TextContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def CHAR(self):
+            return self.getToken(searchParser.CHAR, 0)
+
+        def DIGIT(self):
+            return self.getToken(searchParser.DIGIT, 0)
+
+        def tag(self):
+            return self.getTypedRuleContext(searchParser.TagContext,0)
+
+
+        def range_tag(self):
+            return self.getTypedRuleContext(searchParser.Range_tagContext,0)
+
+
+        def getRuleIndex(self):
+            return searchParser.RULE_text
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterText" ):
+                listener.enterText(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitText" ):
+                listener.exitText(self)
+
+
+
+
+    def text(self):
+
+        localctx = searchParser.TextContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 22, self.RULE_text)
+        try:
+            self.state = 138
+            self._errHandler.sync(self)
+            token = self._input.LA(1)
+            if token in [25]:
+                self.enterOuterAlt(localctx, 1)
+                self.state = 127
+                self.match(searchParser.CHAR)
+                pass
+            elif token in [24]:
+                self.enterOuterAlt(localctx, 2)
+                self.state = 128
+                self.match(searchParser.DIGIT)
+                pass
+            elif token in [23]:
+                self.enterOuterAlt(localctx, 3)
+                self.state = 129
+                self.match(searchParser.T__22)
+                pass
+            elif token in [22]:
+                self.enterOuterAlt(localctx, 4)
+                self.state = 130
+                self.match(searchParser.T__21)
+                pass
+            elif token in [6]:
+                self.enterOuterAlt(localctx, 5)
+                self.state = 131
+                self.match(searchParser.T__5)
+                pass
+            elif token in [4]:
+                self.enterOuterAlt(localctx, 6)
+                self.state = 132
+                self.match(searchParser.T__3)
+                pass
+            elif token in [5]:
+                self.enterOuterAlt(localctx, 7)
+                self.state = 133
+                self.match(searchParser.T__4)
+                pass
+            elif token in [2]:
+                self.enterOuterAlt(localctx, 8)
+                self.state = 134
+                self.match(searchParser.T__1)
+                pass
+            elif token in [3]:
+                self.enterOuterAlt(localctx, 9)
+                self.state = 135
+                self.match(searchParser.T__2)
+                pass
+            elif token in [8, 9, 10, 11]:
+                self.enterOuterAlt(localctx, 10)
+                self.state = 136
+                self.tag()
+                pass
+            elif token in [12, 13, 14, 15, 16, 17, 18, 19, 20, 21]:
+                self.enterOuterAlt(localctx, 11)
+                self.state = 137
+                self.range_tag()
+                pass
+            else:
+                raise NoViableAltException(self)
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+
+
+
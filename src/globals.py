@@ -20,6 +20,23 @@ PREFIXES = [DEFAULT_PREFIX]
 DEFAULT_AUTODELETE_BEHAVIOR = True
 DEFAULT_NORMALIZE_BEHAVIOR = False
 
+# Show the density as a text sparkline in search results instead of uploading the density graph image. Useful for busy
+# servers or low-bandwidth deployments. The graph image is also skipped if it can't be found on disk.
+DENSITY_SPARKLINE = False
+
+# Number of renderer processes kept running to export density graphs for -parse and -dlpack. 0 renders in the bot
+# process instead.
+RENDER_WORKERS = 0
+
+# How the density graphs are saved, by both the bot and scan.py. GRAPH_FORMAT is either "png" (palette PNG) or "webp"
+# (lossless WebP). GRAPH_ENCODING is either "speed", to encode as fast as possible, or "size", to spend more time
+# compressing for smaller files. Graphs already saved keep their format, the path of each one is stored with its chart.
+GRAPH_FORMAT = "png"
+GRAPH_ENCODING = "speed"
+
+# Number of search results listed by -search. Discord allows at most 25 fields per embed.
+MAX_SEARCH_RESULTS = 25
+
 # File name and folder constants. Change these if you want to use a different name or folder.
 SERVER_SETTINGS = "server_settings.json"
 USER_SETTINGS = "user_settings.json"
@@ -44,7 +61,10 @@ Breakdown Buddy.
 
 If you want to search for a song stored use `-search` followed by the song name.
 Once the results appear, enter the number of the result that matches your desired
-search result.
+search result. Accents and case don't matter, and songs titled in another script
+can also be found by their romanized title.
+After picking a song, `-similar` lists the songs with the most similar breakdown
+and density.
 
 If you want me to parse a file, attach the .sm file to your message and
 type `-parse`. If I get stuck parsing a file, try `-fix` and I'll do my best to
@@ -60,12 +80,22 @@ To adjust your settings, type `-settings help`.
 
 I can also search by tags with `-[tag]:[value]`.
 Currently supported tags are:
-`title`, `subtitle`, `artist`, `stepartist`, `rating`, and `bpm.`
+`title`, `subtitle`, `artist`, `stepartist`, `rating`, `bpm`, `nps`,
+`totalstream`, `totalbreak`, `length` (in seconds), `candles`,
+`candledensity` (candles per measure of stream), `mono` (in percent) and `anchors`.
+Number tags also take ranges: `-rating:13+`, `-rating:13-` or `-rating:13-15`.
 
 Example: `-search -bpm:160`
 `-search sigatrev -rating:20`
+`-search -totalstream:200+ -rating:13-15`
 (Song title must come before tags)
 
+`-random` picks a random song, and takes the same title and tags as `-search`,
+e.g. `-random -rating:13 -totalstream:100+`.
+
+Tags can be combined with `OR`, `NOT` and parentheses:
+`-search -artist:sigatrev (-rating:12 OR -rating:13) NOT -bpm:200+`
+
 Admins can:
 Change the prefix using `-prefix` followed by the prefix they want to use
 e.g. `-prefix !`.
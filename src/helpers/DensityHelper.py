@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Contains helper methods used to store and retrieve the density series of a chart.
+
+The density of a chart is the notes per second of each measure. It's used to generate the density graph, and stored in
+the database in a compact form so graphs and NPS statistics can be regenerated without scanning the .sm file again. It
+can also be rendered as a text sparkline, which can be sent in place of the density graph image.
+
+The series is quantized to unsigned 16 bit integers (hundredths of a note per second), packed little endian and base64
+encoded. This gives a resolution of 0.01 NPS up to 655.35 NPS, at 2 bytes per measure before encoding.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from array import array
+from typing import List
+import base64
+import sys
+
+DENSITY_SCALE = 100  # Stored values are NPS * DENSITY_SCALE
+DENSITY_MAX = 65535  # Largest value an unsigned 16 bit integer can hold
+
+SPARKLINE_BLOCKS = "▁▂▃▄▅▆▇█"  # Block characters used in the sparkline, from lowest to highest density
+SPARKLINE_WIDTH = 50  # Number of characters in the sparkline, fits within an embed on mobile
+
+
+def pack_density(density: List[float]) -> str:
+    """ Packs a density series into a compact string.
+
+    @param density: An array containing the density (NPS) of each measure.
+    @return: The quantized series as a base64 string.
+    """
+    quantized = array("H", [
+        min(max(int(round(nps * DENSITY_SCALE)), 0), DENSITY_MAX)
+        for nps in density
+    ])
+    if sys.byteorder == "big":
+        quantized.byteswap()
+    return base64.b64encode(quantized.tobytes()).decode("ascii")
+
+
+def unpack_density(packed: str) -> List[float]:
+    """ Unpacks a density series created with pack_density.
+
+    @param packed: The base64 string stored in the database.
+    @return: An array containing the density (NPS) of each measure.
+    """
+    if not packed:
+        return []
+    quantized = array("H")
+    quantized.frombytes(base64.b64decode(packed))
+    if sys.byteorder == "big":
+        quantized.byteswap()
+    return [value / DENSITY_SCALE for value in quantized]
+
+
+def get_density(data: dict) -> List[float]:
+    """ Retrieves the density series from a database entry.
+
+    Entries created before the density series was stored won't have it, in which case an empty array is returned.
+
+    @param data: The chart entry from the database.
+    @return: An array containing the density (NPS) of each measure.
+    """
+    return unpack_density(data.get("density", ""))
+
+
+def get_sparkline(density: List[float], width: int = SPARKLINE_WIDTH) -> str:
+    """ Renders a density series as a line of Unicode block characters.
+
+    Measures are grouped into at most width buckets, and each bucket shows its peak so short bursts aren't averaged
+    away. Heights are relative to the peak NPS of the whole chart.
+
+    @param density: An array containing the density (NPS) of each measure.
+    @param width: The maximum number of characters to output.
+    @return: The sparkline, or an empty string if there is no density.
+    """
+    if not density:
+        return ""
+    buckets = min(width, len(density))
+    peaks = []
+    for i in range(buckets):
+        start = i * len(density) // buckets
+        end = (i + 1) * len(density) // buckets
+        peaks.append(max(density[start:end]))
+    peak = max(peaks)
+    if peak <= 0:
+        return SPARKLINE_BLOCKS[0] * buckets
+    top = len(SPARKLINE_BLOCKS) - 1
+    return "".join(SPARKLINE_BLOCKS[round(p / peak * top)] for p in peaks)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Contains helper methods used to fingerprint charts, so near-duplicate charts can be found.
+
+The MD5 of a chart (see GeneralHelper.generate_md5) only matches byte-identical charts. Edited re-releases or copies
+with a different offset are stored separately. To find those, each chart also gets a MinHash signature:
+
+- The chart is turned into a set of shingles. A shingle is SHINGLE_ROWS consecutive rows with a note, with the distance
+  in beats between them. Empty rows, the measure the notes are in and the offset don't matter, so shifted or requantized
+  copies have the same shingles.
+- For each of SIGNATURE_LENGTH hash functions, the signature keeps the smallest hash of any shingle. The share of
+  positions two signatures agree on estimates the Jaccard similarity of their shingle sets.
+
+Signatures are packed like the density series (see DensityHelper), as base64 of unsigned 32 bit integers. The LSH index
+that finds charts with similar signatures is db.DuplicateIndex.
+
+A mirrored or flipped copy of a chart has the same breakdown and patterns, with the arrows swapped. The canonical MD5
+identifies all of them: it is the MD5 of whichever of the chart, its left-right flip, its up-down flip and its mirror
+comes first alphabetically. Each of these is a transform, written as the arrows the columns L, D, U and R turn into,
+e.g. "RDUL" for the left-right flip. Every transform undoes itself, so the same transform turns the chart into its
+canonical form and back.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from array import array
+from typing import List, Mapping, Optional, Set, Tuple
+import base64
+import hashlib
+import random
+import sys
+
+from helpers.GeneralHelper import ChartHasher, generate_md5
+
+SHINGLE_ROWS = 4  # Number of consecutive rows with a note in each shingle
+BEAT_RESOLUTION = 48  # Distances between rows are rounded to 1/48 of a beat, the finest quantization in a .sm file
+SIGNATURE_LENGTH = 64  # Number of hash functions, and of values in a signature
+HASH_PRIME = (1 << 61) - 1
+# The hash functions, (a * x + b) mod HASH_PRIME. Seeded, so signatures are the same on every run.
+_random = random.Random(0)
+HASH_FUNCTIONS = [(_random.randrange(1, HASH_PRIME),
+                   _random.randrange(0, HASH_PRIME))
+                  for _ in range(SIGNATURE_LENGTH)]
+
+ARROWS = "LDUR"  # The identity transform
+# The transform, and the column of the original row each column of the transformed row is taken from
+MIRROR_TRANSFORMS = {
+    transform: tuple(ARROWS.index(arrow) for arrow in transform)
+    for transform in (ARROWS, "RDUL", "LUDR", "RUDL")
+}
+
+
+def get_shingles(measures: List[str]) -> Set[str]:
+    """ Returns the shingles of a chart, see the module description.
+
+    @param measures: The chart, each measure in an array.
+    @return: The shingles. Charts with fewer rows with a note than SHINGLE_ROWS have a single shingle.
+    """
+    rows = []
+    for i, measure in enumerate(measures):
+        lines = measure.split()
+        for j, line in enumerate(lines):
+            if line.strip("0"):
+                beat = round((i + j / len(lines)) * 4 * BEAT_RESOLUTION)
+                rows.append((line, beat))
+
+    shingles = set()
+    for start in range(max(1, len(rows) - SHINGLE_ROWS + 1)):
+        shingle = rows[start:start + SHINGLE_ROWS]
+        if not shingle:
+            break
+        parts = [shingle[0][0]]
+        for (_, previous), (line, beat) in zip(shingle, shingle[1:]):
+            parts.append(str(beat - previous) + ":" + line)
+        shingles.add(" ".join(parts))
+    return shingles
+
+
+def generate_minhash(measures: List[str]) -> List[int]:
+    """ Generates the MinHash signature of a chart.
+
+    @param measures: The chart, each measure in an array.
+    @return: SIGNATURE_LENGTH unsigned 32 bit integers, or an empty array if the chart has no notes.
+    """
+    signature = None
+    for shingle in get_shingles(measures):
+        value = int.from_bytes(
+            hashlib.blake2b(shingle.encode("UTF-8"), digest_size=8).digest(),
+            "little")
+        hashes = [(a * value + b) % HASH_PRIME for a, b in HASH_FUNCTIONS]
+        signature = hashes if signature is None else list(
+            map(min, signature, hashes))
+    if signature is None:
+        return []
+    return [value & 0xFFFFFFFF for value in signature]
+
+
+def pack_minhash(signature: List[int]) -> str:
+    """ Packs a MinHash signature into a compact string, see pack_density. """
+    values = array("I", signature)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def unpack_minhash(packed: str) -> List[int]:
+    """ Unpacks a MinHash signature created with pack_minhash. """
+    if not packed:
+        return []
+    values = array("I")
+    values.frombytes(base64.b64decode(packed))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return list(values)
+
+
+def get_minhash(data: Mapping) -> Optional[List[int]]:
+    """ Retrieves the MinHash signature of a database entry.
+
+    @param data: The chart entry from the database.
+    @return: The signature, or None for entries scanned before signatures were stored.
+    """
+    return unpack_minhash(data.get("minhash", "")) or None
+
+
+def estimate_similarity(first: List[int], second: List[int]) -> float:
+    """ Estimates the Jaccard similarity of the shingles of two charts from their signatures, between 0 and 1. """
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_LENGTH
+
+
+def transform_row(row: str, transform: str) -> str:
+    """ Swaps the columns of a row of the chart, e.g. "1000" becomes "0001" with the "RDUL" transform. Rows that aren't
+    4 columns wide are left as they are.
+    """
+    if len(row) != len(ARROWS):
+        return row
+    return "".join(row[column] for column in MIRROR_TRANSFORMS[transform])
+
+
+def transform_measure(measure: str, transform: str) -> str:
+    """ Applies a transform to every row of a measure. """
+    return "\n".join(transform_row(row, transform) for row in measure.split())
+
+
+def get_canonical_transform(measures: List[str]) -> str:
+    """ Finds the transform that turns the chart into its canonical form, the alphabetically first of its variants.
+
+    Rows are compared one at a time, and only for the transforms still tied, so most charts are settled within their
+    first few rows and never transformed as a whole. Symmetric charts, tied until the end, keep the identity.
+
+    @param measures: The chart, each measure in an array.
+    @return: One of MIRROR_TRANSFORMS.
+    """
+    candidates = list(MIRROR_TRANSFORMS)
+    for measure in measures:
+        for row in measure.split():
+            if len(candidates) == 1:
+                return candidates[0]
+            rows = [transform_row(row, transform) for transform in candidates]
+            first = min(rows)
+            candidates = [
+                transform for transform, transformed in zip(candidates, rows)
+                if transformed == first
+            ]
+    return candidates[0]
+
+
+def generate_canonical_md5(bpms: List[List[str]],
+                           measures: List[str]) -> Tuple[str, str]:
+    """ Generates the canonical MD5 fingerprint for the chart, the same for the chart and its mirrored/flipped copies.
+
+    @param bpms: The bpms array.
+    @param measures: The chart, each measure in an array.
+    @return: The canonical MD5, and the transform between the chart and its canonical form.
+    """
+    transform = get_canonical_transform(measures)
+    if transform == ARROWS:
+        return generate_md5(bpms, measures), transform
+    # Each measure is transformed and hashed in turn, without a transformed copy of the whole chart
+    hasher = ChartHasher(bpms)
+    for measure in measures:
+        hasher.update(transform_measure(measure, transform))
+    return hasher.hexdigest(), transform
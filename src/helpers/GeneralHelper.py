@@ -50,6 +50,50 @@ def remove_comments(chart: str) -> str:
     return re.sub("//(.*)", "", chart)
 
 
+class ChartHasher(object):
+    """ Computes the MD5 fingerprint of a chart one measure at a time, e.g. while the chart is being parsed, so the
+    whole chart doesn't have to be held in memory. The fingerprint is the same as generate_md5's.
+
+    Like generate_md5, spaces and line breaks are removed, and other whitespace is only removed at the start and end of
+    the chart. Since more notes may follow, whitespace at the end of what was fed so far is held back until they do.
+    """
+
+    def __init__(self, bpms: List[List[str]]):
+        """
+        @param bpms: The bpms array, hashed after the measures.
+        """
+        self.md5 = hashlib.md5()
+        self.bpm_string = ""
+        for bpm in bpms:
+            # Parsed to int, as we want to match 215.0000 with 215.0; we only need a rough estimate for matching.
+            self.bpm_string += str(int(float(bpm[0]))) + str(int(float(bpm[1])))
+        self.started = False  # Whether anything but whitespace was fed yet
+        self.pending = ""  # Whitespace at the end of what was fed so far
+
+    def update(self, measure: str):
+        """ Feeds the next measure of the chart. """
+        measure = measure.replace(" ", "").replace("\n", "").replace("\r", "")
+        if not self.started:
+            measure = measure.lstrip()
+            if not measure:
+                return
+            self.started = True
+        data = measure.rstrip()
+        if data:
+            self.md5.update((self.pending + data).encode("UTF-8"))
+            self.pending = measure[len(data):]
+        else:
+            self.pending += measure
+
+    def hexdigest(self) -> str:
+        """ Returns the fingerprint of the measures fed so far. More measures can still be fed afterwards. """
+        md5 = self.md5.copy()
+        if self.bpm_string:
+            # The whitespace held back isn't at the end of the chart after all
+            md5.update((self.pending + self.bpm_string).encode("UTF-8"))
+        return md5.hexdigest()
+
+
 def generate_md5(bpms: List[List[str]], measures: List[str]) -> str:
     """ Generates an md5 fingerprint for the chart, using the measures and BPMs as input. Since the MD5 is used in cache
     generation to identify identical charts, the BPMs array needs to be part of the MD5 to differentiate between for
@@ -59,10 +103,7 @@ def generate_md5(bpms: List[List[str]], measures: List[str]) -> str:
     @param measures: The chart, each measure in an array.
     @return: The generated MD5 fingerprint.
     """
-    bpm_string = ""
-    for bpm in bpms:
-        # Parsed to int, as we want to match 215.0000 with 215.0; we only need a rough estimate for matching.
-        bpm_string += str(int(float(bpm[0]))) + str(int(float(bpm[1])))
-    data = "".join(measures) + bpm_string
-    return hashlib.md5("".join(data).strip().replace(" ", "").replace(
-        "\n", "").replace("\r", "").encode("UTF-8")).hexdigest()
+    hasher = ChartHasher(bpms)
+    for measure in measures:
+        hasher.update(measure)
+    return hasher.hexdigest()
@@ -12,9 +12,12 @@ LICENSE file or visit <https://unlicense.org>.
 Created with love by Artimst, this version is maintained/updated by JWong.
 """
 
+from concurrent.futures import Future, ProcessPoolExecutor
+from globals import GRAPH_ENCODING, GRAPH_FORMAT
 from helpers import BreakdownHelper as bh
 from PIL import Image, ImageDraw, ImageFont, UnidentifiedImageError
-from typing import List
+from typing import List, Tuple
+import io
 import logging
 import math
 import plotly.graph_objects as go
@@ -22,6 +25,20 @@ import plotly.graph_objects as go
 IMAGE_WIDTH = 1000  # Width of the density graph and breakdown image in pixels
 GRAPH_HEIGHT = 400  # Height of the density graph in pixels
 
+# The density graph is a two color fill on a flat background, so it's reduced to a small palette before saving, then
+# encoded as set by GRAPH_FORMAT and GRAPH_ENCODING in globals.py.
+GRAPH_COLORS = 16  # Number of colors kept in the palette, enough for the anti-aliased edges of the fill
+GRAPH_SAVE_OPTIONS = {
+    "png": {
+        "speed": {"compress_level": 1},
+        "size": {"compress_level": 9, "optimize": True},
+    },
+    "webp": {
+        "speed": {"lossless": True, "quality": 0, "method": 0},
+        "size": {"lossless": True, "quality": 100, "method": 6},
+    },
+}
+
 FONT_SIZE = 32
 FONT = ImageFont.truetype("assets/font/DejaVuSansMono.ttf", FONT_SIZE)
 FONT_BOLD = ImageFont.truetype("assets/font/DejaVuSansMono-Bold.ttf",
@@ -46,18 +63,23 @@ YELLOW = (255, 255, 0)  # 32nd notes
 BG = (52, 54, 61)  # The dark gray background of Discord
 BG_RGB = "rgb(52,54,61)"  # String representation of the above
 
+# Pool of renderer processes used to export density graphs in the background. See start_render_pool.
+_render_pool: ProcessPoolExecutor = None
+_pending_renders: List[Future] = []
+
 
-def save_image(image: Image, path: str) -> bool:
+def save_image(image: Image, path: str, **options) -> bool:
     """ Save an image
 
     Saves an image to the specified path.
 
     @param image: The image to save.
     @param path: The path to save the image to.
+    @param options: Extra options passed to the image writer, e.g. the compression level.
     @return: True for successful saves.
     """
     try:
-        image.save(path)
+        image.save(path, **options)
         return True
     except AttributeError as e:
         logging.error(
@@ -97,7 +119,8 @@ def create_and_save_density_graph(x: List[int], y: List[float],
                                   path: str) -> bool:
     """ Creates and saves the density graph image.
 
-    Creates the density graph using plotly, then saves it to the path specified.
+    Creates the density graph using plotly, reduces it to a palette image, then saves it to the path specified using
+    GRAPH_FORMAT and GRAPH_ENCODING.
 
     @param x: An array containing the measure numbers.
     @param y: An array containing the density of each measure.
@@ -126,10 +149,103 @@ def create_and_save_density_graph(x: List[int], y: List[float],
     # noinspection PyBroadException
     # Plotly doesn't document possible exceptions, so we capture with a generic one.
     try:
-        fig.write_image(path)
-        return True
+        image = Image.open(io.BytesIO(fig.to_image(format="png")))
     except Exception as e:
         logging.error(
             "The density graph could not be saved at '{}'.".format(path),
             exc_info=True)
         return False
+
+    image = image.convert("RGB").quantize(colors=GRAPH_COLORS)
+    return save_image(image, path,
+                      format=GRAPH_FORMAT,
+                      **GRAPH_SAVE_OPTIONS[GRAPH_FORMAT][GRAPH_ENCODING])
+
+
+def _warm_renderer():
+    """ Starts the graph renderer in a worker process.
+
+    Used as the initializer of the render pool. Rendering a throwaway figure loads plotly's image export and starts
+    kaleido, so we pay the start up cost once per worker here instead of on the first chart it receives.
+    """
+    # noinspection PyBroadException
+    try:
+        go.Figure().to_image(format="png", width=10, height=10)
+    except Exception as e:
+        logging.warning("Unable to warm up the density graph renderer.",
+                        exc_info=True)
+
+
+def start_render_pool(workers: int) -> bool:
+    """ Starts a pool of long-lived renderer processes.
+
+    Once started, queue_density_graph hands graphs to the pool instead of rendering them immediately, so graph export
+    runs in parallel with chart analysis. The pool should be started once per scan or bot process.
+
+    @param workers: The number of renderer processes.
+    @return: True if the pool is running.
+    """
+    global _render_pool
+    if _render_pool is None and workers > 0:
+        _render_pool = ProcessPoolExecutor(max_workers=workers,
+                                           initializer=_warm_renderer)
+        logging.info(
+            "Started density graph render pool with {} worker(s).".format(
+                workers))
+    return _render_pool is not None
+
+
+def queue_density_graph(x: List[int], y: List[float], path: str):
+    """ Creates and saves the density graph image, using the render pool if it was started.
+
+    @param x: An array containing the measure numbers.
+    @param y: An array containing the density of each measure.
+    @param path: The path to save the graph image to.
+    """
+    if _render_pool is None:
+        create_and_save_density_graph(x, y, path)
+    else:
+        _pending_renders.append(
+            _render_pool.submit(create_and_save_density_graph, x, y, path))
+
+
+def render_density_graphs(jobs: List[Tuple[List[int], List[float], str]]):
+    """ Queues a batch of density graphs.
+
+    @param jobs: An array of (x, y, path) tuples, see queue_density_graph.
+    """
+    for x, y, path in jobs:
+        queue_density_graph(x, y, path)
+
+
+def wait_for_density_graphs() -> int:
+    """ Waits until every queued density graph has been saved.
+
+    @return: The number of graphs that could not be saved.
+    """
+    global _pending_renders
+    pending, _pending_renders = _pending_renders, []
+    failed = 0
+    for future in pending:
+        # noinspection PyBroadException
+        try:
+            if not future.result():
+                failed += 1
+        except Exception as e:
+            logging.error("A render worker failed to save a density graph.",
+                          exc_info=True)
+            failed += 1
+    return failed
+
+
+def stop_render_pool() -> int:
+    """ Waits for queued density graphs, then shuts down the render pool.
+
+    @return: The number of graphs that could not be saved.
+    """
+    global _render_pool
+    failed = wait_for_density_graphs()
+    if _render_pool is not None:
+        _render_pool.shutdown()
+        _render_pool = None
+    return failed
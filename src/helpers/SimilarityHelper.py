@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Contains helper methods used to describe a chart as a fixed length feature vector, to find charts like it.
+
+The vector is made of four parts, each scaled so it weighs about as much as the others:
+
+- Stream length histogram: the share of the stream measures in runs of 1-4, 5-8, 9-16, 17-32, 33-64 and 65+ measures,
+  read from the detailed breakdown.
+- Density classes: the share of all measures that are break, 16th, 20th, 24th and 32nd stream.
+- NPS curve: the density series resampled to CURVE_POINTS points, relative to the peak NPS.
+- Peak NPS, divided by PEAK_NPS_SCALE.
+
+Charts with a similar vector (by Euclidean distance) have runs of about the same length, at the same speeds, laid out
+in the same way across the song, see db.VectorIndex.
+
+The vector is computed by the scanner and stored with the chart. Charts scanned before it was stored have it computed
+from their breakdown and density series instead.
+
+This is free and unencumbered software released into the public domain. For more information, please refer to the
+LICENSE file or visit <https://unlicense.org>.
+
+Created with love by Artimst, this version is maintained/updated by JWong.
+"""
+
+from bisect import bisect_left
+from typing import List, Mapping, Optional
+import math
+import re
+
+from helpers.DensityHelper import get_density
+
+STREAM_LENGTH_BINS = (4, 8, 16, 32, 64)  # Longest run in each bin of the histogram, longer runs go in a last bin
+CURVE_POINTS = 16  # Number of points the NPS curve is resampled to
+PEAK_NPS_SCALE = 30.0
+# A run in the detailed breakdown: =32nds=, \24ths\, ~20ths~, (break) or 16ths. The group matched gives its class.
+BREAKDOWN_RUN = re.compile(r"=(\d+)=|\\(\d+)\\|~(\d+)~|\((\d+)\)|(\d+)")
+# Index in the density classes of each group of BREAKDOWN_RUN, break is 0
+RUN_CLASSES = (4, 3, 2, 0, 1)
+
+FEATURE_VECTOR_LENGTH = len(STREAM_LENGTH_BINS) + 1 + 5 + CURVE_POINTS + 1
+
+
+def resample(series: List[float], points: int) -> List[float]:
+    """ Returns the average of the series over each of points equal parts of it. Short series repeat values. """
+    n = len(series)
+    result = []
+    for i in range(points):
+        start = i * n // points
+        end = max(start + 1, (i + 1) * n // points)
+        result.append(sum(series[start:end]) / (end - start))
+    return result
+
+
+def get_feature_vector(breakdown: str, total_break: int,
+                       density: List[float]) -> Optional[List[float]]:
+    """ Describes a chart as a vector of FEATURE_VECTOR_LENGTH numbers.
+
+    @param breakdown: The detailed breakdown of the chart.
+    @param total_break: The number of measures of break.
+    @param density: An array containing the density (NPS) of each measure.
+    @return: The feature vector, or None if there is no density series.
+    """
+    if not density:
+        return None
+
+    histogram = [0] * (len(STREAM_LENGTH_BINS) + 1)
+    classes = [total_break or 0, 0, 0, 0, 0]
+    for run in BREAKDOWN_RUN.finditer(breakdown or ""):
+        group = next(i for i, value in enumerate(run.groups()) if value)
+        run_class = RUN_CLASSES[group]
+        if run_class == 0:
+            # Already counted in total_break, which also has the single measures of break left out of the breakdown
+            continue
+        length = int(run.group(group + 1))
+        classes[run_class] += length
+        histogram[bisect_left(STREAM_LENGTH_BINS, length)] += length
+
+    stream = sum(classes[1:])
+    measures = stream + classes[0]
+    peak = max(density)
+    curve = resample(density, CURVE_POINTS)
+    vector = [count / stream if stream else 0.0 for count in histogram]
+    vector += [count / measures if measures else 0.0 for count in classes]
+    # Every point is at most 1, so the whole curve weighs at most as much as the proportions above
+    vector += [
+        nps / peak / math.sqrt(CURVE_POINTS) if peak else 0.0 for nps in curve
+    ]
+    vector.append(peak / PEAK_NPS_SCALE)
+    return [round(value, 4) for value in vector]
+
+
+def get_chart_vector(chart: Mapping) -> Optional[List[float]]:
+    """ Retrieves the feature vector of a database entry, computing it for entries scanned before it was stored.
+
+    @param chart: The chart entry from the database.
+    @return: The feature vector, or None if the entry has no density series.
+    """
+    vector = chart.get("feature_vector")
+    if vector is None:
+        vector = get_feature_vector(chart.get("breakdown"),
+                                    chart.get("total_break"),
+                                    get_density(chart))
+    return vector
@@ -1,7 +1,20 @@
 from enums.RunDensity import RunDensity
 from db import DBManager as dbm
+from db.SongStorage import open_song_storage
+from db.parser.generateQueryObject import generateQueryObject
+from helpers import GeneralHelper as gh
 from helpers import Normalize as normalizer
+from helpers.FingerprintHelper import MIRROR_TRANSFORMS, transform_measure
+from objects import ChartInfo as ci, FileInfo as fi
+from scan.regexfinds import findall_with_regex, findall_with_regex_dotall, find_with_regex_dotall
+import glob
+import hashlib
+import os
+import random
+import string
 import sys
+import tempfile
+import time
 
 DATABASE_FILE = "./tests/db.json"
 
@@ -30,6 +43,258 @@ def fail(desc):
     print(output)
 
 
+# The pattern analysis saved to the database for each chart
+PATTERN_FIELDS = [
+    "left_foot_candles", "right_foot_candles", "total_candles", "mono_percent",
+    "anchor_left", "anchor_down", "anchor_up", "anchor_right",
+    "double_stairs_count", "double_stairs_array", "doublesteps_count",
+    "doublesteps_array", "jumps_count", "jumps_array", "mono_count",
+    "mono_array", "box_count", "box_array"
+]
+
+# A 16th run with a jump, analyzed differently once the left and right arrows are swapped
+MIRRORED_RUN = [
+    "0010", "0010", "0100", "0010", "0100", "0110", "0001", "0100", "0001",
+    "1000", "0010", "0100", "0100", "1000", "0001", "1000"
+]
+
+SM_TEMPLATE = """#TITLE:{};
+#ARTIST:Test;
+#BPMS:0.000=180.000;
+#NOTES:
+     dance-single:
+     Test:
+     Challenge:
+     12:
+     0.000,0.000,0.000,0.000,0.000:
+{}
+;
+"""
+
+# Search -> query object built by the parser, or None for a syntax error. Checked against the ANTLR parser with
+# db.parser.compareParsers, so they keep being tested without the ANTLR runtime.
+PARSE_CASES = [
+    ("sigatrev", {"tag": "title", "value": "sigatrev"}),
+    ("sigatrev -rating:20", {"and": [{"tag": "title", "value": "sigatrev"},
+                                     {"tag": "rating", "value": (20.0, 20.0)}]}),
+    ("-rating:13+", {"tag": "rating", "value": (13.0, None)}),
+    ("-rating:13-", {"tag": "rating", "value": (None, 13.0)}),
+    ("-rating:13-15", {"tag": "rating", "value": (13.0, 15.0)}),
+    ("-rating:15-13", {"tag": "rating", "value": (13.0, 15.0)}),
+    ("-nps:7.5", {"tag": "nps", "value": (7.5, 7.5)}),
+    ("-artist:foo -rating:12 OR -rating:13", {"or": [{"and": [{"tag": "artist", "value": "foo"},
+                                                              {"tag": "rating", "value": (12.0, 12.0)}]},
+                                                     {"tag": "rating", "value": (13.0, 13.0)}]}),
+    ("-artist:foo (-rating:12 OR -rating:13)", {"and": [{"tag": "artist", "value": "foo"},
+                                                        {"or": [{"tag": "rating", "value": (12.0, 12.0)},
+                                                                {"tag": "rating", "value": (13.0, 13.0)}]}]}),
+    ("NOT -artist:foo", {"not": {"tag": "artist", "value": "foo"}}),
+    ("NOT NOT -artist:foo", {"not": {"not": {"tag": "artist", "value": "foo"}}}),
+    ("song NOT -rating:20 OR (-bpm:150 -nps:8+)", {"and": [{"tag": "title", "value": "song"},
+                                                           {"or": [{"not": {"tag": "rating", "value": (20.0, 20.0)}},
+                                                                   {"and": [{"tag": "bpm", "value": (150.0, 150.0)},
+                                                                            {"tag": "nps", "value": (8.0, None)}]}]}]}),
+    ("-title:sig.*rev", {"tag": "title", "value": "sig.*rev"}),
+    ("Love OR Hate", {"tag": "title", "value": "Love OR Hate"}),
+    ("-title:length 2 -nps:7.5", {"and": [{"tag": "title", "value": "length 2"},
+                                          {"tag": "nps", "value": (7.5, 7.5)}]}),
+    ("-rating:abc", None),
+    ("(-rating:1", None),
+    ("-rating:1 OR", None),
+    # Many ways for the values to end, all of them tried before the syntax error is found
+    ("-title:a " + " ".join(["(-title:a OR -title:b) -title:c (d)"] * 14) + " -rating:abc", None),
+    # Parentheses nested too deep to parse
+    ("(" * 150 + "-title:a" + ")" * 150, None),
+]
+
+# Most seconds a search may take to parse, the bot parses searches in its event loop
+PARSE_TIME_LIMIT = 1
+
+# (title, artist, rating, BPM) of the charts searched by SEARCH_CASES
+SEARCH_CHARTS = [
+    ("Sigatrev", "foo", "12", 180),
+    ("Love Song", "bar", "13", 150),
+    ("Hate Song (Remix)", "foo", "20", 200),
+    ("Re-Volt", "baz", "15", 175),
+    ("Pokémon", "bar", "14", 160),
+]
+
+# Search -> titles of the charts found, 0 if none are, -1 if the search isn't valid
+SEARCH_CASES = [
+    ("sigatrev", ["Sigatrev"]),
+    ("pokemon", ["Pokémon"]),
+    ("-title:sig.*rev", ["Sigatrev"]),
+    ("-title:^re", ["Re-Volt"]),
+    ("-title:song \\(remix\\)", ["Hate Song (Remix)"]),
+    ("-title:(", -1),
+    ("Love OR Hate", 0),
+    ("-artist:foo -rating:12 OR -rating:13", ["Love Song", "Sigatrev"]),
+    ("-artist:foo (-rating:12 OR -rating:13)", ["Sigatrev"]),
+    ("NOT -artist:foo", ["Love Song", "Pokémon", "Re-Volt"]),
+    ("-rating:13-15", ["Love Song", "Pokémon", "Re-Volt"]),
+    ("-rating:15+", ["Hate Song (Remix)", "Re-Volt"]),
+    ("-bpm:175-", ["Love Song", "Pokémon", "Re-Volt"]),
+]
+
+# (BPMs, measures) of charts whose whitespace is hashed differently by a careless implementation
+MD5_CHARTS = [
+    ([["0.000", "180.000"]], ["1000\n0100\n0010\n0001\n", "\n0000\n0000\n1000\n0000\n"]),
+    ([["0.000", "180.000"], ["64.000", "90.500"]], ["\t1000\r\n0100 \n", "0010\n\t\n", "\t\n", "0001\n\t"]),
+    ([], ["  1000\n0100\t\n", "\t", "0010\n\t\n"]),
+    ([["0", "215.0000"]], ["\n\t\n", "\t1000\t", "\t\n"]),
+    ([["0", "200"]], []),
+]
+
+
+def legacy_md5(bpms, measures):
+    # generate_md5 before charts were hashed one measure at a time
+    bpm_string = ""
+    for bpm in bpms:
+        bpm_string += str(int(float(bpm[0]))) + str(int(float(bpm[1])))
+    data = "".join(measures) + bpm_string
+    return hashlib.md5("".join(data).strip().replace(" ", "").replace("\n", "").replace("\r", "").encode(
+        "UTF-8")).hexdigest()
+
+
+def get_test_charts():
+    # (BPMs, measures) of every chart in the test songs, read like scan.py does
+    charts = []
+    for filename in glob.glob("tests/songs/**/*.sm", recursive=True):
+        with open(filename, "r", errors="ignore") as file:
+            data = file.read()
+        bpms = find_with_regex_dotall(data, r"#BPMS:(.*?)[;]+?")
+        notes = findall_with_regex_dotall(data, r"#NOTES:(.*?);")
+        if bpms == -1 or notes == -1:
+            continue
+        bpms = [
+            "".join(c for c in bpm.split("#", 1)[0] if c in string.printable).strip().split("=")
+            for bpm in bpms.split(",")
+        ]
+        for chart in notes:
+            metadata = (chart + ";").split(":")
+            if len(metadata) < 6:
+                continue
+            measures = findall_with_regex(gh.remove_comments(metadata[5]), r"[01234MF\s]+(?=[,|;])")
+            if measures != -1:
+                charts.append((bpms, measures))
+    return charts
+
+
+def count_md5_mismatches(charts):
+    # Returns the number of charts whose MD5 isn't the one generate_md5 used to generate
+    mismatches = 0
+    for bpms, measures in charts:
+        try:
+            correct_md5 = legacy_md5(bpms, measures)
+        except (IndexError, ValueError):
+            continue  # scan.py can't read these BPMs either
+        hasher = gh.ChartHasher(bpms)
+        for measure in measures:
+            hasher.update(measure)
+        if gh.generate_md5(bpms, measures) != correct_md5 or hasher.hexdigest() != correct_md5:
+            mismatches += 1
+    return mismatches
+
+
+def parse_search(search):
+    # The query object of a search, or None for a syntax error
+    result = generateQueryObject(search)
+    return None if result["error"] else result["queryObject"]
+
+
+def run_searches(extension):
+    # Adds SEARCH_CHARTS to a new database, then returns the result of each search in SEARCH_CASES, in the same form
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        db = open_song_storage(os.path.join(folder, "db" + extension))
+        for title, artist, rating, bpm in SEARCH_CHARTS:
+            db.insert({
+                "md5": title,
+                "title": title,
+                "subtitle": "",
+                "artist": artist,
+                "stepartist": "Test",
+                "rating": rating,
+                "min_bpm": bpm,
+                "max_bpm": bpm
+            })
+        for search, _ in SEARCH_CASES:
+            found = dbm.search(search, db)
+            results.append(found if isinstance(found, int) else sorted(
+                chart["title"] for chart in found))
+        db.close()
+    return results
+
+
+def analyze_pattern(measures, keep_cache):
+    # Imported here, scan imports this file
+    from scan import scan
+
+    if not keep_cache:
+        scan.pattern_cache.clear()
+    bpms = [["0.000", "180.000"]]
+    fileinfo = fi.FileInfo("Test", "", "Test", "Test", bpms, "", "")
+    chartinfo = ci.ChartInfo(fileinfo, "Test", "Challenge", "12", measures)
+    return vars(
+        scan.get_density_and_breakdown(chartinfo, measures,
+                                       bpms)[2].patterninfo)
+
+
+def count_mirrored_mismatches(seed, charts):
+    # Analyzes random charts, then each of their mirrored/flipped copies, both reusing the analysis of the chart and
+    # from scratch. Returns the number of copies where the two analyses differ.
+    rng = random.Random(seed)
+    rows = ["1000", "0100", "0010", "0001", "1001", "0110", "1010", "0101"]
+    weights = [10, 10, 10, 10, 1, 1, 1, 1]
+    mismatches = 0
+    for _ in range(charts):
+        measures = [
+            "\n".join(rng.choices(rows, weights, k=16)) + "\n"
+            for _ in range(rng.randint(1, 8))
+        ]
+        for transform in MIRROR_TRANSFORMS:
+            copy = [
+                transform_measure(measure, transform) + "\n"
+                for measure in measures
+            ]
+            analyze_pattern(measures, False)
+            reused = analyze_pattern(copy, True)
+            if reused != analyze_pattern(copy, False):
+                mismatches += 1
+    return mismatches
+
+
+def scan_mirrored_copy():
+    # Scans a chart and its mirrored copy, so the pattern analysis of the chart may be reused for the copy, then scans
+    # the copy on its own. Returns the database entries of the chart, and of the copy from both scans.
+    from scan import scan
+
+    mirrored_run = [
+        transform_measure(row, "RDUL") for row in MIRRORED_RUN
+    ]
+    entries = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for name, rows in (("original", MIRRORED_RUN), ("mirrored",
+                                                        mirrored_run)):
+            os.mkdir(os.path.join(folder, name))
+            with open(os.path.join(folder, name, name + ".sm"), "w") as file:
+                file.write(SM_TEMPLATE.format(name, "\n".join(rows)))
+
+        scan.pattern_cache.clear()
+        for names in (("original", "mirrored"), ("mirrored", )):
+            db = open_song_storage(
+                os.path.join(folder, "-".join(names) + ".json"))
+            for name in names:
+                song_folder = os.path.join(folder, name) + os.sep
+                scan.parse_file(db, song_folder + name + ".sm", song_folder,
+                                "Test", False)
+            for entry in db.all():
+                entries.setdefault(entry["title"], []).append(entry)
+            db.close()
+            scan.pattern_cache.clear()
+    return entries["original"][0], entries["mirrored"][0], entries["mirrored"][1]
+
+
 def run_tests():
 
     passed = 0
@@ -449,6 +714,69 @@ def run_tests():
                  result["total_candles"])
         failed += 1
 
+    # Charts are hashed one measure at a time, which should give the same MD5 as hashing the whole chart did
+
+    result = count_md5_mismatches(MD5_CHARTS + get_test_charts())
+
+    if result == 0:
+        good("Charts have the same MD5 as before they were hashed one measure at a time.")
+        passed += 1
+    else:
+        fail_val("Charts don't have the same MD5 as before they were hashed one measure at a time.", 0, result)
+        failed += 1
+
+    # Searches are parsed by a hand-written parser, and must build the same query objects as the ANTLR one did
+
+    for search, correct_query in PARSE_CASES:
+        start = time.perf_counter()
+        result = parse_search(search)
+        seconds = time.perf_counter() - start
+        desc = "\"" + (search if len(search) <= 60 else search[:60] + "...") + "\""
+        if result != correct_query:
+            fail_val(desc + " is parsed incorrectly.", correct_query, result)
+            failed += 1
+        elif seconds > PARSE_TIME_LIMIT:
+            fail_val(desc + " is parsed too slowly.", PARSE_TIME_LIMIT, seconds)
+            failed += 1
+        else:
+            good(desc + " is parsed correctly.")
+            passed += 1
+
+    for extension in (".json", ".sqlite"):
+        results = run_searches(extension)
+        for (search, correct_titles), result in zip(SEARCH_CASES, results):
+            if result == correct_titles:
+                good("\"" + search + "\" finds the right charts in the " + extension + " database.")
+                passed += 1
+            else:
+                fail_val("\"" + search + "\" finds the wrong charts in the " + extension + " database.",
+                         correct_titles, result)
+                failed += 1
+
+    # Mirrored and flipped copies of a chart reuse its pattern analysis, which should be the same as analyzing them
+
+    result = count_mirrored_mismatches(1, 250)
+
+    if result == 0:
+        good("Mirrored and flipped copies of random charts reuse the right pattern analysis.")
+        passed += 1
+    else:
+        fail_val("Mirrored and flipped copies of random charts reused the wrong pattern analysis.", 0, result)
+        failed += 1
+
+    original, reused, analyzed = scan_mirrored_copy()
+
+    if original["canonical_md5"] == reused["canonical_md5"] and all(
+            reused[field] == analyzed[field] for field in PATTERN_FIELDS):
+        good("The mirrored copy of a chart with a jump is saved with the right pattern analysis.")
+        passed += 1
+    else:
+        fail_val(
+            "The mirrored copy of a chart with a jump is saved with the wrong pattern analysis.",
+            [analyzed[field] for field in PATTERN_FIELDS],
+            [reused[field] for field in PATTERN_FIELDS])
+        failed += 1
+
     if failed > 0:
         sys.exit("Unit tests did not pass.")
     else:
@@ -1,5 +1,8 @@
 import discord
-from globals import STR_TO_EMOJI, MAX_DISCORD_FIELD_CHARS, VALID_PARAMS
+import os
+from globals import STR_TO_EMOJI, MAX_DISCORD_FIELD_CHARS, VALID_PARAMS, DENSITY_SPARKLINE
+from helpers.DensityHelper import get_density, get_sparkline
+from db.SongStorage import get_candle_density, get_packs, get_total_anchors
 
 
 def get_mono_desc(mono):
@@ -147,7 +150,7 @@ def create_embed(data, ctx, params=None):
             song_details += f'*{data["subtitle"]}* '
         song_details += f'by **{data["artist"]}** \n'
 
-    song_details += f'From pack(s): {data["pack"]}\n'
+    song_details += f'From pack(s): {", ".join(get_packs(data))}\n'
     try:
         song_details += f'{get_footer_image(int(data["rating"]))} '
     except ValueError:
@@ -194,8 +197,7 @@ def create_embed(data, ctx, params=None):
     pattern_analysis += (f'__Candles__: **{data["total_candles"]}** '
                          f'({data["left_foot_candles"]} left, '
                          f'{data["right_foot_candles"]} right)\n')
-    candle_density = data["total_candles"] / data["total_stream"] if data[
-        "total_stream"] else 0
+    candle_density = get_candle_density(data)
     pattern_analysis += f'__Candle density__: {normalize_float(candle_density)} candles/measure\n'
 
     # Mono
@@ -203,10 +205,7 @@ def create_embed(data, ctx, params=None):
                          f'({get_mono_desc(data["mono_percent"])})\n')
 
     # Anchors
-    total_anchors = sum([
-        data[key]
-        for key in ["anchor_left", "anchor_down", "anchor_up", "anchor_right"]
-    ])
+    total_anchors = get_total_anchors(data)
     pattern_analysis += (f'__Anchors__: **{total_anchors}** '
                          f'({data["anchor_left"]} left, '
                          f'{data["anchor_down"]} down, '
@@ -251,8 +250,19 @@ def create_embed(data, ctx, params=None):
                              text + data["normalized_breakdown"])
 
     # - - - FOOTER - - -
-    file = discord.File(data["graph_location"], filename="density.png")
-
-    embed.set_image(url="attachment://density.png")
+    file = None
+    sparkline = get_sparkline(get_density(data))
+    if sparkline and (DENSITY_SPARKLINE
+                      or not os.path.exists(data["graph_location"])):
+        # Zero-image fast path, the density is embedded as text so nothing needs to be uploaded
+        embed.add_field(name="__Density__",
+                        value=f'`{sparkline}`\n'
+                        f'*Peak {normalize_float(data["max_nps"])} notes/s.*',
+                        inline=False)
+    else:
+        # Keep the extension of the saved graph, it may be a .png or .webp
+        filename = "density" + os.path.splitext(data["graph_location"])[1]
+        file = discord.File(data["graph_location"], filename=filename)
+        embed.set_image(url="attachment://" + filename)
 
     return embed, pattern_embed, file
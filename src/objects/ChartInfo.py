@@ -9,6 +9,8 @@ LICENSE file or visit <https://unlicense.org>.
 Created with love by Artimst, this version is maintained/updated by JWong.
 """
 
+from globals import GRAPH_FORMAT
+from helpers.FingerprintHelper import generate_canonical_md5
 from helpers.GeneralHelper import generate_md5
 from objects import NotesInfo, PatternInfo
 from typing import List
@@ -22,12 +24,15 @@ class ChartInfo(object):
     measures: List[str] = []
 
     md5: str = ""
+    canonical_md5: str = ""  # Same for mirrored/flipped copies of the chart
+    transform: str = ""  # Turns the chart into its canonical form and back, see FingerprintHelper
     path_prefix: str = ""  # Used when saving images like the density graph
     graph_location: str = ""
 
     length: str = ""
     max_nps: float = 0.0
     median_nps: float = 0.0
+    density: List[float] = []  # Notes per second of each measure
     total_stream: int = 0
     total_break: int = 0
     breakdown: str = ""  # Entire breakdown of density
@@ -48,5 +53,7 @@ class ChartInfo(object):
         self.measures = measures
 
         self.md5 = generate_md5(parent.bpms, measures)
+        self.canonical_md5, self.transform = generate_canonical_md5(
+            parent.bpms, measures)
         self.path_prefix = difficulty + rating
-        self.graph_location = parent.folder + self.path_prefix + "graph.png"
+        self.graph_location = parent.folder + self.path_prefix + "graph." + GRAPH_FORMAT
@@ -19,6 +19,10 @@ class FileInfo(object):
     title: str = ""
     subtitle: str = ""
     artist: str = ""
+    # Romanized versions of the above (#TITLETRANSLIT etc.), empty if the simfile has none
+    title_translit: str = ""
+    subtitle_translit: str = ""
+    artist_translit: str = ""
     pack: str = ""
     bpms: List[List[str]] = [
     ]  # List that contains a list of measure/BPM pairs. [0] is measure # that BPM [1] is set.
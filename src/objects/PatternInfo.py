@@ -33,6 +33,10 @@ class PatternInfo(object):
     box_count: int = 0
     box_array: []
 
+    # Whether the mono analysis may change once the left and right arrows are swapped. Not saved, see
+    # scan.get_pattern_analysis.
+    lr_dependent: bool = False
+
     def __init__(self, left_foot_candles: int, right_foot_candles: int,
                  total_candles: int, mono_percent: float, anchor_left: int,
                  anchor_down: int, anchor_up: int, anchor_right: int,
@@ -1,12 +1,17 @@
-import json
-from tinydb import where, Query
-from .scanconstants import CSV_FILENAME
+from typing import Dict, List
+from db.SongStorage import add_search_keys, as_song_storage, get_packs, has_pack
+from helpers.DensityHelper import pack_density
+from helpers.FingerprintHelper import generate_minhash, pack_minhash
+from helpers.SimilarityHelper import get_feature_vector
+import logging
+import time
+from .scanconstants import CSV_FILENAME, BATCH_SIZE, BATCH_SECONDS
 
 
-def load_md5s_into_cache(db, cache):
-    charts = db.all()
-    for chart in charts:
-        cache.insert({"md5": chart["md5"]})
+def load_md5s_into_cache(db, cache: Dict[str, int]) -> Dict[str, int]:
+    """Fills the MD5 index (MD5 -> chart ID) with every chart already in the database."""
+    for chart in db.all():
+        cache[chart["md5"]] = chart.doc_id
     return cache
 
 
@@ -17,86 +22,184 @@ def database_to_csv(db):
         f.write("title,subtitle,artist,pack\n")
         for chart in charts:
             f.write(chart["title"] + "," + chart["subtitle"] + "," +
-                    chart["artist"] + "," + chart["pack"] + "\n")
+                    chart["artist"] + "," + ", ".join(get_packs(chart)) +
+                    "\n")
     return
 
 
+def get_chart_record(fileinfo) -> dict:
+    """Creates the database entry for a chart, from its chart information and pattern analysis, with its search keys."""
+    return add_search_keys({
+        "title": fileinfo.title,
+        "subtitle": fileinfo.subtitle,
+        "artist": fileinfo.artist,
+        "title_translit": fileinfo.title_translit,
+        "subtitle_translit": fileinfo.subtitle_translit,
+        "artist_translit": fileinfo.artist_translit,
+        "pack": [fileinfo.pack],
+        "length": fileinfo.chartinfo.length,
+        "notes": fileinfo.chartinfo.notesinfo.notes,
+        "jumps": fileinfo.chartinfo.notesinfo.jumps,
+        "holds": fileinfo.chartinfo.notesinfo.holds,
+        "mines": fileinfo.chartinfo.notesinfo.mines,
+        "hands": fileinfo.chartinfo.notesinfo.hands,
+        "rolls": fileinfo.chartinfo.notesinfo.rolls,
+        "total_stream": fileinfo.chartinfo.total_stream,
+        "total_break": fileinfo.chartinfo.total_break,
+        "stepartist": fileinfo.chartinfo.stepartist,
+        "difficulty": fileinfo.chartinfo.difficulty,
+        "rating": fileinfo.chartinfo.rating,
+        "breakdown": fileinfo.chartinfo.breakdown,
+        "partial_breakdown": fileinfo.chartinfo.partial_breakdown,
+        "simple_breakdown": fileinfo.chartinfo.simple_breakdown,
+        "normalized_breakdown": fileinfo.chartinfo.normalized_breakdown,
+        "left_foot_candles":
+        fileinfo.chartinfo.patterninfo.left_foot_candles,
+        "right_foot_candles":
+        fileinfo.chartinfo.patterninfo.right_foot_candles,
+        "total_candles": fileinfo.chartinfo.patterninfo.total_candles,
+        "mono_percent": fileinfo.chartinfo.patterninfo.mono_percent,
+        "anchor_left": fileinfo.chartinfo.patterninfo.anchor_left,
+        "anchor_down": fileinfo.chartinfo.patterninfo.anchor_down,
+        "anchor_up": fileinfo.chartinfo.patterninfo.anchor_up,
+        "anchor_right": fileinfo.chartinfo.patterninfo.anchor_right,
+        "double_stairs_count":
+        fileinfo.chartinfo.patterninfo.double_stairs_count,
+        "double_stairs_array":
+        fileinfo.chartinfo.patterninfo.double_stairs_array,
+        "doublesteps_count":
+        fileinfo.chartinfo.patterninfo.doublesteps_count,
+        "doublesteps_array":
+        fileinfo.chartinfo.patterninfo.doublesteps_array,
+        "jumps_count": fileinfo.chartinfo.patterninfo.jumps_count,
+        "jumps_array": fileinfo.chartinfo.patterninfo.jumps_array,
+        "mono_count": fileinfo.chartinfo.patterninfo.mono_count,
+        "mono_array": fileinfo.chartinfo.patterninfo.mono_array,
+        "box_count": fileinfo.chartinfo.patterninfo.box_count,
+        "box_array": fileinfo.chartinfo.patterninfo.box_array,
+        "display_bpm": fileinfo.displaybpm,
+        "max_bpm": fileinfo.max_bpm,
+        "min_bpm": fileinfo.min_bpm,
+        "max_nps": fileinfo.chartinfo.max_nps,
+        "median_nps": fileinfo.chartinfo.median_nps,
+        "density": pack_density(fileinfo.chartinfo.density),
+        "feature_vector":
+        get_feature_vector(fileinfo.chartinfo.breakdown,
+                           fileinfo.chartinfo.total_break,
+                           fileinfo.chartinfo.density),
+        "graph_location": fileinfo.chartinfo.graph_location,
+        "md5": fileinfo.chartinfo.md5,
+        "canonical_md5": fileinfo.chartinfo.canonical_md5,
+        "minhash": pack_minhash(generate_minhash(fileinfo.chartinfo.measures))
+    })
+
+
 def add_to_database(fileinfo, db, cache):
-    """Adds the chart information and pattern analysis to the TinyDB database."""
+    """Adds the chart information and pattern analysis to the song database.
+
+    If db is a WriteBatcher, the chart is handed to it and written with the next batch. The batcher keeps its own MD5
+    index, so cache isn't used.
+    """
 
+    if isinstance(db, WriteBatcher):
+        db.add_chart(get_chart_record(fileinfo))
+        return
+
+    db = as_song_storage(db)
     result = None
 
     # Search if the chart already exists in our database.
     if cache is not None:
-        # We are using the MD5 MemoryStorage. Check if the MD5 exists there
-        result = cache.search(where("md5") == fileinfo.chartinfo.md5)
-        cache.insert({"md5": fileinfo.chartinfo.md5})
+        # We are using the MD5 index, a dict of MD5 -> chart ID.
+        doc_id = cache.get(fileinfo.chartinfo.md5)
+        if doc_id is not None:
+            result = db.get(doc_id)
     else:
-        # We weren't provided a MD5 MemoryStorage, so we have to query the database.
-        result = db.search(where("md5") == fileinfo.chartinfo.md5)
+        # We weren't provided a MD5 index, so we have to query the database.
+        result = db.get_by_md5(fileinfo.chartinfo.md5)
 
     if not result:
         # If the chart doesn't exist, add a new entry.
-        db.insert({
-            "title": fileinfo.title,
-            "subtitle": fileinfo.subtitle,
-            "artist": fileinfo.artist,
-            "pack": fileinfo.pack,
-            "length": fileinfo.chartinfo.length,
-            "notes": fileinfo.chartinfo.notesinfo.notes,
-            "jumps": fileinfo.chartinfo.notesinfo.jumps,
-            "holds": fileinfo.chartinfo.notesinfo.holds,
-            "mines": fileinfo.chartinfo.notesinfo.mines,
-            "hands": fileinfo.chartinfo.notesinfo.hands,
-            "rolls": fileinfo.chartinfo.notesinfo.rolls,
-            "total_stream": fileinfo.chartinfo.total_stream,
-            "total_break": fileinfo.chartinfo.total_break,
-            "stepartist": fileinfo.chartinfo.stepartist,
-            "difficulty": fileinfo.chartinfo.difficulty,
-            "rating": fileinfo.chartinfo.rating,
-            "breakdown": fileinfo.chartinfo.breakdown,
-            "partial_breakdown": fileinfo.chartinfo.partial_breakdown,
-            "simple_breakdown": fileinfo.chartinfo.simple_breakdown,
-            "normalized_breakdown": fileinfo.chartinfo.normalized_breakdown,
-            "left_foot_candles":
-            fileinfo.chartinfo.patterninfo.left_foot_candles,
-            "right_foot_candles":
-            fileinfo.chartinfo.patterninfo.right_foot_candles,
-            "total_candles": fileinfo.chartinfo.patterninfo.total_candles,
-            "mono_percent": fileinfo.chartinfo.patterninfo.mono_percent,
-            "anchor_left": fileinfo.chartinfo.patterninfo.anchor_left,
-            "anchor_down": fileinfo.chartinfo.patterninfo.anchor_down,
-            "anchor_up": fileinfo.chartinfo.patterninfo.anchor_up,
-            "anchor_right": fileinfo.chartinfo.patterninfo.anchor_right,
-            "double_stairs_count":
-            fileinfo.chartinfo.patterninfo.double_stairs_count,
-            "double_stairs_array":
-            fileinfo.chartinfo.patterninfo.double_stairs_array,
-            "doublesteps_count":
-            fileinfo.chartinfo.patterninfo.doublesteps_count,
-            "doublesteps_array":
-            fileinfo.chartinfo.patterninfo.doublesteps_array,
-            "jumps_count": fileinfo.chartinfo.patterninfo.jumps_count,
-            "jumps_array": fileinfo.chartinfo.patterninfo.jumps_array,
-            "mono_count": fileinfo.chartinfo.patterninfo.mono_count,
-            "mono_array": fileinfo.chartinfo.patterninfo.mono_array,
-            "box_count": fileinfo.chartinfo.patterninfo.box_count,
-            "box_array": fileinfo.chartinfo.patterninfo.box_array,
-            "display_bpm": fileinfo.displaybpm,
-            "max_bpm": fileinfo.max_bpm,
-            "min_bpm": fileinfo.min_bpm,
-            "max_nps": fileinfo.chartinfo.max_nps,
-            "median_nps": fileinfo.chartinfo.median_nps,
-            "graph_location": fileinfo.chartinfo.graph_location,
-            "md5": fileinfo.chartinfo.md5
-        })
+        doc_id = db.insert(get_chart_record(fileinfo))
+        if cache is not None:
+            cache[fileinfo.chartinfo.md5] = doc_id
     else:
         # If the chart already exists (i.e. we have a matching MD5), we want to update the entry and append the pack to
         # it. This usually happens with ECS or SRPG songs taken from other packs.
-        if cache:
-            # result is currently set to MemoryStorage, so grab the db entry
-            result = db.search(where("md5") == fileinfo.chartinfo.md5)
-        data = json.loads(json.dumps(result[0]))
-        pack = data["pack"] + ", " + fileinfo.pack
-        Chart = Query()
-        db.update({"pack": pack}, Chart.md5 == fileinfo.chartinfo.md5)
+        packs = get_packs(result)
+        if not has_pack(packs, fileinfo.pack):
+            db.update({"pack": packs + [fileinfo.pack]}, [result.doc_id])
+
+
+class WriteBatcher(object):
+    """Buffers the charts found during a scan and writes them to the song database in bulk.
+
+    New charts and packs appended to existing charts are kept in memory, then committed in a single transaction (one
+    insert_multiple and one update) once batch_size charts are buffered, batch_seconds have passed since the last
+    commit, or flush is called. Duplicate charts found within the same batch are merged in memory.
+
+    Crash safety: every commit is all or nothing, see SongStorage.transaction. If the scanner crashes, charts buffered
+    since the last commit are lost (at most batch_size charts, or batch_seconds worth of scanning) and everything
+    committed before is kept. Scanning the same folder again without -r adds the missing charts.
+    """
+
+    def __init__(self, db, cache: Dict[str, int], batch_size: int = BATCH_SIZE,
+                 batch_seconds: float = BATCH_SECONDS):
+        """
+        @param db: The song database.
+        @param cache: The MD5 index (MD5 -> chart ID) of charts already in the database, see load_md5s_into_cache.
+        @param batch_size: Commit once this many charts are buffered.
+        @param batch_seconds: Commit once this many seconds have passed since the last commit.
+        """
+        self.db = as_song_storage(db)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.pending_inserts: Dict[str, dict] = {}  # MD5 -> new chart
+        self.pending_packs: Dict[str, List[str]] = {}  # MD5 -> packs to append to an existing chart
+        self.pending_count = 0
+        self.last_commit = time.monotonic()
+
+    def add_chart(self, record: dict):
+        md5 = record["md5"]
+        if md5 in self.pending_inserts:
+            packs = self.pending_inserts[md5]["pack"]
+            packs += [pack for pack in record["pack"] if not has_pack(packs, pack)]
+        elif md5 in self.cache:
+            self.pending_packs.setdefault(md5, []).extend(record["pack"])
+        else:
+            self.pending_inserts[md5] = record
+        self.pending_count += 1
+
+        if self.pending_count >= self.batch_size or time.monotonic(
+        ) - self.last_commit >= self.batch_seconds:
+            self.flush()
+
+    def flush(self):
+        """Commits every buffered chart and pack to the database."""
+        pending_packs = self.pending_packs
+
+        def append_packs(chart):
+            packs = get_packs(chart)
+            for pack in pending_packs[chart["md5"]]:
+                if not has_pack(packs, pack):
+                    packs.append(pack)
+            chart["pack"] = packs
+
+        with self.db.transaction():
+            if self.pending_inserts:
+                doc_ids = self.db.insert_multiple(
+                    list(self.pending_inserts.values()))
+                for md5, doc_id in zip(self.pending_inserts, doc_ids):
+                    self.cache[md5] = doc_id
+            if pending_packs:
+                self.db.update(append_packs,
+                               [self.cache[md5] for md5 in pending_packs])
+
+        logging.debug(
+            "Committed {} new chart(s) and {} pack update(s) to the database."
+            .format(len(self.pending_inserts), len(pending_packs)))
+        self.pending_inserts = {}
+        self.pending_packs = {}
+        self.pending_count = 0
+        self.last_commit = time.monotonic()
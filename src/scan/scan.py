@@ -24,10 +24,9 @@ from objects import NotesInfo as ni, ChartInfo as ci, FileInfo as fi, PatternInf
 from helpers import Test as test
 from helpers import VerboseHelper as vh
 from enums.RunDensity import RunDensity
+from db.SongStorage import open_song_storage
+from collections import OrderedDict
 from pathlib import Path
-from tinydb import TinyDB
-from tinydb.storages import JSONStorage, MemoryStorage
-from tinydb.middlewares import CachingMiddleware
 import getopt
 import glob
 import logging
@@ -42,10 +41,15 @@ from .scanconstants import SHORT_OPTIONS, LONG_OPTIONS, REBUILD, VERBOSE, DIRECT
     UNIT_TEST, CSV, NL_REG, NO_NOTES_REG, ANY_NOTES_REG, LOG_TIMESTAMP, LOG_FORMAT, UNITTEST_FOLDER,\
     DATABASE_NAME, LOGFILE_NAME, STEP_TO_DIR, LEFT_CANDLES, RIGHT_CANDLES, COMBINED_PATTERN,\
     LEFT_ANCHOR_PATTERN, DOWN_ANCHOR_PATTERN, UP_ANCHOR_PATTERN, RIGHT_ANCHOR_PATTERN, DBL_STAIRS,\
-    DBL_STEPS, BOXES
+    DBL_STEPS, BOXES, WORKERS, PATTERN_CACHE_SIZE
 from .regexfinds import findall_with_regex_dotall, findall_with_regex, find_with_regex_dotall, find_with_regex
-from .dbhelpers import load_md5s_into_cache, database_to_csv, add_to_database
-from .scanutils import last_left_right, find_starting_foot, ensure_only_step, process_mistake_data, fill_mistake_data, process_mono
+from .dbhelpers import load_md5s_into_cache, database_to_csv, add_to_database, WriteBatcher
+from .scanutils import last_left_right, find_starting_foot, ensure_only_step, process_mistake_data, fill_mistake_data, process_mono,\
+    remap_patterninfo
+
+# Canonical MD5 -> (pattern analysis of the canonical form of the chart, transform of the chart analyzed), see
+# get_pattern_analysis
+pattern_cache = OrderedDict()
 
 
 def adjust_total_break(total_break, measures):
@@ -122,6 +126,7 @@ def new_pattern_analysis(measure_obj):
     }
 
     total_notes_in_runs = 0
+    lr_dependent = False
 
     curr_run = ""
     prev_measure = None
@@ -147,7 +152,7 @@ def new_pattern_analysis(measure_obj):
 
         Output: None
         """
-        nonlocal category_counts, total_notes_in_runs, curr_run, most_recent_starting_measure
+        nonlocal category_counts, total_notes_in_runs, curr_run, most_recent_starting_measure, lr_dependent
 
         double_stair_data = {}
         doublesteps_data = {}
@@ -177,6 +182,11 @@ def new_pattern_analysis(measure_obj):
         category_counts["Right Candles"] += sum(
             run.count(pattern) for pattern in RIGHT_CANDLES)
 
+        # Jumps are written in L, D, U, R order (e.g. "[LR]"), so swapping the left and right arrows doesn't just swap
+        # the letters of the run, and the feet found by find_starting_foot may change
+        if "[" in run:
+            lr_dependent = True
+
         current_foot = None
         prev_direction = None
         curr_direction = None
@@ -260,6 +270,8 @@ def new_pattern_analysis(measure_obj):
             if i != 0:
                 prev_step = run[i - 1]
                 if prev_step != curr_step:
+                    # After a jump, or when no L/R is left in the run, the foot is unknown and we guess the right foot
+                    lr_dependent = lr_dependent or current_foot not in ("L", "R")
                     current_foot = "L" if current_foot == "R" else "R"
                 else:
                     current_foot = find_starting_foot(run[i + 1:])
@@ -395,10 +407,39 @@ def new_pattern_analysis(measure_obj):
         category_counts["Jumps Array"], category_counts["Mono Count"],
         category_counts["Mono Array"], category_counts["Box Count"],
         category_counts["Box Array"])
+    analysis.lr_dependent = lr_dependent
 
     return analysis
 
 
+def get_pattern_analysis(chartinfo, measure_obj):
+    """Runs the pattern analysis, unless a mirrored, flipped or identical copy of the chart was analyzed recently.
+
+    The analysis of a copy is remapped to the arrows of this chart instead. Analyses are cached for the canonical form
+    of the chart (see FingerprintHelper), by canonical MD5, for the last PATTERN_CACHE_SIZE charts, with the transform
+    of the chart that was analyzed.
+
+    The analysis is the same for every copy, with the arrows swapped, except for the mono analysis of some charts once
+    the left and right arrows are swapped (see lr_dependent in PatternInfo): runs with jumps, and runs where it had to
+    guess which foot is on the arrows, since the guess always picks the right foot. Such analyses are only reused for
+    copies with the left and right arrows where they were.
+    """
+    cached = pattern_cache.get(chartinfo.canonical_md5)
+    if cached is not None:
+        canonical, transform = cached
+        if not canonical.lr_dependent or transform[0] == chartinfo.transform[0]:
+            pattern_cache.move_to_end(chartinfo.canonical_md5)
+            return remap_patterninfo(canonical, chartinfo.transform)
+
+    analysis = new_pattern_analysis(measure_obj)
+    pattern_cache[chartinfo.canonical_md5] = (remap_patterninfo(
+        analysis, chartinfo.transform), chartinfo.transform)
+    pattern_cache.move_to_end(chartinfo.canonical_md5)
+    if len(pattern_cache) > PATTERN_CACHE_SIZE:
+        pattern_cache.popitem(last=False)
+    return analysis
+
+
 def get_simplified(breakdown, partially):
     """Takes the detailed breakdown and creates a simplified breakdown.
 
@@ -654,7 +695,7 @@ def get_density_and_breakdown(chartinfo, measures, bpms):
     elif measures_of_run[RunDensity.Run_16.value] > 0:
         breakdown += str(measures_of_run[RunDensity.Run_16.value]) + " "
 
-    chartinfo.patterninfo = new_pattern_analysis(measures_and_steps)
+    chartinfo.patterninfo = get_pattern_analysis(chartinfo, measures_and_steps)
 
     minutes = length // 60
     seconds = length % 60
@@ -736,11 +777,12 @@ def parse_chart(chart, fileinfo, db, cache=None):
 
     chartinfo.max_nps = max(density)
     chartinfo.median_nps = statistics.median(density)
+    chartinfo.density = density
 
     fileinfo.chartinfo = chartinfo
 
-    ih.create_and_save_density_graph(list(range(0, len(measures))), density,
-                                     fileinfo.chartinfo.graph_location)
+    ih.queue_density_graph(list(range(0, len(measures))), density,
+                           fileinfo.chartinfo.graph_location)
     add_to_database(fileinfo, db, cache)
 
 
@@ -753,10 +795,18 @@ def parse_file(db, filename, folder, pack, hide_artist_info, cache=None):
         title = find_with_regex(data, r"#TITLE:(.*);")
         subtitle = find_with_regex(data, r"#SUBTITLE:(.*);")
         artist = find_with_regex(data, r"#ARTIST:(.*);")
+        # Romanized versions, used to find songs titled in another script
+        title_translit, subtitle_translit, artist_translit = [
+            "" if value == "N/A" else value for value in (
+                find_with_regex(data, r"#TITLETRANSLIT:(.*);"),
+                find_with_regex(data, r"#SUBTITLETRANSLIT:(.*);"),
+                find_with_regex(data, r"#ARTISTTRANSLIT:(.*);"))
+        ]
     else:
         title = "*Hidden*"
         subtitle = ""
         artist = "*Hidden*"
+        title_translit = subtitle_translit = artist_translit = ""
 
     bpms = find_with_regex_dotall(data, r"#BPMS:(.*?)[;]+?")
     if bpms == -1:
@@ -833,6 +883,9 @@ def parse_file(db, filename, folder, pack, hide_artist_info, cache=None):
 
             fileinfo = fi.FileInfo(title, subtitle, artist, pack, bpms,
                                    displaybpm, folder)
+            fileinfo.title_translit = title_translit
+            fileinfo.subtitle_translit = subtitle_translit
+            fileinfo.artist_translit = artist_translit
             parse_chart(chart + ";", fileinfo, db, cache)
 
 
@@ -956,6 +1009,13 @@ def main(argv: list):
             logging.info("Logfile initialized.")
         elif arg in ("-c", "--csv"):
             args[CSV] = True
+        elif arg in ("-w", "--workers"):
+            try:
+                args[WORKERS] = int(val)
+            except ValueError:
+                print(
+                    "Number of workers \"{}\" is not a number. Rendering graphs without workers."
+                    .format(val))
 
     if not logging.getLogger().hasHandlers():
         # Logging argument wasn't passed in. Default to logging level ERROR and output to stdout.
@@ -982,26 +1042,38 @@ def main(argv: list):
                             level=logging.INFO,
                             datefmt=LOG_TIMESTAMP,
                             format=LOG_FORMAT)
-        with TinyDB(database) as db:
+        with open_song_storage(database) as db:
             scan_folder(args, db)
             test.run_tests()
     else:
 
-        with TinyDB(DATABASE_NAME, storage=CachingMiddleware(JSONStorage)) as db, \
-                TinyDB(storage=MemoryStorage) as cache:
+        with open_song_storage(DATABASE_NAME) as db:
 
-            # Generate a cache of existing song MD5 values for quick comparisons later. No need
-            # to populate this cache if database is being rebuilt.
+            # Generate an index of existing song MD5 values to their chart ID for quick comparisons later. No need
+            # to populate this index if database is being rebuilt.
+            cache = {}
             if not args[REBUILD]:
                 load_md5s_into_cache(db, cache)
 
+            if args[WORKERS]:
+                # Density graphs are rendered by a pool of worker processes while we continue scanning
+                ih.start_render_pool(args[WORKERS])
+
             if os.path.isdir(args[DIRECTORY]):
-                scan_folder(args, db, cache)
+                # Charts are written to the database in batches, each one committed in a single transaction
+                batcher = WriteBatcher(db, cache)
+                scan_folder(args, batcher)
+                batcher.flush()
             else:
                 print("\"" + args[DIRECTORY] +
                       "\" is not a valid directory. Exiting.")
                 sys.exit(2)
 
+            failed = ih.stop_render_pool()
+            if failed:
+                logging.error(
+                    "{} density graph(s) could not be saved.".format(failed))
+
             os.chmod(DATABASE_NAME, 0o777)
 
             if args[CSV]:
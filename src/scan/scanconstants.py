@@ -1,8 +1,8 @@
 # Flag constants. These are the available command line arguments you can use when running this application.
-SHORT_OPTIONS = "rvd:ml:uc"
+SHORT_OPTIONS = "rvd:ml:ucw:"
 LONG_OPTIONS = [
     "rebuild", "verbose", "directory=", "mediaremove", "log=", "unittest",
-    "csv"
+    "csv", "workers="
 ]
 
 # Positions in args array.
@@ -13,6 +13,7 @@ MEDIA_REMOVE = 3
 LOG = 4
 UNIT_TEST = 5
 CSV = 6
+WORKERS = 7
 
 # Regex constants. Used mainly in the pattern recognition section.
 NL_REG = "[\s]+"  # New line
@@ -36,6 +37,15 @@ LOGFILE_NAME = "scan.log"
 # Name of the .csv that will be created if enabled
 CSV_FILENAME = "charts.csv"
 
+# Charts found while scanning are written to the database in batches. A batch is committed once it has this many charts,
+# or once this many seconds have passed since the last commit, whichever comes first.
+BATCH_SIZE = 500
+BATCH_SECONDS = 30
+
+# The pattern analysis of the most recently scanned charts is kept, by canonical MD5, so their mirrored/flipped copies
+# (and exact copies in other packs) reuse it instead of being analyzed again.
+PATTERN_CACHE_SIZE = 10000
+
 STEP_TO_DIR = {
     # Steps
     "1000": "L",
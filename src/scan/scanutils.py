@@ -1,3 +1,6 @@
+from objects import PatternInfo as pi
+
+
 def first_left_right(pattern):
     """
     Takes in a string pattern and returns the index of the first instance of "L" or "R". 
@@ -102,3 +105,53 @@ def process_mono(data_obj, count_obj, pattern, curr_measure):
 
         count_obj["Mono Notes"] += len(sliced)
         fill_mistake_data(data_obj, curr_measure, len(sliced), sliced)
+
+
+def remap_patterninfo(patterninfo, transform):
+    """
+    Returns the pattern analysis of the chart turned by a transform (see FingerprintHelper), from the pattern analysis
+    of the chart. Swapping arrows swaps which arrow the anchors are on and which foot the candles are for, and the
+    arrows in the patterns found. Everything else stays the same.
+    """
+    arrows = "LDUR"
+    table = str.maketrans(arrows, transform)
+
+    def remap_array(array):
+        remapped = []
+        for pattern, measure in array:
+            if isinstance(pattern, str) and pattern != "Sweep":
+                pattern = pattern.translate(table)
+            remapped.append([pattern, measure])
+        return remapped
+
+    def remap_jumps(array):
+        # Jumps are written in L, D, U, R order, e.g. LD and not DL
+        return [[
+            "".join(sorted(pattern.translate(table), key=arrows.index)),
+            measure
+        ] for pattern, measure in array]
+
+    anchors = {
+        "L": patterninfo.anchor_left,
+        "D": patterninfo.anchor_down,
+        "U": patterninfo.anchor_up,
+        "R": patterninfo.anchor_right
+    }
+    anchors = {arrow.translate(table): count for arrow, count in anchors.items()}
+    # Candles are named after the foot crossing over, which changes with the left and right arrows
+    candles = [patterninfo.left_foot_candles, patterninfo.right_foot_candles]
+    if transform[0] == "R":
+        candles.reverse()
+
+    remapped = pi.PatternInfo(
+        candles[0], candles[1], patterninfo.total_candles,
+        patterninfo.mono_percent, anchors["L"], anchors["D"], anchors["U"],
+        anchors["R"], patterninfo.double_stairs_count,
+        remap_array(patterninfo.double_stairs_array),
+        patterninfo.doublesteps_count,
+        remap_array(patterninfo.doublesteps_array), patterninfo.jumps_count,
+        remap_jumps(patterninfo.jumps_array), patterninfo.mono_count,
+        remap_array(patterninfo.mono_array), patterninfo.box_count,
+        remap_array(patterninfo.box_array))
+    remapped.lr_dependent = patterninfo.lr_dependent
+    return remapped